@@ -0,0 +1,60 @@
+import math
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.chat import ChannelMessageBatch
+from app.services.message_service import get_all_messages, get_channel_messages, CHANNEL_CONTEXT_SIZE
+from app.services.persistence import channel_writer
+from app.db.session import get_db
+from app.utils.logger import get_logger
+from typing import List
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api", tags=["channel-messages"])
+
+
+@router.post('/channel-messages', status_code=202)
+async def ingest_channel_messages_endpoint(batch: ChannelMessageBatch, db: AsyncSession = Depends(get_db)):
+    """
+    Queue a batch of channel messages for storage
+
+    Messages are accepted in order until the ingest backlog is full; the
+    rest are refused with 429 and a Retry-After header so the caller can
+    resend them (``accepted`` tells it where to resume).
+
+    :param batch: Messages streamed in by the bot
+    :type batch: ChannelMessageBatch
+    :param db: Database session
+    :type db: AsyncSession
+    :return: Dictionary with the number of accepted messages
+    """
+    accepted = await get_all_messages(batch.messages, db)
+    if accepted < len(batch.messages):
+        return JSONResponse(
+            status_code=429,
+            content={'accepted': accepted, 'refused': len(batch.messages) - accepted},
+            headers={'Retry-After': str(max(1, math.ceil(channel_writer.interval)))},
+        )
+    return {'accepted': accepted}
+
+
+@router.get('/channel-messages/{channel_id}/recent', response_model=List[dict])
+async def get_recent_channel_messages_endpoint(
+    channel_id: str,
+    limit: int = Query(CHANNEL_CONTEXT_SIZE, ge=1, le=CHANNEL_CONTEXT_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get the latest messages of a channel, newest first
+
+    :param channel_id: Channel ID
+    :type channel_id: str
+    :param limit: Maximum number of messages
+    :type limit: int
+    :param db: Database session
+    :type db: AsyncSession
+    :return: List of ``{user_id, content}`` dictionaries
+    """
+    messages = await get_channel_messages(channel_id, db)
+    return [{'user_id': user_id, 'content': content} for user_id, content in messages[:limit]]
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.chat import Payload
-from app.services.chat_service import process_chat
+from app.services.chat_service import process_chat, process_chat_stream
 from app.db.session import get_db
 from app.utils.logger import get_logger
+import json
 import time
 
 logger = get_logger(__name__)
@@ -35,3 +37,29 @@ async def chat_endpoint(payload: Payload, db: AsyncSession = Depends(get_db)) ->
         logger.error(f"[API] Chat request failed after {elapsed:.2f}ms: {e}", exc_info=True)
         raise
 
+
+
+@router.post('/chat/stream')
+async def chat_stream_endpoint(payload: Payload, db: AsyncSession = Depends(get_db)) -> StreamingResponse:
+    """
+    Handle chat messages and stream the reply as NDJSON events
+
+    Each line is a JSON object: ``{"type": "chunk", "text": ...}`` while the
+    reply is generated, then a final ``{"type": "done", "reply": ...}``.
+
+    :param payload: Chat message payload
+    :type payload: Payload
+    :param db: Database session
+    :type db: AsyncSession
+    :return: Streaming NDJSON response
+    """
+    logger.info(f"[API] Streaming chat request from user {payload.user_id} in channel {payload.channel_id}")
+
+    async def event_lines():
+        start_time = time.time()
+        async for event in process_chat_stream(payload, db):
+            yield json.dumps(event) + "\n"
+        elapsed = (time.time() - start_time) * 1000
+        logger.info(f"[API] Streaming chat request completed in {elapsed:.2f}ms")
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
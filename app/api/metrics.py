@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.utils import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get('/metrics')
+async def metrics_endpoint() -> dict:
+    """
+    Get a snapshot of in-process metrics (caches, queues, LLM stats)
+    
+    :return: Dictionary of metrics keyed by source
+    """
+    return metrics.snapshot()
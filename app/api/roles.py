@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.role import Role, RoleCreate, RolePatch
-from app.services.role_service import get_roles_for_user, add_role, remove_role, patch_role
+from app.services.role_service import get_roles_for_user, get_role_user_ids, add_role, remove_role, patch_role
 from app.db.session import get_db
+from typing import List
 
 router = APIRouter(prefix="/api", tags=["roles"])
 
@@ -22,6 +23,18 @@ async def add_role_endpoint(role: RoleCreate, db: AsyncSession = Depends(get_db)
     return await add_role(role, db)
 
 
+@router.get('/roles/user-ids', response_model=List[str])
+async def get_role_user_ids_endpoint(db: AsyncSession = Depends(get_db)):
+    """
+    Get the ids of all users that have a role configured
+    
+    :param db: Database session
+    :type db: AsyncSession
+    :return: List of user IDs
+    """
+    return await get_role_user_ids(db)
+
+
 @router.get('/role/{user_id}', response_model=Role)
 async def get_roles_endpoint(user_id: str, db: AsyncSession = Depends(get_db)):
     """
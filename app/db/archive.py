@@ -0,0 +1,145 @@
+"""
+Query, restore and maintain archived bot_messages turns.
+
+Works on the configured database and on RETENTION_ARCHIVE_DIR (see
+:mod:`app.services.retention`). ``query`` prints matching turns as NDJSON;
+``restore`` puts them back into bot_messages with their original ids
+(raise RETENTION_HOT_DAYS first, or the next retention pass archives them
+again).
+
+Usage:
+    python -m app.db.archive query --user 1234 --since 2026-01-01 --until 2026-01-31
+    python -m app.db.archive query --contains "movie" --source table
+    python -m app.db.archive restore --user 1234 --since 2026-01-01
+    python -m app.db.archive run          # one retention pass now
+    python -m app.db.archive partition    # MySQL: partition bot_messages_archive by month
+"""
+import argparse
+import asyncio
+import json
+from datetime import date, datetime
+from typing import Iterator, List, Optional
+from sqlalchemy import delete, insert, inspect, select
+from app.db.session import AsyncSessionLocal, engine
+from app.models.message import BotMessages, BotMessagesArchive
+from app.services import retention
+from app.services.retention import ARCHIVE_COLUMNS, archiver
+
+SOURCES = ('file', 'table', 'all')
+
+
+def _matches(row: dict, user: Optional[str], contains: Optional[str]) -> bool:
+    if user and row['user_id'] != user:
+        return False
+    if contains:
+        needle = contains.lower()
+        return needle in (row['content'] or '').lower() or needle in (row['bot_reply'] or '').lower()
+    return True
+
+
+def file_rows(since: Optional[date], until: Optional[date], user: Optional[str],
+              contains: Optional[str]) -> Iterator[dict]:
+    """Yield matching turns from the archive files"""
+    for row in archiver.archive.read(since, until):
+        if _matches(row, user, contains):
+            yield row
+
+
+async def table_rows(since: Optional[date], until: Optional[date], user: Optional[str],
+                     contains: Optional[str]) -> List[dict]:
+    """Return matching turns from bot_messages_archive"""
+    async with AsyncSessionLocal() as db:
+        conn = await db.connection()
+        if not await conn.run_sync(lambda c: inspect(c).has_table(BotMessagesArchive.__tablename__)):
+            return []
+        statement = select(BotMessagesArchive).order_by(BotMessagesArchive.id)
+        if user:
+            statement = statement.where(BotMessagesArchive.user_id == user)
+        if since:
+            statement = statement.where(BotMessagesArchive.day >= since)
+        if until:
+            statement = statement.where(BotMessagesArchive.day <= until)
+        if contains:
+            pattern = f"%{contains}%"
+            statement = statement.where(
+                BotMessagesArchive.content.like(pattern) | BotMessagesArchive.bot_reply.like(pattern)
+            )
+        result = await db.execute(statement)
+        return [retention.archive_row(r, r.day) for r in result.scalars()]
+
+
+async def collect(args) -> List[dict]:
+    rows: List[dict] = []
+    if args.source in ('file', 'all'):
+        rows.extend(file_rows(args.since, args.until, args.user, args.contains))
+    if args.source in ('table', 'all'):
+        seen = {row['id'] for row in rows}
+        rows.extend(r for r in await table_rows(args.since, args.until, args.user, args.contains) if r['id'] not in seen)
+    rows.sort(key=lambda r: r['id'])
+    return rows[:args.limit] if args.limit else rows
+
+
+async def restore(rows: List[dict], from_table: bool, batch_size: int) -> int:
+    """
+    Put archived turns back into bot_messages with their original ids
+
+    :param rows: Rows as returned by :func:`collect`
+    :param from_table: Also delete the restored rows from bot_messages_archive
+    :param batch_size: Rows per transaction
+    :return: Number of rows written
+    """
+    statement = insert(BotMessages).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        values = [
+            {**{c: r[c] for c in ARCHIVE_COLUMNS},
+             'dateTime': datetime.fromisoformat(r['dateTime']) if r['dateTime'] else None}
+            for r in batch
+        ]
+        async with AsyncSessionLocal() as db:
+            await db.execute(statement, values)
+            if from_table:
+                await db.execute(delete(BotMessagesArchive).where(BotMessagesArchive.id.in_([r['id'] for r in batch])))
+            await db.commit()
+    return len(rows)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('query', 'restore'):
+        command = sub.add_parser(name)
+        command.add_argument('--user', help='Only turns of this user_id')
+        command.add_argument('--since', type=date.fromisoformat, help='First day (YYYY-MM-DD)')
+        command.add_argument('--until', type=date.fromisoformat, help='Last day (YYYY-MM-DD)')
+        command.add_argument('--contains', help='Substring of the message or reply')
+        command.add_argument('--source', choices=SOURCES, default=archiver.target)
+        command.add_argument('--limit', type=int, default=0)
+    sub.add_parser('run', help='Run one retention pass now')
+    partition = sub.add_parser('partition', help='Partition bot_messages_archive by month (MySQL)')
+    partition.add_argument('--months-ahead', type=int, default=retention.RETENTION_PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'query':
+            for row in await collect(args):
+                print(json.dumps(row, ensure_ascii=False))
+        elif args.command == 'restore':
+            rows = await collect(args)
+            count = await restore(rows, args.source in ('table', 'all'), retention.RETENTION_BATCH_SIZE)
+            print(f"Restored {count} turns into bot_messages")
+        elif args.command == 'run':
+            moved = await archiver.run_pass()
+            print(f"Archived {moved} turns ({archiver.stats()})")
+        elif args.command == 'partition':
+            if engine.dialect.name != 'mysql':
+                raise SystemExit("Partitioning is only supported on MySQL")
+            async with engine.begin() as conn:
+                added = await conn.run_sync(retention.ensure_partitions, args.months_ahead)
+            print(f"Added {added} partition(s)")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
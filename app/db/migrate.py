@@ -0,0 +1,182 @@
+"""
+Apply or roll back the versioned migrations in :mod:`app.db.migrations`.
+
+Applied revisions are recorded in ``schema_version``; each migration runs in
+its own transaction and is recorded in the same one (MySQL commits DDL
+implicitly, so a failed step leaves the revisions before it applied).
+On MySQL a named lock keeps several API instances starting at once from
+migrating concurrently.
+
+Usage:
+    python -m app.db.migrate upgrade            # to the latest revision
+    python -m app.db.migrate upgrade 4
+    python -m app.db.migrate downgrade 4        # roll back everything above 4
+    python -m app.db.migrate current
+    python -m app.db.migrate history
+"""
+import argparse
+import asyncio
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+from typing import List, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, func, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from app.db import migrations
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LOCK_NAME = 'schema_migrations'
+LOCK_TIMEOUT = 60
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime),
+)
+
+
+def load_migrations() -> List[ModuleType]:
+    """Return the migration modules ordered by revision"""
+    modules = [
+        importlib.import_module(f"{migrations.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(migrations.__path__)
+        if info.name.startswith('v')
+    ]
+    modules.sort(key=lambda m: m.revision)
+    revisions = [m.revision for m in modules]
+    if len(set(revisions)) != len(revisions):
+        raise RuntimeError(f"Duplicate migration revisions: {revisions}")
+    return modules
+
+
+def head() -> int:
+    """Return the latest revision"""
+    modules = load_migrations()
+    return modules[-1].revision if modules else 0
+
+
+def _current(conn: Connection) -> int:
+    version_metadata.create_all(conn, checkfirst=True)
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Return the highest applied revision (0 for an empty database)"""
+    async with engine.begin() as conn:
+        return await conn.run_sync(_current)
+
+
+async def _with_lock(engine: AsyncEngine, work):
+    async with engine.connect() as lock_conn:
+        is_mysql = engine.dialect.name == 'mysql'
+        if is_mysql:
+            got = (await lock_conn.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"), {'name': LOCK_NAME, 'timeout': LOCK_TIMEOUT}
+            )).scalar()
+            if got != 1:
+                raise RuntimeError(f"Could not acquire migration lock '{LOCK_NAME}' within {LOCK_TIMEOUT}s")
+        try:
+            return await work()
+        finally:
+            if is_mysql:
+                await lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': LOCK_NAME})
+
+
+async def upgrade(engine: AsyncEngine, target: Optional[int] = None) -> int:
+    """
+    Apply pending migrations up to ``target``
+
+    :param engine: Engine of the database to migrate
+    :type engine: AsyncEngine
+    :param target: Revision to stop at (default: latest)
+    :type target: int
+    :return: Revision the database is at afterwards
+    """
+    modules = load_migrations()
+    target = head() if target is None else target
+
+    async def run() -> int:
+        version = await current_version(engine)
+        for module in modules:
+            if version < module.revision <= target:
+                logger.info(f"Applying migration {module.revision}: {module.description}")
+                async with engine.begin() as conn:
+                    await conn.run_sync(module.upgrade)
+                    await conn.execute(insert(schema_version).values(
+                        version=module.revision, description=module.description, applied_at=datetime.utcnow(),
+                    ))
+                version = module.revision
+        return version
+
+    version = await _with_lock(engine, run)
+    logger.info(f"Database schema at revision {version}")
+    return version
+
+
+async def downgrade(engine: AsyncEngine, target: int) -> int:
+    """
+    Roll back applied migrations above ``target``, newest first
+
+    :param engine: Engine of the database to migrate
+    :type engine: AsyncEngine
+    :param target: Revision to end at (0 rolls back everything)
+    :type target: int
+    :return: Revision the database is at afterwards
+    """
+    modules = load_migrations()
+
+    async def run() -> int:
+        version = await current_version(engine)
+        for module in reversed(modules):
+            if target < module.revision <= version:
+                logger.info(f"Rolling back migration {module.revision}: {module.description}")
+                async with engine.begin() as conn:
+                    await conn.run_sync(module.downgrade)
+                    await conn.execute(delete(schema_version).where(schema_version.c.version == module.revision))
+        return await current_version(engine)
+
+    version = await _with_lock(engine, run)
+    logger.info(f"Database schema at revision {version}")
+    return version
+
+
+async def main():
+    from app.db.session import db_url
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-url', default=db_url)
+    sub = parser.add_subparsers(dest='command', required=True)
+    up = sub.add_parser('upgrade', help='Apply pending migrations')
+    up.add_argument('target', type=int, nargs='?')
+    down = sub.add_parser('downgrade', help='Roll back migrations above a revision')
+    down.add_argument('target', type=int)
+    sub.add_parser('current', help='Show the applied revision')
+    sub.add_parser('history', help='List migrations')
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.db_url)
+    try:
+        if args.command == 'upgrade':
+            await upgrade(engine, args.target)
+        elif args.command == 'downgrade':
+            await downgrade(engine, args.target)
+        else:
+            version = await current_version(engine)
+            if args.command == 'current':
+                print(f"{version} (head {head()})")
+            else:
+                for module in load_migrations():
+                    mark = 'x' if module.revision <= version else ' '
+                    print(f"[{mark}] {module.revision:4d}  {module.description}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+"""
+Versioned schema migrations.
+
+Each ``vNNNN_<name>.py`` module in this package defines ``revision`` (an
+increasing integer), a one-line ``description`` and ``upgrade(conn)`` /
+``downgrade(conn)`` functions that take a synchronous SQLAlchemy
+``Connection``. Migrations describe the schema as it was at their revision
+instead of importing the live models, so they keep working as the models
+change. The runner lives in :mod:`app.db.migrate`.
+
+Databases created before migrations existed (``create_all`` at startup or
+``init_db.py``) are adopted as they are: every step checks what already
+exists before creating it.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    """Return True if ``table`` exists"""
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    """Return True if ``table`` has a column named ``column``"""
+    return any(c['name'] == column for c in inspect(conn).get_columns(table))
+
+
+def has_index(conn: Connection, table: str, index: str) -> bool:
+    """Return True if ``table`` has an index (or unique constraint) named ``index``"""
+    inspector = inspect(conn)
+    names = {i['name'] for i in inspector.get_indexes(table)}
+    names.update(u['name'] for u in inspector.get_unique_constraints(table))
+    return index in names
+
+
+def index_columns(conn: Connection, table: str) -> list:
+    """Return the column lists of every index on ``table``"""
+    return [i['column_names'] for i in inspect(conn).get_indexes(table)]
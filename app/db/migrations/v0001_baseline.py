@@ -0,0 +1,60 @@
+"""Tables as created by init_db.py before migrations existed"""
+from sqlalchemy import Column, DateTime, Integer, JSON, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+revision = 1
+description = "users, role, admin, channel_messages and bot_messages"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", String(255), unique=True, nullable=False, index=True),
+    Column("username", String(255)),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "role", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", String(50), unique=True),
+    Column("user_name", String(32)),
+    Column("role", JSON),
+)
+
+Table(
+    "admin", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", String(255), index=True),
+    Column("role", JSON),
+)
+
+Table(
+    "channel_messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("server_id", String(32)),
+    Column("channel_id", String(32)),
+    Column("user_id", String(50)),
+    Column("content", String(1000)),
+    Column("dateTime", DateTime),
+)
+
+Table(
+    "bot_messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("channel_id", String(32)),
+    Column("user_id", String(50), index=True),
+    Column("content", String(1000)),
+    Column("dateTime", DateTime),
+    Column("bot_reply", String(1000)),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn: Connection):
+    metadata.drop_all(conn, checkfirst=True)
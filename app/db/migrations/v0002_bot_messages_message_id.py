@@ -0,0 +1,26 @@
+"""Discord message ID on bot_messages, the idempotency key for /chat retries"""
+from sqlalchemy import Column, Index, MetaData, String, Table, text
+from sqlalchemy.engine import Connection
+from app.db.migrations import has_column, has_index
+
+revision = 2
+description = "bot_messages.message_id with a unique index"
+
+bot_messages = Table("bot_messages", MetaData(), Column("message_id", String(32)))
+message_id_index = Index("uq_bot_messages_message_id", bot_messages.c.message_id, unique=True)
+
+
+def upgrade(conn: Connection):
+    # Tables created by create_all after the column was added already have it
+    if has_column(conn, "bot_messages", "message_id"):
+        return
+    conn.execute(text("ALTER TABLE bot_messages ADD COLUMN message_id VARCHAR(32) NULL"))
+    message_id_index.create(conn)
+
+
+def downgrade(conn: Connection):
+    if not has_column(conn, "bot_messages", "message_id"):
+        return
+    if has_index(conn, "bot_messages", message_id_index.name):
+        message_id_index.drop(conn)
+    conn.execute(text("ALTER TABLE bot_messages DROP COLUMN message_id"))
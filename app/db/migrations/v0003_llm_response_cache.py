@@ -0,0 +1,25 @@
+"""Persistent LLM response cache shared by API instances"""
+from sqlalchemy import Column, DateTime, Float, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+revision = 3
+description = "llm_response_cache"
+
+metadata = MetaData()
+
+Table(
+    "llm_response_cache", metadata,
+    Column("prompt_key", String(64), primary_key=True),
+    Column("response", Text),
+    Column("llm_ms", Float),
+    Column("expires_at", DateTime, index=True),
+    Column("last_hit_at", DateTime, index=True),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn: Connection):
+    metadata.drop_all(conn, checkfirst=True)
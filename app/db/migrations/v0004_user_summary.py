@@ -0,0 +1,24 @@
+"""Rolling per-user summaries of turns older than the prompt's recent window"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+revision = 4
+description = "user_summary"
+
+metadata = MetaData()
+
+Table(
+    "user_summary", metadata,
+    Column("user_id", String(50), primary_key=True),
+    Column("summary", Text),
+    Column("last_message_id", Integer, default=0),
+    Column("updated_at", DateTime),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn: Connection):
+    metadata.drop_all(conn, checkfirst=True)
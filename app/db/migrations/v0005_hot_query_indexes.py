@@ -0,0 +1,52 @@
+"""
+Composite indexes for the hot reads
+
+``(user_id, id)`` serves "last N turns of a user" (get_user_messages, the
+context loader, the summary worker) straight from the index in id order,
+and replaces the single-column ``user_id`` index it is a prefix of.
+``(channel_id, dateTime)`` serves "latest messages of a channel", which
+had no index at all.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+from app.db.migrations import has_index
+
+revision = 5
+description = "bot_messages(user_id, id) and channel_messages(channel_id, dateTime) indexes"
+
+metadata = MetaData()
+
+bot_messages = Table(
+    "bot_messages", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", String(50)),
+)
+channel_messages = Table(
+    "channel_messages", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("channel_id", String(32)),
+    Column("dateTime", DateTime),
+)
+
+user_id_index = Index("ix_bot_messages_user_id", bot_messages.c.user_id)
+user_turns_index = Index("ix_bot_messages_user_id_id", bot_messages.c.user_id, bot_messages.c.id)
+channel_recent_index = Index(
+    "ix_channel_messages_channel_id_datetime", channel_messages.c.channel_id, channel_messages.c.dateTime
+)
+
+
+def upgrade(conn: Connection):
+    for index in (user_turns_index, channel_recent_index):
+        if not has_index(conn, index.table.name, index.name):
+            index.create(conn)
+    # Build the composite before dropping the index it supersedes
+    if has_index(conn, "bot_messages", user_id_index.name):
+        user_id_index.drop(conn)
+
+
+def downgrade(conn: Connection):
+    if not has_index(conn, "bot_messages", user_id_index.name):
+        user_id_index.create(conn)
+    for index in (user_turns_index, channel_recent_index):
+        if has_index(conn, index.table.name, index.name):
+            index.drop(conn)
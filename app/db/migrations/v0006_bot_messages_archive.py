@@ -0,0 +1,30 @@
+"""Cold table for turns moved out of bot_messages by the retention worker"""
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+revision = 6
+description = "bot_messages_archive"
+
+metadata = MetaData()
+
+Table(
+    "bot_messages_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("day", Date, primary_key=True),
+    Column("channel_id", String(32)),
+    Column("user_id", String(50)),
+    Column("content", String(1000)),
+    Column("dateTime", DateTime),
+    Column("bot_reply", String(1000)),
+    Column("message_id", String(32)),
+    Column("archived_at", DateTime),
+    Index("ix_bot_messages_archive_user_id_id", "user_id", "id"),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn: Connection):
+    metadata.drop_all(conn, checkfirst=True)
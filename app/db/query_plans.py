@@ -0,0 +1,162 @@
+"""
+Check the query plans of the hot queries.
+
+Runs EXPLAIN (MySQL) or EXPLAIN QUERY PLAN (SQLite) on every query on the
+request path and in the background workers, and exits non-zero if any of
+them reads a table with a full scan (MySQL ``type`` ALL or index, SQLite
+``SCAN <table>``) or sorts rows the index should already return in order
+(filesort / temp B-tree).
+
+Run it against a database with realistic data: on near-empty tables MySQL
+may prefer a scan even when a usable index exists. Without ``--db-url`` the
+configured database is used; ``--db-url sqlite+aiosqlite://`` checks an
+empty in-memory database migrated to the latest revision.
+
+Usage:
+    python -m app.db.query_plans
+    python -m app.db.query_plans --db-url sqlite+aiosqlite://
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from app.db import migrate
+from app.db.base import Base
+from app.models.admin import Admin
+from app.models.llm_cache import LLMResponseCache
+from app.models.message import BotMessages, ChannelMessages
+from app.models.role import Role
+from app.models.summary import UserSummary
+from app.services import context_loader
+from app.services.message_service import CHANNEL_CONTEXT_SIZE, HISTORY_TURNS
+
+USER_ID = 'explain-user'
+CHANNEL_ID = '1'
+
+
+def hot_queries() -> List[Tuple[str, object]]:
+    """Return (name, statement) for every query that must stay index-only"""
+    return [
+        # message_service.get_user_messages
+        ('recent turns', select(BotMessages).where(BotMessages.user_id == USER_ID)
+         .order_by(desc(BotMessages.id)).limit(HISTORY_TURNS)),
+        # context_loader.load_context_and_reply, with the stored-reply lookup for idempotent replay
+        ('prompt context', context_loader._context_statement(USER_ID, 'admin', True, True, True, True, '1')),
+        # message_service.get_channel_messages
+        ('channel recent', select(ChannelMessages.user_id, ChannelMessages.content)
+         .where(ChannelMessages.channel_id == CHANNEL_ID)
+         .order_by(desc(ChannelMessages.dateTime), desc(ChannelMessages.id)).limit(CHANNEL_CONTEXT_SIZE)),
+        # summary_service.SummaryWorker.summarize
+        ('summary recent ids', select(BotMessages.id).where(BotMessages.user_id == USER_ID)
+         .order_by(desc(BotMessages.id)).limit(HISTORY_TURNS)),
+        ('summary older turns', select(BotMessages.id, BotMessages.content, BotMessages.bot_reply)
+         .where(BotMessages.user_id == USER_ID, BotMessages.id > 0, BotMessages.id < 1000)
+         .order_by(BotMessages.id).limit(40)),
+        ('summary row', select(UserSummary).where(UserSummary.user_id == USER_ID)),
+        # retrieval.RetrievalIndex.load
+        ('retrieval catch-up', select(BotMessages.id, BotMessages.user_id, BotMessages.content, BotMessages.bot_reply,
+                                      BotMessages.message_id)
+         .where(BotMessages.id > 0).order_by(BotMessages.id).limit(5000)),
+        # retention.RetentionWorker: batch scan and newest-turns check
+        ('retention scan', select(BotMessages.id, BotMessages.user_id, BotMessages.dateTime)
+         .where(BotMessages.id > 0).order_by(BotMessages.id).limit(1000)),
+        ('retention newer turns', select(BotMessages.user_id, func.count(BotMessages.id))
+         .where(BotMessages.user_id.in_([USER_ID, 'other']), BotMessages.id > 0)
+         .group_by(BotMessages.user_id)),
+        # role_service / admin_service cache misses
+        ('user role', select(Role).where(Role.user_id == USER_ID)),
+        ('admin persona', select(Admin).where(Admin.user_id == 'admin')),
+        # response_cache.SqlBackend.get
+        ('response cache', select(LLMResponseCache.response, LLMResponseCache.llm_ms)
+         .where(LLMResponseCache.prompt_key == 'x', LLMResponseCache.expires_at > datetime.utcnow())),
+    ]
+
+
+async def explain(conn: AsyncConnection, statement) -> List[dict]:
+    """Return the plan rows of ``statement`` as dictionaries"""
+    # Expand IN lists into plain parameters so the text can be sent as is
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if conn.dialect.name == 'sqlite':
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    else:
+        result = await conn.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params)
+    return [dict(row._mapping) for row in result]
+
+
+def problems(dialect: str, plan: List[dict]) -> List[str]:
+    """Return the full scans and sorts found in a plan"""
+    tables = set(Base.metadata.tables)
+    found = []
+    for row in plan:
+        if dialect == 'sqlite':
+            detail = row['detail']
+            words = detail.split()
+            if words[0] == 'SCAN' and words[1] in tables:
+                found.append(detail)
+            elif 'TEMP B-TREE' in detail:
+                found.append(detail)
+        else:
+            # <derivedN> / <unionN> rows scan the (already limited) subquery results
+            if str(row.get('table') or '').startswith('<'):
+                continue
+            if row.get('type') in ('ALL', 'index'):
+                found.append(f"{row['table']}: type={row['type']} key={row.get('key')}")
+            if 'filesort' in str(row.get('Extra') or ''):
+                found.append(f"{row['table']}: {row['Extra']}")
+    return found
+
+
+def render(dialect: str, plan: List[dict]) -> str:
+    if dialect == 'sqlite':
+        return "\n".join(f"      {row['detail']}" for row in plan)
+    return "\n".join(
+        f"      {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} "
+        f"extra={row.get('Extra')}"
+        for row in plan
+    )
+
+
+async def check(db_url: str, verbose: bool) -> int:
+    """Explain every hot query; returns the number of failing queries"""
+    engine = create_async_engine(db_url)
+    failures = 0
+    try:
+        if engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:'):
+            # Fresh in-memory database: build the schema first
+            await migrate.upgrade(engine)
+        async with engine.connect() as conn:
+            dialect = conn.dialect.name
+            for name, statement in hot_queries():
+                plan = await explain(conn, statement)
+                found = problems(dialect, plan)
+                failures += bool(found)
+                print(f"{'FAIL' if found else 'ok  '}  {name}")
+                for problem in found:
+                    print(f"      -> {problem}")
+                if verbose or found:
+                    print(render(dialect, plan))
+    finally:
+        await engine.dispose()
+    return failures
+
+
+def main():
+    from app.db.session import db_url
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-url', default=db_url)
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every plan, not only failing ones')
+    args = parser.parse_args()
+
+    failures = asyncio.run(check(args.db_url, args.verbose))
+    if failures:
+        print(f"{failures} hot query plan(s) degraded to a full scan or sort")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Chat backends the bot can forward messages to.
+
+``HttpChatBackend`` talks to a separately deployed API over HTTP.
+``LocalChatBackend`` (see ``app.discord_bot.embedded``) calls the chat
+pipeline directly when the bot and the API share one event loop.
+"""
+import json
+from typing import AsyncIterator, List, Optional
+import aiohttp
+from app.discord_bot import config
+from app.discord_bot.http_client import create_session
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class HttpChatBackend:
+    """Forward chat payloads to the /chat endpoints over a pooled HTTP session"""
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Create the shared HTTP session once the event loop is running"""
+        self.session = create_session()
+        logger.info(
+            f"HTTP session ready (pool={config.HTTP_POOL_LIMIT}, "
+            f"per_host={config.HTTP_POOL_LIMIT_PER_HOST})"
+        )
+
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+            logger.info("HTTP session closed")
+
+    async def chat(self, payload: dict) -> dict:
+        """
+        Send a payload to /chat and return the decoded reply
+
+        :param payload: Chat payload
+        :type payload: dict
+        :return: Dictionary with reply
+        """
+        async with self.session.post(config.CHAT_API_URL, json=payload) as resp:
+            return await resp.json()
+
+    async def chat_stream(self, payload: dict) -> AsyncIterator[dict]:
+        """
+        Send a payload to /chat/stream and yield the decoded NDJSON events
+
+        :param payload: Chat payload
+        :type payload: dict
+        :return: Async iterator of event dictionaries
+        """
+        async with self.session.post(config.STREAM_CHAT_API_URL, json=payload) as resp:
+            async for line in resp.content:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def ingest(self, messages: List[dict]) -> int:
+        """
+        Send a batch of channel messages to the ingest endpoint
+
+        :param messages: Channel messages, oldest first
+        :return: Number of messages the API accepted (the rest should be resent)
+        """
+        async with self.session.post(config.INGEST_API_URL, json={'messages': messages}) as resp:
+            if resp.status != 429:
+                resp.raise_for_status()
+            return (await resp.json())['accepted']
+
+    async def opted_in_users(self) -> List[str]:
+        """
+        Fetch the ids of users with a configured role
+
+        :return: List of user IDs
+        """
+        async with self.session.get(config.OPTED_IN_USERS_URL) as resp:
+            resp.raise_for_status()
+            return await resp.json()
@@ -1,16 +1,69 @@
 import discord
-import aiohttp
 import os
 from dotenv import load_dotenv
+from app.discord_bot import config
+from app.discord_bot.backends import HttpChatBackend
+from app.discord_bot.debounce import Debouncer
+from app.discord_bot.dispatcher import Dispatcher, Job
+from app.discord_bot.ingest import ChannelIngestor
+from app.discord_bot.streaming import StreamingReply
+from app.discord_bot.triggers import TriggerPolicy
+from app.utils.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 token = os.getenv('SECRET_KEY')
 
 
 class MyClient(discord.Client):
     """Discord bot client"""
-    
+
+    def __init__(self, *args, backend=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # HTTP by default; embedded mode passes an in-process backend
+        self.backend = backend or HttpChatBackend()
+        self.triggers = TriggerPolicy(self.backend)
+        self.dispatcher = Dispatcher(
+            max_queue=config.DISPATCH_MAX_QUEUE,
+            max_concurrency=config.DISPATCH_MAX_CONCURRENCY,
+            per_user_limit=config.DISPATCH_PER_USER_LIMIT,
+            per_channel_limit=config.DISPATCH_PER_CHANNEL_LIMIT,
+            shed_policy=config.DISPATCH_SHED_POLICY,
+            stats_interval=config.DISPATCH_STATS_INTERVAL,
+        )
+        self.debouncer = Debouncer(
+            window=config.DEBOUNCE_WINDOW,
+            max_wait=config.DEBOUNCE_MAX_WAIT,
+            max_messages=config.DEBOUNCE_MAX_MESSAGES,
+            emit=self.enqueue,
+        )
+        self.ingestor = ChannelIngestor(
+            self.backend,
+            batch_size=config.INGEST_BATCH_SIZE,
+            flush_interval=config.INGEST_FLUSH_INTERVAL,
+            max_buffer=config.INGEST_MAX_BUFFER,
+        ) if config.INGEST_ENABLED else None
+
+    async def setup_hook(self):
+        """Start the chat backend once the event loop is running"""
+        await self.backend.start()
+        await self.triggers.start()
+        await self.dispatcher.start()
+        if self.ingestor:
+            await self.ingestor.start()
+
+    async def close(self):
+        """Close the chat backend before shutting down the gateway"""
+        await self.debouncer.close()
+        await self.dispatcher.close()
+        if self.ingestor:
+            await self.ingestor.close()
+        await self.triggers.close()
+        await self.backend.close()
+        await super().close()
+
     async def on_ready(self):
         """Called when the bot is ready"""
         print(f'Logged on as {self.user}!')
@@ -21,28 +74,95 @@ class MyClient(discord.Client):
         
         :param message: Discord message object
         """
+        if self.ingestor:
+            # Every visible message, bots included, goes to channel_messages
+            self.ingestor.add({
+                "server_id": str(message.guild.id) if message.guild else "dm",
+                "channel_id": str(message.channel.id),
+                "user_id": str(message.author),
+                "content": message.content,
+                "dateTime": message.created_at.replace(tzinfo=None).isoformat(),
+            })
         if message.author.bot:
             return
+        if not self.triggers.should_forward(message, self.user):
+            return
             
         print(message.author)
         
         payload = {
             "user_id": str(message.author),
-            "server_id":str(message.guild.id),
+            "server_id": str(message.guild.id) if message.guild else "dm",
             "channel_id": str(message.channel.id),
-            "content": message.content
+            "content": self.triggers.strip_prefix(message.content),
+            "message_id": str(message.id)
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "http://127.0.0.1:8000/chat",
-                json=payload
-            ) as resp:
-                data = await resp.json()
-
-        await message.channel.send(data['reply'])
+        await self.debouncer.add(message, payload)
+
+    async def enqueue(self, message, payload: dict):
+        """
+        Queue a (possibly merged) payload on the dispatcher
+
+        :param message: Last Discord message of the burst
+        :param payload: Chat payload to send
+        :type payload: dict
+        """
+        await self.dispatcher.submit(Job(
+            guild_id=payload["server_id"],
+            user_id=payload["user_id"],
+            channel_id=payload["channel_id"],
+            run=lambda: self.respond(message, payload),
+            on_shed=lambda: self.reply_busy(message),
+        ))
+
+    async def respond(self, message, payload: dict):
+        """
+        Forward a message to the chat backend and send the reply
+
+        :param message: Discord message object
+        :param payload: Chat payload to send
+        :type payload: dict
+        """
+        if config.STREAM_REPLIES:
+            await self.forward_streaming(message, payload)
+        else:
+            data = await self.backend.chat(payload)
+            await message.channel.send(data['reply'])
         print(f'Message from {message.author}: {message.content}')
 
+    async def reply_busy(self, message):
+        """Tell the user their message was dropped because the bot is overloaded"""
+        if config.DISPATCH_BUSY_REPLY:
+            await message.channel.send(config.DISPATCH_BUSY_REPLY)
+
+    async def forward_streaming(self, message, payload: dict):
+        """
+        Forward a message to the streaming backend and edit the reply as chunks arrive
+
+        :param message: Discord message object
+        :param payload: Chat payload to send
+        :type payload: dict
+        """
+        reply = StreamingReply(
+            message.channel,
+            placeholder=config.STREAM_PLACEHOLDER,
+            edit_interval=config.STREAM_EDIT_INTERVAL,
+            empty_text=config.STREAM_EMPTY_REPLY,
+        )
+        await reply.start()
+
+        finished = False
+        async for event in self.backend.chat_stream(payload):
+            if event['type'] == 'chunk':
+                await reply.feed(event['text'])
+            elif event['type'] == 'done':
+                await reply.finish(event['reply'])
+                finished = True
+        if not finished:
+            # Stream ended without a final event: settle on what arrived so far
+            await reply.finish(reply.text)
+
 
 def run_bot():
     """Initialize and run the Discord bot"""
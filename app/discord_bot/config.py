@@ -0,0 +1,86 @@
+"""
+Runtime configuration for the Discord bot, read from the environment.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Backend chat endpoint the bot forwards messages to
+CHAT_API_URL = os.getenv('BOT_CHAT_URL', 'http://127.0.0.1:8000/chat')
+
+# Ids of users with a configured role, used by the trigger policy
+OPTED_IN_USERS_URL = os.getenv('BOT_OPTED_IN_USERS_URL', 'http://127.0.0.1:8000/api/roles/user-ids')
+
+# Connection pool for the long-lived aiohttp session
+HTTP_POOL_LIMIT = int(os.getenv('BOT_HTTP_POOL_LIMIT', '100'))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('BOT_HTTP_POOL_LIMIT_PER_HOST', '30'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('BOT_HTTP_KEEPALIVE_TIMEOUT', '60'))
+HTTP_DNS_CACHE_TTL = int(os.getenv('BOT_HTTP_DNS_CACHE_TTL', '300'))
+
+# Request timeouts in seconds (total covers the whole LLM round trip)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('BOT_HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_TOTAL_TIMEOUT = float(os.getenv('BOT_HTTP_TOTAL_TIMEOUT', '60'))
+
+# Stream replies from /chat/stream and edit the Discord message progressively
+STREAM_REPLIES = os.getenv('BOT_STREAM_REPLIES', 'false').lower() == 'true'
+STREAM_CHAT_API_URL = os.getenv('BOT_STREAM_CHAT_URL', 'http://127.0.0.1:8000/chat/stream')
+STREAM_PLACEHOLDER = os.getenv('BOT_STREAM_PLACEHOLDER', '...')
+# Replaces the placeholder when the stream ends without any reply text
+STREAM_EMPTY_REPLY = os.getenv('BOT_STREAM_EMPTY_REPLY', "Sorry, I couldn't come up with a reply.")
+# Minimum seconds between edits of the same message (Discord allows ~5 edits / 5s)
+STREAM_EDIT_INTERVAL = float(os.getenv('BOT_STREAM_EDIT_INTERVAL', '1.0'))
+
+# Embedded mode: bind address of the FastAPI app sharing the bot's event loop
+EMBEDDED_API_HOST = os.getenv('BOT_EMBEDDED_API_HOST', '127.0.0.1')
+EMBEDDED_API_PORT = int(os.getenv('BOT_EMBEDDED_API_PORT', '8000'))
+
+# Trigger policy: "all" forwards every message (legacy), "filtered" only
+# forwards messages matching one of the triggers below
+TRIGGER_MODE = os.getenv('BOT_TRIGGER_MODE', 'all').lower()
+TRIGGER_ON_MENTION = os.getenv('BOT_TRIGGER_ON_MENTION', 'true').lower() == 'true'
+TRIGGER_ON_REPLY = os.getenv('BOT_TRIGGER_ON_REPLY', 'true').lower() == 'true'
+TRIGGER_ON_DM = os.getenv('BOT_TRIGGER_ON_DM', 'true').lower() == 'true'
+# Users with a row in the role table are opted in everywhere
+TRIGGER_ON_ROLE = os.getenv('BOT_TRIGGER_ON_ROLE', 'true').lower() == 'true'
+TRIGGER_PREFIX = os.getenv('BOT_TRIGGER_PREFIX', '')
+# Comma separated ids; every message in these channels/guilds triggers
+TRIGGER_CHANNELS = {c.strip() for c in os.getenv('BOT_TRIGGER_CHANNELS', '').split(',') if c.strip()}
+TRIGGER_GUILDS = {g.strip() for g in os.getenv('BOT_TRIGGER_GUILDS', '').split(',') if g.strip()}
+# Seconds between refreshes of the cached opt-in list
+TRIGGER_REFRESH_INTERVAL = float(os.getenv('BOT_TRIGGER_REFRESH_INTERVAL', '300'))
+# Seconds between forwarded/filtered count log lines (0 disables)
+TRIGGER_STATS_INTERVAL = float(os.getenv('BOT_TRIGGER_STATS_INTERVAL', '60'))
+
+# Dispatcher: bounded queue between on_message and the chat backend
+DISPATCH_MAX_QUEUE = int(os.getenv('BOT_DISPATCH_MAX_QUEUE', '200'))
+DISPATCH_MAX_CONCURRENCY = int(os.getenv('BOT_DISPATCH_MAX_CONCURRENCY', '10'))
+DISPATCH_PER_USER_LIMIT = int(os.getenv('BOT_DISPATCH_PER_USER_LIMIT', '1'))
+DISPATCH_PER_CHANNEL_LIMIT = int(os.getenv('BOT_DISPATCH_PER_CHANNEL_LIMIT', '3'))
+# What to do when the queue is full: "drop_oldest" or "reject"
+DISPATCH_SHED_POLICY = os.getenv('BOT_DISPATCH_SHED_POLICY', 'reject').lower()
+# Reply sent for shed messages; empty string drops them silently
+DISPATCH_BUSY_REPLY = os.getenv('BOT_DISPATCH_BUSY_REPLY', "I'm a bit swamped right now, try again in a moment.")
+DISPATCH_STATS_INTERVAL = float(os.getenv('BOT_DISPATCH_STATS_INTERVAL', '60'))
+
+# Debounce: merge bursts from the same user in the same channel into one request.
+# Window in seconds after the last message (0 disables), capped by max wait
+DEBOUNCE_WINDOW = float(os.getenv('BOT_DEBOUNCE_WINDOW', '0'))
+DEBOUNCE_MAX_WAIT = float(os.getenv('BOT_DEBOUNCE_MAX_WAIT', '5'))
+DEBOUNCE_MAX_MESSAGES = int(os.getenv('BOT_DEBOUNCE_MAX_MESSAGES', '8'))
+
+# Sharded launcher: total shards across all workers (0 = one per worker process)
+SHARD_COUNT = int(os.getenv('BOT_SHARD_COUNT', '0'))
+SHARD_PROCESSES = int(os.getenv('BOT_SHARD_PROCESSES', str(os.cpu_count() or 1)))
+SHARD_STATS_INTERVAL = float(os.getenv('BOT_SHARD_STATS_INTERVAL', '30'))
+# Restart backoff for dead shard workers, in seconds
+SHARD_RESTART_BACKOFF = float(os.getenv('BOT_SHARD_RESTART_BACKOFF', '5'))
+SHARD_RESTART_BACKOFF_MAX = float(os.getenv('BOT_SHARD_RESTART_BACKOFF_MAX', '300'))
+
+# Channel ingestion: stream every visible message into channel_messages in batches
+INGEST_ENABLED = os.getenv('BOT_INGEST_ENABLED', 'false').lower() == 'true'
+INGEST_API_URL = os.getenv('BOT_INGEST_URL', 'http://127.0.0.1:8000/api/channel-messages')
+INGEST_BATCH_SIZE = int(os.getenv('BOT_INGEST_BATCH_SIZE', '500'))
+INGEST_FLUSH_INTERVAL = float(os.getenv('BOT_INGEST_FLUSH_INTERVAL', '1.0'))
+# Messages buffered in the bot while the API is slow or down; the oldest are dropped beyond it
+INGEST_MAX_BUFFER = int(os.getenv('BOT_INGEST_MAX_BUFFER', '20000'))
@@ -0,0 +1,108 @@
+"""
+Per user/channel debouncing of message bursts.
+
+Consecutive messages from the same user in the same channel that arrive
+within the debounce window are merged into a single payload, so a burst
+of short messages costs one LLM call and one stored row instead of one
+per message.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Burst:
+    __slots__ = ('message', 'payload', 'contents', 'started_at', 'task')
+
+    def __init__(self, message, payload: dict):
+        self.message = message
+        self.payload = payload
+        self.contents: List[str] = [payload['content']]
+        self.started_at = time.perf_counter()
+        self.task: Optional[asyncio.Task] = None
+
+
+class Debouncer:
+    """
+    Coalesce bursts of messages before handing them to ``emit``
+
+    :param window: Seconds of silence that close a burst (0 disables debouncing)
+    :param max_wait: Maximum seconds a burst may stay open
+    :param max_messages: Maximum messages merged into one burst
+    :param emit: Coroutine called with ``(message, payload)`` for each burst,
+        where ``message`` is the last Discord message of the burst
+    """
+
+    def __init__(
+        self,
+        window: float,
+        max_wait: float,
+        max_messages: int,
+        emit: Callable[[object, dict], Awaitable[None]],
+    ):
+        self.window = window
+        self.max_wait = max_wait
+        self.max_messages = max_messages
+        self.emit = emit
+        self._bursts: Dict[Tuple[str, str], _Burst] = {}
+        self.messages_in = 0
+        self.bursts_out = 0
+
+    async def add(self, message, payload: dict):
+        """
+        Add a message to its user/channel burst
+
+        :param message: Discord message object
+        :param payload: Chat payload for this message
+        :type payload: dict
+        """
+        self.messages_in += 1
+        if self.window <= 0:
+            self.bursts_out += 1
+            await self.emit(message, payload)
+            return
+
+        key = (payload['user_id'], payload['channel_id'])
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst(message, payload)
+        else:
+            burst.task.cancel()
+            burst.message = message
+            burst.payload = payload
+            burst.contents.append(payload['content'])
+
+        remaining = self.max_wait - (time.perf_counter() - burst.started_at)
+        if len(burst.contents) >= self.max_messages or remaining <= 0:
+            await self._flush(key)
+        else:
+            burst.task = asyncio.create_task(self._flush_after(key, min(self.window, remaining)))
+
+    async def close(self):
+        """Flush every open burst immediately"""
+        for key in list(self._bursts):
+            self._bursts[key].task.cancel()
+            await self._flush(key)
+
+    async def _flush_after(self, key: Tuple[str, str], delay: float):
+        await asyncio.sleep(delay)
+        await self._flush(key)
+
+    async def _flush(self, key: Tuple[str, str]):
+        burst = self._bursts.pop(key, None)
+        if burst is None:
+            return
+        payload = dict(burst.payload, content="\n".join(burst.contents))
+        self.bursts_out += 1
+        if len(burst.contents) > 1:
+            logger.info(
+                f"Merged {len(burst.contents)} messages from user {key[0]} in channel {key[1]} "
+                f"(total in={self.messages_in}, out={self.bursts_out})"
+            )
+        try:
+            await self.emit(burst.message, payload)
+        except Exception as e:
+            logger.error(f"Failed to emit burst for user {key[0]}: {e}", exc_info=True)
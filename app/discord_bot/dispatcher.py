@@ -0,0 +1,225 @@
+"""
+Bounded work queue between the Discord gateway and the chat backend.
+
+Caps the number of in-flight chat requests globally and per user/channel,
+serves guilds round-robin so one busy guild cannot starve the others,
+and sheds load explicitly once the queue is full.
+"""
+import asyncio
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Job:
+    """A unit of work queued by the dispatcher"""
+
+    __slots__ = ('guild_id', 'user_id', 'channel_id', 'run', 'on_shed', 'enqueued_at')
+
+    def __init__(
+        self,
+        guild_id: str,
+        user_id: str,
+        channel_id: str,
+        run: Callable[[], Awaitable[None]],
+        on_shed: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.run = run
+        self.on_shed = on_shed
+        self.enqueued_at = time.perf_counter()
+
+
+class DispatcherStats:
+    """Counters and wait-time aggregates exposed by the dispatcher"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def as_dict(self, queue_depth: int, in_flight: int) -> dict:
+        started = self.completed + self.failed
+        return {
+            'queue_depth': queue_depth,
+            'in_flight': in_flight,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'shed': self.shed,
+            'avg_wait_ms': self.total_wait_ms / started if started else 0.0,
+            'max_wait_ms': self.max_wait_ms,
+        }
+
+
+class Dispatcher:
+    """
+    Bounded, fair dispatcher for chat jobs
+
+    :param max_queue: Maximum number of queued (not yet running) jobs
+    :param max_concurrency: Maximum number of jobs running at once
+    :param per_user_limit: Maximum in-flight jobs per user
+    :param per_channel_limit: Maximum in-flight jobs per channel
+    :param shed_policy: ``"drop_oldest"`` or ``"reject"`` when the queue is full
+    :param stats_interval: Seconds between stats log lines (0 disables)
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        max_concurrency: int,
+        per_user_limit: int,
+        per_channel_limit: int,
+        shed_policy: str = 'reject',
+        stats_interval: float = 60,
+    ):
+        self.max_queue = max_queue
+        self.max_concurrency = max_concurrency
+        self.per_user_limit = per_user_limit
+        self.per_channel_limit = per_channel_limit
+        self.shed_policy = shed_policy
+        self.stats_interval = stats_interval
+
+        # guild_id -> FIFO of jobs; OrderedDict order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._depth = 0
+        self._in_flight = 0
+        self._user_in_flight: Dict[str, int] = defaultdict(int)
+        self._channel_in_flight: Dict[str, int] = defaultdict(int)
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self.stats = DispatcherStats()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def snapshot(self) -> dict:
+        """Return the current queue metrics"""
+        return self.stats.as_dict(self._depth, self._in_flight)
+
+    async def start(self):
+        """Start the worker tasks"""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+        if self.stats_interval > 0:
+            self._tasks.append(asyncio.create_task(self._report_forever()))
+        logger.info(
+            f"Dispatcher started (queue={self.max_queue}, concurrency={self.max_concurrency}, "
+            f"per_user={self.per_user_limit}, per_channel={self.per_channel_limit}, shed={self.shed_policy})"
+        )
+
+    async def close(self):
+        """Stop the workers; queued jobs are discarded"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job: Job) -> bool:
+        """
+        Queue a job, shedding load if the queue is full
+
+        :param job: Job to queue
+        :type job: Job
+        :return: True if the job was queued, False if it was rejected
+        """
+        self.stats.submitted += 1
+        if self._depth >= self.max_queue:
+            if self.shed_policy == 'drop_oldest':
+                await self._shed(self._pop_oldest())
+            else:
+                await self._shed(job)
+                return False
+
+        self._queues.setdefault(job.guild_id, deque()).append(job)
+        self._depth += 1
+        self._wakeup.set()
+        return True
+
+    def _pop_oldest(self) -> Job:
+        oldest_guild = min(self._queues, key=lambda g: self._queues[g][0].enqueued_at)
+        job = self._queues[oldest_guild].popleft()
+        if not self._queues[oldest_guild]:
+            del self._queues[oldest_guild]
+        self._depth -= 1
+        return job
+
+    async def _shed(self, job: Job):
+        self.stats.shed += 1
+        logger.warning(
+            f"Dispatcher queue full ({self.max_queue} jobs), shedding message "
+            f"from user {job.user_id} in channel {job.channel_id}"
+        )
+        if job.on_shed:
+            try:
+                await job.on_shed()
+            except Exception as e:
+                logger.error(f"Shed callback failed: {e}", exc_info=True)
+
+    def _eligible(self, job: Job) -> bool:
+        return (
+            self._user_in_flight[job.user_id] < self.per_user_limit
+            and self._channel_in_flight[job.channel_id] < self.per_channel_limit
+        )
+
+    def _next_job(self) -> Optional[Job]:
+        """Pick the next runnable job, visiting guilds round-robin"""
+        for guild_id in list(self._queues):
+            queue = self._queues[guild_id]
+            for i, job in enumerate(queue):
+                if self._eligible(job):
+                    del queue[i]
+                    # Move this guild to the back of the rotation
+                    self._queues.move_to_end(guild_id)
+                    if not queue:
+                        del self._queues[guild_id]
+                    self._depth -= 1
+                    return job
+        return None
+
+    async def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            wait_ms = (time.perf_counter() - job.enqueued_at) * 1000
+            self.stats.total_wait_ms += wait_ms
+            self.stats.max_wait_ms = max(self.stats.max_wait_ms, wait_ms)
+
+            self._in_flight += 1
+            self._user_in_flight[job.user_id] += 1
+            self._channel_in_flight[job.channel_id] += 1
+            try:
+                await job.run()
+                self.stats.completed += 1
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"Dispatched job for user {job.user_id} failed: {e}", exc_info=True)
+            finally:
+                self._in_flight -= 1
+                self._release(self._user_in_flight, job.user_id)
+                self._release(self._channel_in_flight, job.channel_id)
+                # A per-key slot opened up; other workers may now find work
+                self._wakeup.set()
+
+    @staticmethod
+    def _release(counts: Dict[str, int], key: str):
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
+
+    async def _report_forever(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            logger.info(f"Dispatcher stats: {self.snapshot()}")
@@ -0,0 +1,124 @@
+"""
+Embedded single-node mode: the FastAPI app and the Discord bot share one
+asyncio event loop, and the bot calls the chat pipeline in-process instead
+of POSTing to /chat over loopback.
+
+Usage:
+    python -m app.discord_bot.embedded
+"""
+import asyncio
+from typing import AsyncIterator, List
+import discord
+import uvicorn
+from app.db.session import AsyncSessionLocal
+from app.discord_bot import config
+from app.discord_bot.bot import MyClient, token
+from app.main import app
+from app.schemas.chat import ChannelMessageIn, Payload
+from app.services.chat_service import process_chat, process_chat_stream
+from app.services.message_service import get_all_messages
+from app.services.role_service import get_role_user_ids
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LocalChatBackend:
+    """Call process_chat directly with a session from AsyncSessionLocal"""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def chat(self, payload: dict) -> dict:
+        """
+        Run the chat pipeline in-process
+
+        :param payload: Chat payload
+        :type payload: dict
+        :return: Dictionary with reply
+        """
+        async with AsyncSessionLocal() as db:
+            return await process_chat(Payload(**payload), db)
+
+    async def chat_stream(self, payload: dict) -> AsyncIterator[dict]:
+        """
+        Run the streaming chat pipeline in-process
+
+        :param payload: Chat payload
+        :type payload: dict
+        :return: Async iterator of event dictionaries
+        """
+        async with AsyncSessionLocal() as db:
+            async for event in process_chat_stream(Payload(**payload), db):
+                yield event
+
+    async def ingest(self, messages: List[dict]) -> int:
+        """
+        Queue a batch of channel messages in-process
+
+        :param messages: Channel messages, oldest first
+        :return: Number of messages accepted (the rest should be resent)
+        """
+        async with AsyncSessionLocal() as db:
+            return await get_all_messages([ChannelMessageIn(**m) for m in messages], db)
+
+    async def opted_in_users(self) -> List[str]:
+        """
+        Fetch the ids of users with a configured role
+
+        :return: List of user IDs
+        """
+        async with AsyncSessionLocal() as db:
+            return await get_role_user_ids(db)
+
+
+async def serve():
+    """Run uvicorn and the Discord client concurrently on the current loop"""
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        host=config.EMBEDDED_API_HOST,
+        port=config.EMBEDDED_API_PORT,
+        log_level="info",
+    ))
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    client = MyClient(backend=LocalChatBackend(), intents=intents)
+
+    bot_error = None
+
+    def bot_done(task: asyncio.Task):
+        # The bot stopped on its own (bad token, lost gateway): take the API down with it
+        nonlocal bot_error
+        if task.cancelled() or server.should_exit:
+            return
+        bot_error = task.exception()
+        if bot_error:
+            logger.error(f"Discord client failed, stopping embedded mode: {bot_error}", exc_info=bot_error)
+        else:
+            logger.error("Discord client stopped, stopping embedded mode")
+        server.should_exit = True
+
+    logger.info(f"Starting embedded mode (API on {config.EMBEDDED_API_HOST}:{config.EMBEDDED_API_PORT})")
+    bot_task = asyncio.create_task(client.start(token))
+    bot_task.add_done_callback(bot_done)
+    try:
+        await server.serve()
+    finally:
+        # uvicorn returned (e.g. Ctrl+C): shut the bot down with it
+        await client.close()
+        await asyncio.gather(bot_task, return_exceptions=True)
+    if bot_error:
+        raise bot_error
+
+
+def run_embedded():
+    """Entry point for embedded mode"""
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    run_embedded()
@@ -0,0 +1,27 @@
+"""
+Shared HTTP session used by the bot to talk to the backend API.
+"""
+import aiohttp
+from app.discord_bot import config
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Create a long-lived aiohttp session with a keep-alive connection pool
+
+    Must be called from inside a running event loop.
+
+    :return: Configured client session
+    :rtype: aiohttp.ClientSession
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_LIMIT,
+        limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=config.HTTP_TOTAL_TIMEOUT,
+        connect=config.HTTP_CONNECT_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
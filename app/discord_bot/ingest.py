@@ -0,0 +1,154 @@
+"""
+Bulk ingestion of every message the bot can see into ``channel_messages``.
+
+``on_message`` only appends to a bounded in-memory buffer; a background
+task ships it to the backend in batches, every ``flush_interval`` seconds
+or as soon as ``batch_size`` messages are waiting. When the backend
+refuses part of a batch (its write queue is full) the rest is put back
+and retried with backoff. If the buffer itself fills up, the oldest
+messages are dropped and counted, so memory stays bounded and reply
+handling never waits on ingestion.
+"""
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ChannelIngestor:
+    """
+    Buffer channel messages and flush them to ``backend.ingest`` in batches
+
+    :param backend: Chat backend with an ``ingest(messages) -> accepted`` coroutine
+    :param batch_size: Maximum messages per request
+    :param flush_interval: Maximum seconds a message waits in the buffer
+    :param max_buffer: Maximum buffered messages; the oldest are dropped beyond it
+    :param max_backoff: Cap in seconds for the retry delay after a refused or failed batch
+    """
+
+    def __init__(self, backend, batch_size: int, flush_interval: float, max_buffer: int, max_backoff: float = 30.0):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self._buffer: Deque[dict] = deque(maxlen=max_buffer)
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.received = 0
+        self.sent = 0
+        self.dropped = 0
+        self.refused = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the flusher on the running loop"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Channel ingest started (batch={self.batch_size}, interval={self.flush_interval}s, "
+                f"buffer={self._buffer.maxlen})"
+            )
+
+    async def close(self):
+        """Stop the flusher and make one last attempt to send what is buffered"""
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            while self._buffer:
+                batch = self._take()
+                accepted = await self.backend.ingest(batch)
+                self.sent += accepted
+                if accepted < len(batch):
+                    self.dropped += len(self._buffer) + len(batch) - accepted
+                    break
+        except Exception as e:
+            self.dropped += len(self._buffer)
+            logger.warning(f"Final channel ingest flush failed: {e}")
+        self._buffer.clear()
+        logger.info(f"Channel ingest stopped ({self.stats()})")
+
+    def add(self, message: dict):
+        """
+        Buffer one message without waiting
+
+        :param message: Channel message (server_id, channel_id, user_id, content, dateTime)
+        :type message: dict
+        """
+        self.received += 1
+        if len(self._buffer) == self._buffer.maxlen:
+            # deque(maxlen) drops the oldest entry on append
+            self.dropped += 1
+        self._buffer.append(message)
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    def _take(self) -> List[dict]:
+        count = min(self.batch_size, len(self._buffer))
+        return [self._buffer.popleft() for _ in range(count)]
+
+    def _put_back(self, messages: List[dict]):
+        """Return unsent messages to the front of the buffer, dropping what no longer fits"""
+        room = self._buffer.maxlen - len(self._buffer)
+        if len(messages) > room:
+            self.dropped += len(messages) - room
+            messages = messages[len(messages) - room:] if room else []
+        self._buffer.extendleft(reversed(messages))
+
+    async def _run(self):
+        backoff = 0.0
+        while True:
+            if backoff:
+                await asyncio.sleep(backoff)
+            elif len(self._buffer) < self.batch_size:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if not self._buffer:
+                backoff = 0.0
+                continue
+
+            batch = self._take()
+            try:
+                accepted = await self.backend.ingest(batch)
+            except asyncio.CancelledError:
+                self._put_back(batch)
+                raise
+            except Exception as e:
+                self.failures += 1
+                self._put_back(batch)
+                backoff = min(self.max_backoff, max(backoff * 2, 0.5))
+                logger.warning(f"Channel ingest of {len(batch)} messages failed, retrying in {backoff:.1f}s: {e}")
+                continue
+
+            self.sent += accepted
+            if accepted < len(batch):
+                # Backend queue is full: resend the rest once it has drained a bit
+                self.refused += len(batch) - accepted
+                self._put_back(batch[accepted:])
+                backoff = min(self.max_backoff, max(backoff * 2, 0.5))
+                logger.debug(f"Channel ingest backpressure, {len(batch) - accepted} refused, waiting {backoff:.1f}s")
+            else:
+                backoff = 0.0
+
+    def stats(self) -> dict:
+        """Return ingestion counters"""
+        return {
+            'buffered': len(self._buffer),
+            'received': self.received,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'refused': self.refused,
+            'failures': self.failures,
+        }
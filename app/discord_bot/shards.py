@@ -0,0 +1,191 @@
+"""
+Sharded bot runtime.
+
+A supervisor process spawns worker processes, each running an
+``AutoShardedClient`` that owns a contiguous range of shard ids. Dead
+workers are restarted with exponential backoff and per-shard gateway
+latency and event rates are aggregated in the supervisor's log.
+
+Usage:
+    python -m app.discord_bot.shards
+"""
+import asyncio
+import multiprocessing as mp
+import queue
+import time
+from collections import defaultdict
+from typing import Dict, List
+import discord
+from app.discord_bot import config
+from app.discord_bot.bot import MyClient, token
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ShardedClient(MyClient, discord.AutoShardedClient):
+    """MyClient running a range of shards and reporting per-shard stats"""
+
+    def __init__(self, *args, worker_id: int, stats_queue, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.worker_id = worker_id
+        self.stats_queue = stats_queue
+        self.events: Dict[int, int] = defaultdict(int)
+
+    async def setup_hook(self):
+        await super().setup_hook()
+        self._stats_task = asyncio.create_task(self._report_forever())
+
+    async def on_message(self, message):
+        shard_id = message.guild.shard_id if message.guild else 0
+        self.events[shard_id] += 1
+        await super().on_message(message)
+
+    async def _report_forever(self):
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(config.SHARD_STATS_INTERVAL)
+            now = time.monotonic()
+            elapsed = now - last
+            last = now
+            stats = {
+                shard_id: {
+                    'latency_ms': latency * 1000,
+                    'events_per_s': self.events.pop(shard_id, 0) / elapsed,
+                }
+                for shard_id, latency in self.latencies
+            }
+            self.stats_queue.put((self.worker_id, stats))
+
+
+def split_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    Split shard ids into contiguous ranges, one per worker
+
+    :param shard_count: Total number of shards
+    :type shard_count: int
+    :param workers: Number of worker processes
+    :type workers: int
+    :return: List of shard id lists
+    """
+    workers = min(workers, shard_count)
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def run_worker(worker_id: int, shard_ids: List[int], shard_count: int, stats_queue):
+    """Entry point of a shard worker process"""
+    intents = discord.Intents.default()
+    intents.message_content = True
+
+    client = ShardedClient(
+        worker_id=worker_id,
+        stats_queue=stats_queue,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        intents=intents,
+    )
+    logger.info(f"Worker {worker_id} starting shards {shard_ids} of {shard_count}")
+    client.run(token)
+
+
+class ShardSupervisor:
+    """Start shard workers, restart them when they die and aggregate their stats"""
+
+    def __init__(self, shard_count: int, processes: int):
+        self.shard_count = shard_count or processes
+        self.ranges = split_shards(self.shard_count, processes)
+        self.ctx = mp.get_context('spawn')
+        self.stats_queue = self.ctx.Queue()
+        self.workers: Dict[int, mp.Process] = {}
+        self.restarts: Dict[int, int] = defaultdict(int)
+        self.next_start: Dict[int, float] = {}
+        self.shard_stats: Dict[int, dict] = {}
+
+    def _start(self, worker_id: int):
+        process = self.ctx.Process(
+            target=run_worker,
+            args=(worker_id, self.ranges[worker_id], self.shard_count, self.stats_queue),
+            name=f"shard-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[worker_id] = process
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker_id, process in self.workers.items():
+            if process.is_alive():
+                continue
+            if worker_id not in self.next_start:
+                self.restarts[worker_id] += 1
+                backoff = min(
+                    config.SHARD_RESTART_BACKOFF * 2 ** (self.restarts[worker_id] - 1),
+                    config.SHARD_RESTART_BACKOFF_MAX,
+                )
+                self.next_start[worker_id] = now + backoff
+                logger.warning(
+                    f"Shard worker {worker_id} (shards {self.ranges[worker_id]}) exited with code "
+                    f"{process.exitcode}, restarting in {backoff:.0f}s"
+                )
+            elif now >= self.next_start[worker_id]:
+                del self.next_start[worker_id]
+                self._start(worker_id)
+
+    def _drain_stats(self):
+        while True:
+            try:
+                _, stats = self.stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.shard_stats.update(stats)
+
+    def _log_stats(self):
+        if not self.shard_stats:
+            return
+        latencies = [s['latency_ms'] for s in self.shard_stats.values()]
+        events = sum(s['events_per_s'] for s in self.shard_stats.values())
+        logger.info(
+            f"Shards: {len(self.shard_stats)}/{self.shard_count} reporting, "
+            f"latency avg={sum(latencies) / len(latencies):.1f}ms max={max(latencies):.1f}ms, "
+            f"events={events:.1f}/s, restarts={dict(self.restarts)}"
+        )
+        for shard_id, s in sorted(self.shard_stats.items()):
+            logger.debug(f"Shard {shard_id}: latency={s['latency_ms']:.1f}ms events={s['events_per_s']:.2f}/s")
+
+    def run(self):
+        """Run the supervisor loop until interrupted"""
+        logger.info(f"Starting {len(self.ranges)} shard workers for {self.shard_count} shards")
+        for worker_id in range(len(self.ranges)):
+            self._start(worker_id)
+
+        last_report = time.monotonic()
+        try:
+            while True:
+                time.sleep(1)
+                self._check_workers()
+                self._drain_stats()
+                if time.monotonic() - last_report >= config.SHARD_STATS_INTERVAL:
+                    last_report = time.monotonic()
+                    self._log_stats()
+        except KeyboardInterrupt:
+            logger.info("Stopping shard workers")
+        finally:
+            for process in self.workers.values():
+                process.terminate()
+            for process in self.workers.values():
+                process.join(timeout=10)
+
+
+def run_sharded():
+    """Entry point for the sharded launcher"""
+    ShardSupervisor(config.SHARD_COUNT, config.SHARD_PROCESSES).run()
+
+
+if __name__ == "__main__":
+    run_sharded()
@@ -0,0 +1,128 @@
+"""
+Progressive Discord replies driven by the streaming /chat endpoint.
+"""
+import time
+from typing import List, Optional
+import discord
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Hard limit on the length of a single Discord message
+DISCORD_MAX_LENGTH = 2000
+
+
+def split_pages(text: str, max_length: int = DISCORD_MAX_LENGTH) -> List[str]:
+    """
+    Split text into Discord-sized pages, preferring line and word boundaries
+
+    Page boundaries only depend on the text before them, so pages that are
+    already full never change as more text is appended.
+
+    :param text: Text to split
+    :type text: str
+    :param max_length: Maximum characters per page
+    :type max_length: int
+    :return: List of pages
+    """
+    pages = []
+    while len(text) > max_length:
+        cut = text.rfind('\n', 0, max_length)
+        if cut <= 0:
+            cut = text.rfind(' ', 0, max_length)
+        if cut <= 0:
+            cut = max_length
+        pages.append(text[:cut])
+        text = text[cut:].lstrip('\n ')
+    pages.append(text)
+    return pages
+
+
+class StreamingReply:
+    """
+    A reply that is posted as a placeholder and edited as chunks arrive
+
+    Edits are coalesced so a message is edited at most once per
+    ``edit_interval`` seconds, which keeps the bot inside Discord's
+    per-channel edit rate limit. Text past the 2000 character limit
+    overflows into follow-up messages; pages left over when the final reply
+    is shorter than what was streamed are deleted.
+    """
+
+    def __init__(
+        self,
+        channel: discord.abc.Messageable,
+        placeholder: str,
+        edit_interval: float,
+        started_at: Optional[float] = None,
+        empty_text: str = "",
+    ):
+        self.channel = channel
+        self.placeholder = placeholder
+        self.edit_interval = edit_interval
+        self.empty_text = empty_text
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.text = ""
+        self.messages: List[discord.Message] = []
+        self.rendered: List[str] = []
+        self.last_edit = 0.0
+        self.first_visible_ms: Optional[float] = None
+
+    async def start(self):
+        """Post the placeholder message"""
+        message = await self.channel.send(self.placeholder)
+        self.messages.append(message)
+        self.rendered.append(self.placeholder)
+
+    async def feed(self, text: str):
+        """
+        Append a chunk and edit the message if the edit interval has passed
+
+        :param text: Newly generated text
+        :type text: str
+        """
+        self.text += text
+        if time.perf_counter() - self.last_edit >= self.edit_interval:
+            await self.flush()
+
+    async def finish(self, final_text: str):
+        """
+        Render the final reply, replacing whatever was streamed so far
+
+        An empty reply is rendered as ``empty_text`` so the placeholder
+        never stays up.
+
+        :param final_text: Complete reply text
+        :type final_text: str
+        """
+        self.text = final_text if final_text.strip() else self.empty_text
+        await self.flush()
+
+    async def flush(self):
+        """Push the current text to Discord, editing or sending only changed pages"""
+        if not self.text.strip():
+            return
+        self.last_edit = time.perf_counter()
+
+        pages = [page for page in split_pages(self.text) if page]
+        for i, page in enumerate(pages):
+            if i < len(self.messages):
+                if self.rendered[i] != page:
+                    await self.messages[i].edit(content=page)
+                    self.rendered[i] = page
+            else:
+                self.messages.append(await self.channel.send(page))
+                self.rendered.append(page)
+
+        # The text shrank (e.g. a fallback reply after partial chunks): drop stale pages
+        while len(self.messages) > len(pages):
+            message = self.messages.pop()
+            self.rendered.pop()
+            try:
+                await message.delete()
+            except discord.HTTPException as e:
+                logger.warning(f"Could not delete surplus reply page: {e}")
+
+        if self.first_visible_ms is None:
+            self.first_visible_ms = (time.perf_counter() - self.started_at) * 1000
+            logger.info(f"Time to first visible token: {self.first_visible_ms:.2f}ms")
@@ -0,0 +1,112 @@
+"""
+Gateway-side trigger policy deciding which messages reach the chat backend.
+
+Evaluated in the bot before any network I/O so that chatter in busy
+channels does not cost DB queries and an LLM call per message.
+"""
+import asyncio
+from typing import List, Set
+import discord
+from app.discord_bot import config
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TriggerPolicy:
+    """
+    Decide whether a Discord message should be forwarded to /chat
+
+    The set of opted-in users (users with a row in the role table) is
+    cached in memory and refreshed every ``TRIGGER_REFRESH_INTERVAL``
+    seconds from the chat backend. Forwarded and filtered counts are logged
+    every ``TRIGGER_STATS_INTERVAL`` seconds.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.opted_in: Set[str] = set()
+        self.forwarded = 0
+        self.filtered = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def stats(self) -> dict:
+        """Return the trigger counters"""
+        return {'forwarded': self.forwarded, 'filtered': self.filtered, 'opted_in': len(self.opted_in)}
+
+    async def start(self):
+        """Start the stats log and, when role triggers are used, load the opt-in list and refresh it"""
+        if config.TRIGGER_STATS_INTERVAL > 0:
+            self._tasks.append(asyncio.create_task(self._report_forever()))
+        if config.TRIGGER_MODE == 'all' or not config.TRIGGER_ON_ROLE:
+            return
+        await self.refresh()
+        self._tasks.append(asyncio.create_task(self._refresh_forever()))
+
+    async def close(self):
+        """Stop the periodic refresh and stats log"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def refresh(self):
+        """Reload the cached opt-in list, keeping the old one on failure"""
+        try:
+            self.opted_in = set(await self.backend.opted_in_users())
+            logger.info(f"Trigger policy refreshed: {len(self.opted_in)} opted-in users")
+        except Exception as e:
+            logger.error(f"Failed to refresh trigger policy: {e}", exc_info=True)
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(config.TRIGGER_REFRESH_INTERVAL)
+            await self.refresh()
+
+    async def _report_forever(self):
+        while True:
+            await asyncio.sleep(config.TRIGGER_STATS_INTERVAL)
+            logger.info(f"Trigger stats: {self.stats()}")
+
+    def should_forward(self, message: discord.Message, bot_user: discord.ClientUser) -> bool:
+        """
+        Evaluate the policy for a message and update the counters
+
+        :param message: Discord message object
+        :type message: discord.Message
+        :param bot_user: The bot's own user
+        :type bot_user: discord.ClientUser
+        :return: True if the message should be forwarded
+        """
+        forward = self._matches(message, bot_user)
+        if forward:
+            self.forwarded += 1
+        else:
+            self.filtered += 1
+        return forward
+
+    def strip_prefix(self, content: str) -> str:
+        """Remove the command prefix from message content, if present"""
+        if config.TRIGGER_PREFIX and content.startswith(config.TRIGGER_PREFIX):
+            return content[len(config.TRIGGER_PREFIX):].lstrip()
+        return content
+
+    def _matches(self, message: discord.Message, bot_user: discord.ClientUser) -> bool:
+        if config.TRIGGER_MODE == 'all':
+            return True
+        if config.TRIGGER_ON_DM and message.guild is None:
+            return True
+        if config.TRIGGER_ON_MENTION and bot_user in message.mentions:
+            return True
+        if config.TRIGGER_ON_REPLY and message.reference is not None:
+            replied = message.reference.resolved
+            if isinstance(replied, discord.Message) and replied.author == bot_user:
+                return True
+        if config.TRIGGER_PREFIX and message.content.startswith(config.TRIGGER_PREFIX):
+            return True
+        if str(message.channel.id) in config.TRIGGER_CHANNELS:
+            return True
+        if message.guild is not None and str(message.guild.id) in config.TRIGGER_GUILDS:
+            return True
+        if config.TRIGGER_ON_ROLE and str(message.author) in self.opted_in:
+            return True
+        return False
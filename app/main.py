@@ -1,15 +1,26 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.chat import router as chat_router
 from app.api.roles import router as roles_router
 from app.api.users import router as users_router
 from app.api.admin_roles import router as admin_router
-from app.db.base import Base
+from app.api.metrics import router as metrics_router
+from app.api.channel_messages import router as channel_messages_router
+from app.db import migrate
 from app.db.session import engine
+from app.services.persistence import writer, channel_writer
+from app.services.summary_service import summarizer, SUMMARY_ENABLED
+from app.services.retrieval import retrieval_index
+from app.services.retention import archiver, RETENTION_ENABLED
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Apply pending schema migrations on startup; turn off to run them by hand
+# (python -m app.db.migrate upgrade) as part of a deploy
+AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true'
+
 app = FastAPI(title="Discord Bot API")
 
 # CORS middleware for Next.js frontend
@@ -26,6 +37,8 @@ app.include_router(chat_router)
 app.include_router(roles_router)
 app.include_router(users_router)
 app.include_router(admin_router)
+app.include_router(metrics_router)
+app.include_router(channel_messages_router)
 
 
 @app.get("/")
@@ -37,14 +50,35 @@ def root():
 
 @app.on_event("startup")
 async def startup():
-    """Create database tables on startup"""
+    """Bring the database schema up to date on startup"""
     logger.info("Application starting up...")
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database tables created/verified successfully")
+        if AUTO_MIGRATE:
+            await migrate.upgrade(engine)
+        else:
+            version = await migrate.current_version(engine)
+            if version < migrate.head():
+                logger.warning(f"Database schema at revision {version}, latest is {migrate.head()}; run migrations")
+        logger.info("Database schema verified successfully")
+        writer.start()
+        channel_writer.start()
+        if SUMMARY_ENABLED:
+            summarizer.start()
+        retrieval_index.start()
+        if RETENTION_ENABLED:
+            archiver.start()
         logger.info("Discord Bot API is ready to accept requests")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}", exc_info=True)
         raise
 
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background workers and flush queued conversation turns before exiting"""
+    logger.info("Application shutting down...")
+    await summarizer.stop()
+    await archiver.stop()
+    await retrieval_index.stop()
+    await writer.stop()
+    await channel_writer.stop()
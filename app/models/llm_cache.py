@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Text, DateTime, Float
+from app.db.base import Base
+
+
+class LLMResponseCache(Base):
+    """ORM model for llm_response_cache table"""
+    __tablename__ = "llm_response_cache"
+
+    prompt_key = Column(String(64), primary_key=True)
+    response = Column(Text)
+    llm_ms = Column(Float)
+    expires_at = Column(DateTime, index=True)
+    last_hit_at = Column(DateTime, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Date, Index
 from app.db.base import Base
 
 
@@ -13,6 +13,11 @@ class ChannelMessages(Base):
     content = Column(String(1000))
     dateTime = Column(DateTime)
 
+    __table_args__ = (
+        # Latest messages of a channel (recent-context API, CHANNEL prompt section)
+        Index('ix_channel_messages_channel_id_datetime', 'channel_id', 'dateTime'),
+    )
+
 
 class BotMessages(Base):
     """ORM model for bot_messages table"""
@@ -20,7 +25,33 @@ class BotMessages(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     channel_id = Column(String(32))
-    user_id = Column(String(50), index=True)
+    user_id = Column(String(50))
+    content = Column(String(1000))
+    dateTime = Column(DateTime)
+    bot_reply = Column(String(1000))
+    message_id = Column(String(32), unique=True, nullable=True)
+
+    __table_args__ = (
+        # Last N turns of a user, read in id order straight from the index
+        Index('ix_bot_messages_user_id_id', 'user_id', 'id'),
+    )
+
+
+class BotMessagesArchive(Base):
+    """ORM model for bot_messages_archive table (turns moved out by the retention worker)"""
+    __tablename__ = "bot_messages_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # Archive day bucket; part of the key so the table can be range-partitioned by it
+    day = Column(Date, primary_key=True)
+    channel_id = Column(String(32))
+    user_id = Column(String(50))
     content = Column(String(1000))
     dateTime = Column(DateTime)
     bot_reply = Column(String(1000))
+    message_id = Column(String(32))
+    archived_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_bot_messages_archive_user_id_id', 'user_id', 'id'),
+    )
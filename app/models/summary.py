@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from app.db.base import Base
+
+
+class UserSummary(Base):
+    """ORM model for user_summary table"""
+    __tablename__ = "user_summary"
+
+    user_id = Column(String(50), primary_key=True)
+    summary = Column(Text)
+    # Highest bot_messages.id folded into the summary
+    last_message_id = Column(Integer, default=0)
+    updated_at = Column(DateTime)
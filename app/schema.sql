@@ -28,5 +28,22 @@ CREATE TABLE IF NOT EXISTS admin(
     user_id VARCHAR(255) UNIQUE NOT NULL,
     role JSON,
     INDEX idx_role_admin (user_id)
-)
+);
+
+-- Idempotency key for /chat (Discord message ID) on bot_messages: added by
+-- migration 2, which the API applies at startup (DB_AUTO_MIGRATE) or
+-- `python -m app.db.migrate upgrade` applies by hand. Equivalent SQL:
+-- ALTER TABLE bot_messages ADD COLUMN message_id VARCHAR(32) NULL, ADD UNIQUE INDEX uq_bot_messages_message_id (message_id);
+
+-- Rolling per-user summaries of turns older than the prompt's recent window
+CREATE TABLE IF NOT EXISTS user_summary(
+    user_id VARCHAR(50) PRIMARY KEY,
+    summary TEXT,
+    last_message_id INT DEFAULT 0,
+    updated_at DATETIME
+);
 
+-- Composite indexes for the hot reads (migration 5; prefer `python -m app.db.migrate upgrade`)
+-- CREATE INDEX ix_bot_messages_user_id_id ON bot_messages (user_id, id);
+-- DROP INDEX ix_bot_messages_user_id ON bot_messages;
+-- CREATE INDEX ix_channel_messages_channel_id_datetime ON channel_messages (channel_id, dateTime);
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Any
+from typing import Any, List, Optional
 
 
 class Payload(BaseModel):
@@ -9,6 +9,8 @@ class Payload(BaseModel):
     server_id: str
     channel_id: str
     content: str
+    # Discord message ID, used as the idempotency key for retries
+    message_id: Optional[str] = None
 
 
 class ChannelMessages(BaseModel):
@@ -21,6 +23,21 @@ class ChannelMessages(BaseModel):
     dateTime: datetime
 
 
+class ChannelMessageIn(BaseModel):
+    """Pydantic schema for a channel message streamed in by the bot"""
+    server_id: str
+    channel_id: str
+    user_id: str
+    content: str
+    # When the message was sent; defaults to the time it is received
+    dateTime: Optional[datetime] = None
+
+
+class ChannelMessageBatch(BaseModel):
+    """Pydantic schema for a batch of ingested channel messages"""
+    messages: List[ChannelMessageIn]
+
+
 class BotMessages(BaseModel):
     """Pydantic schema for BotMessages"""
     id: int
@@ -34,4 +51,5 @@ class BotMessageRecieve(BaseModel):
     user_id : str
     channel_id:Any
     content:str
-    bot_reply:str
\ No newline at end of file
+    bot_reply:str
+    message_id:Optional[str]=None
\ No newline at end of file
@@ -5,11 +5,21 @@ from sqlalchemy.orm import attributes
 from fastapi import HTTPException
 from app.models.admin import Admin
 from app.schemas.admin import adminRole , adminRoleAdd, adminRolePatch
+from app.services.cache import TTLCache
 from app.utils.logger import get_logger
 from typing import Optional
+import os
 
 logger = get_logger(__name__)
 
+# Admin persona JSON per user_id. It only changes through this module, which
+# writes through to the cache, so the TTL can be long.
+admin_cache = TTLCache(
+    'admin',
+    maxsize=int(os.getenv('ADMIN_CACHE_SIZE', '64')),
+    ttl=float(os.getenv('ADMIN_CACHE_TTL', '3600')),
+)
+
 # Function to get admin role
 async def get_role_for_admin(user_id : str, db:AsyncSession)->Optional[Admin]:
     """
@@ -51,6 +61,7 @@ async def add_role_for_admin(role : adminRoleAdd, db:AsyncSession):
 
         await db.commit()
         await db.refresh(db_role)
+        admin_cache.set(db_role.user_id, db_role.role)
 
         logger.info(f"Successfully added admin role for user {role.user_id}")
         return db_role
@@ -86,6 +97,7 @@ async def patch_role_for_user(user_id: str, role : adminRolePatch, db:AsyncSessi
 
         await db.commit()
         await db.refresh(current_data)
+        admin_cache.set(user_id, current_data.role)
         
         logger.info(f"Successfully patched admin role for user {user_id}")
         return current_data
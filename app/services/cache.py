@@ -0,0 +1,88 @@
+"""
+In-memory TTL + LRU cache used in front of hot database lookups.
+
+Entries are process-local: write-through updates and invalidations only
+reach the cache of the process that made the change, other processes
+pick the change up when the TTL expires.
+"""
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+from app.utils import metrics
+
+# Returned by get() when the key is not cached (None is a cacheable value)
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after ``ttl`` seconds
+
+    ``None`` is stored like any other value so that "no row" results can
+    be negatively cached.
+
+    :param name: Name used when reporting metrics
+    :param maxsize: Maximum number of entries
+    :param ttl: Seconds an entry stays valid
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        metrics.register(f"cache.{name}", self.stats)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Return a copy of the cached value, or ``MISSING``
+
+        :param key: Cache key
+        :return: Cached value or ``MISSING``
+        """
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a copy of ``value`` under ``key``
+
+        :param key: Cache key
+        :param value: Value to cache (may be None)
+        """
+        self._data[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop ``key`` from the cache"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
@@ -1,30 +1,43 @@
 from app.schemas.chat import Payload
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.services import role_service
 from app.services import message_service
 from app.schemas.chat import BotMessageRecieve
-from app.services import admin_service
 from app.services import prompt
+from app.services import context_loader
+from app.services.response_cache import response_cache, prompt_key
+from app.services.singleflight import SingleFlight
+from app.services.idempotency import idempotency
+from app.services.llm_gateway import gateway
+from app.services.hedging import hedger
+from app.services.model_router import router
+from app.services.retrieval import retrieval_index
+from app.services.circuit_breaker import llm_breaker, CircuitOpenError
+from app.services.admin_service import admin_cache
+from app.services.cache import MISSING
 from app.utils.logger import get_logger
-import google.genai as genai
 from dotenv import load_dotenv
 import asyncio
 import os
+import random
 import time 
+from typing import AsyncIterator, Optional, Tuple
 
 load_dotenv()
 
 # Initialize logger
 logger = get_logger(__name__)
 
-apikey = os.getenv('LLM_API_KEY')
+FALLBACK_TIMEOUT_REPLY = 'Sorry, I took too long to respond. Please try again.'
+FALLBACK_ERROR_REPLY = 'Sorry, something went wrong. Please try again later.'
+# Canned reply used while the LLM circuit is open, unless the admin persona
+# JSON provides a "degraded_replies" list
+DEGRADED_REPLY = os.getenv('DEGRADED_REPLY', "Can't really talk right now, I'll get back to you in a bit!")
 
-try:
-    client = genai.Client(api_key=apikey)
-    logger.info("LLM client initialized successfully")
-except Exception as e:
-    logger.error(f'Failed to initialize LLM client: {e}')
-    raise    
+# admin name for now is me later more admins will be added
+ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'pratik081978')
+
+# Concurrent requests with an identical prompt share one generation
+llm_flights = SingleFlight('llm')
 
 async def createMessage(payload:Payload, reply:str):
     """Create a message object for database storage"""
@@ -33,7 +46,8 @@ async def createMessage(payload:Payload, reply:str):
             channel_id=str(payload.channel_id),
             user_id=str(payload.user_id),
             content=str(payload.content),
-            bot_reply = reply
+            bot_reply = reply,
+            message_id=payload.message_id
         )
         logger.debug(f"Created message object for user {payload.user_id}")
         return bm_obj
@@ -42,92 +56,231 @@ async def createMessage(payload:Payload, reply:str):
         raise    
 
 
-async def build_prompt(payload: Payload, db: AsyncSession) -> str:
+async def build_prompt(payload: Payload, db: AsyncSession,
+                       message_id: Optional[str] = None) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
-    Build a prompt for the LLM based on the chat payload
+    Build a prompt for the LLM based on the chat payload and pick the model for it
     
     :param payload: Chat payload containing user message
     :type payload: Payload
     :param db: Database session
     :type db: AsyncSession
-    :return: Formatted prompt string
+    :param message_id: Message ID whose stored reply is looked up in the same round trip
+    :type message_id: Optional[str]
+    :return: Formatted prompt string, model name and None, or (None, None, stored reply)
+        if ``bot_messages`` already holds a reply for ``message_id``
     """
-    # Parallelize all database queries for better performance
+    # Cached context is served from memory; misses are fetched in one round trip
     logger.info(f"Building prompt for user {payload.user_id} in channel {payload.channel_id}")
     start_time = time.time()
     
-    # admin name for now is me later more admins will be added
-    admin_username = os.getenv('ADMIN_USERNAME', 'pratik081978')
-    
     try:
-        role_obj, role_admin_obj, prev_messages = await asyncio.gather(
-            role_service.get_roles_for_user(payload.user_id, db),
-            admin_service.get_role_for_admin(admin_username, db),
-            message_service.get_user_messages(payload.user_id, db)
+        stored, (roles, role_admin, prev_messages, summary) = await context_loader.load_context_and_reply(
+            payload.user_id, ADMIN_USERNAME, db, message_id
         )
         
         db_time = (time.time() - start_time) * 1000
         logger.debug(f"Database queries completed in {db_time:.2f}ms")
-        
-        role_admin = role_admin_obj.role if role_admin_obj else {}
-        roles = role_obj.role if role_obj else {}
+        if stored is not None:
+            idempotency.record_restored()
+            logger.info(f"Replaying reply stored in the database for message {message_id}")
+            return None, None, stored
         
         logger.debug(f"User has {len(prev_messages)} previous messages")
-        
-        # Format the previous messages
-        prev_messages_format = [{'user_message': m.content, 'bot_reply': m.bot_reply} for m in prev_messages]
 
-        prompt_text = prompt.develop_prompt(roles, payload.content, prev_messages_format, role_admin)
-        logger.debug(f"Prompt built successfully (length: {len(prompt_text)} chars)")
-        return prompt_text
+        channel = None
+        if message_service.CHANNEL_CONTEXT_MESSAGES:
+            channel = await message_service.get_channel_context(payload, db)
+
+        prompt_text = _compose(payload, roles or {}, role_admin or {}, prev_messages, summary, channel)
+        logger.debug(
+            f"Prompt built successfully (length: {len(prompt_text)} chars, "
+            f"~{prompt.estimate_tokens(prompt_text)} tokens)"
+        )
+        model = router.choose(payload.content, prev_messages, roles or {}, str(payload.channel_id))
+        return prompt_text, model, None
     except Exception as e:
         logger.error(f"Error building prompt for user {payload.user_id}: {e}", exc_info=True)
         raise
 
 
-async def call_llm(prompt: str, timeout: int = 30) -> str:
+def _compose(payload: Payload, roles: dict, role_admin: dict, prev_messages: list, summary: Optional[str],
+             channel: Optional[list]) -> str:
+    # Older relevant turns; the newest ones are already in prev_messages
+    recalled = retrieval_index.search(payload.user_id, payload.content, exclude_recent=message_service.HISTORY_TURNS)
+    return prompt.compose_prompt(
+        roles, payload.content, prev_messages, role_admin, summary, recalled, channel=channel
+    )
+
+
+def cached_prompt(payload: Payload) -> Optional[str]:
     """
-    Native async call with streaming for lower perceived latency.
+    Rebuild the prompt from the in-memory caches alone
+
+    Used while the LLM circuit is open, so a cached response can still be
+    served without touching the database.
+
+    :param payload: Chat payload
+    :type payload: Payload
+    :return: Prompt text, or None if the response cache does not apply or
+        part of the context is not cached
+    """
+    if not response_cache.applies_to(payload.user_id):
+        return None
+    context = context_loader.cached_prompt_context(payload.user_id, ADMIN_USERNAME)
+    if context is None:
+        return None
+    channel = None
+    if message_service.CHANNEL_CONTEXT_MESSAGES:
+        channel = message_service.peek_channel_context(payload)
+        if channel is None:
+            return None
+    roles, role_admin, prev_messages, summary = context
+    return _compose(payload, roles or {}, role_admin or {}, prev_messages, summary, channel)
+
+
+async def routed_stream(prompt: str, model: str, timeout: int) -> AsyncIterator[str]:
+    """
+    Stream from ``model``, falling back to the router's alternate model if
+    the first chunk times out, and record the latency of the model that served
+    """
+    alternate = router.alternate(model)
+    models = [model, alternate] if alternate else [model]
+    for i, current in enumerate(models):
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        first_chunk_at = None
+        # Concurrency, rate limiting, retries and key rotation live in the gateway;
+        # the hedger may race a second identical call if the first is slow to start
+        last = i == len(models) - 1
+        try:
+            async for text in hedger.stream(lambda m=current: gateway.stream(m, prompt, timeout)):
+                if first_chunk_at is None:
+                    first_chunk_at = loop.time()
+                yield text
+        except asyncio.TimeoutError:
+            if first_chunk_at is not None or last:
+                raise
+            router.record_fallback(current, alternate, (loop.time() - start_time) * 1000)
+            continue
+        if first_chunk_at is not None:
+            router.record(current, (first_chunk_at - start_time) * 1000, (loop.time() - start_time) * 1000)
+        return
+
+
+async def stream_llm(prompt: str, timeout: int = 30, model: Optional[str] = None) -> AsyncIterator[str]:
     """
-    logger.info(f"Initiating streaming LLM call (timeout: {timeout}s)")
+    Stream text chunks from the LLM as they are generated
+
+    :param prompt: Prompt to send to the model
+    :type prompt: str
+    :param timeout: Seconds to wait for the first chunk
+    :type timeout: int
+    :param model: Model chosen by the router; defaults to the full model
+    :type model: str
+    :return: Async iterator of text chunks
+    """
+    model = model or router.models['full']
+    llm_breaker.before_call()
+    logger.info(f"Initiating streaming LLM call to {model} (timeout: {timeout}s)")
     start_time = asyncio.get_event_loop().time()
-    full_response = []
+    first_chunk_at = None
+    outcome_recorded = False
 
     try:
-        # 1. Use client.aio for native async support
-        # 2. Use generate_content_stream (no stream=True argument needed)
-        response_stream = await asyncio.wait_for(
-            client.aio.models.generate_content_stream(
-                model="gemini-2.5-flash",
-                contents=prompt,
-            ),
-            timeout=timeout
-        )
-
-        # Iterate through chunks as they arrive
-        async for chunk in response_stream:
-            if chunk.text:
-                full_response.append(chunk.text)
-                # OPTIONAL: Here is where you would update your Discord message!
-                # await discord_message.edit(content="".join(full_response))
+        async for text in routed_stream(prompt, model, timeout):
+            if first_chunk_at is None:
+                first_chunk_at = asyncio.get_event_loop().time()
+                ttft = (first_chunk_at - start_time) * 1000
+                logger.info(f"LLM first token after {ttft:.2f}ms")
+            yield text
 
         elapsed = (asyncio.get_event_loop().time() - start_time) * 1000
-        result = "".join(full_response)
-        
         logger.info(f"LLM stream finished in {elapsed:.2f}ms")
-        return result
+        llm_breaker.record_success()
+        outcome_recorded = True
 
     except asyncio.TimeoutError:
         logger.error(f"LLM call timed out after {timeout}s")
+        llm_breaker.record_failure()
+        outcome_recorded = True
         raise
     except Exception as e:
         logger.error(f"LLM call failed: {e}", exc_info=True)
+        llm_breaker.record_failure()
+        outcome_recorded = True
         raise
+    finally:
+        if not outcome_recorded:
+            # Cancelled or abandoned mid-stream: neither success nor failure
+            llm_breaker.release()
+
+
+def degraded_reply() -> str:
+    """Short canned reply in the admin's voice, served while the LLM is unavailable"""
+    persona = admin_cache.get(ADMIN_USERNAME)
+    if persona is not MISSING and persona:
+        replies = persona.get('degraded_replies')
+        if replies:
+            return random.choice(replies)
+    return DEGRADED_REPLY
+
+
+async def call_llm(prompt: str, timeout: int = 30, model: Optional[str] = None) -> str:
+    """
+    Native async call with streaming for lower perceived latency.
+    """
+    full_response = []
+    async for text in stream_llm(prompt, timeout, model):
+        full_response.append(text)
+    return "".join(full_response)
+
+
+async def stream_reply(prompt: str, user_id: str, model: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Stream the reply for a prompt, serving exact repeats from the response cache
+
+    :param prompt: Prompt to send to the model
+    :type prompt: str
+    :param user_id: User the reply is for (for per-user cache opt-out)
+    :type user_id: str
+    :param model: Model chosen by the router
+    :type model: str
+    :return: Async iterator of text chunks
+    """
+    key = prompt_key(prompt)
+    use_cache = response_cache.applies_to(user_id)
+    if use_cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    async def generate():
+        start_time = time.time()
+        full_response = []
+        async for text in stream_llm(prompt, model=model):
+            full_response.append(text)
+            yield text
+        if use_cache:
+            await response_cache.set(key, "".join(full_response), (time.time() - start_time) * 1000)
+
+    async for text in llm_flights.stream(key, generate):
+        yield text
+
+
+async def generate_reply(prompt: str, user_id: str, model: Optional[str] = None) -> str:
+    """Collect the full reply from :func:`stream_reply`"""
+    return "".join([text async for text in stream_reply(prompt, user_id, model)])
 
 
 async def process_chat(payload: Payload, db: AsyncSession) -> dict:
     """
     Process a chat message and generate a response
+
+    Requests carrying a ``message_id`` are idempotent: a duplicate attaches
+    to the request in flight or gets the stored reply, from memory or from
+    ``bot_messages``.
     
     :param payload: Chat payload
     :type payload: Payload
@@ -135,28 +288,151 @@ async def process_chat(payload: Payload, db: AsyncSession) -> dict:
     :type db: AsyncSession
     :return: Dictionary with reply
     """
+    key = payload.message_id
+    if key:
+        stored = idempotency.completed(key)
+        if stored is not None:
+            logger.info(f"Replaying stored reply for message {key}")
+            return stored
+        pending = idempotency.in_flight(key)
+        if pending is not None:
+            logger.info(f"Attaching to in-flight request for message {key}")
+            return await asyncio.shield(pending) or {'reply': FALLBACK_ERROR_REPLY}
+        idempotency.begin(key)
+
+    result, ok = None, False
+    try:
+        result, ok = await _process_chat(payload, db)
+        return result
+    finally:
+        if key:
+            idempotency.finish(key, result, keep=ok)
+
+
+async def _process_chat(payload: Payload, db: AsyncSession) -> Tuple[dict, bool]:
+    """Run the chat pipeline, returning the reply and whether it succeeded"""
     start_time = time.time()
     logger.info(f"Processing chat request from user {payload.user_id} - Message: '{payload.content[:50]}...'")
+
+    # While the LLM circuit is open, only a cached response for a prompt the
+    # in-memory caches can rebuild is served; otherwise fail fast without the
+    # database, skipping the stored-reply lookup as well
+    prompt = model = None
+    if llm_breaker.rejecting():
+        prompt = cached_prompt(payload)
+        if prompt is None:
+            logger.warning(f"LLM circuit open, serving degraded reply to user {payload.user_id}")
+            return {'reply': degraded_reply()}, False
     
     try:
-        prompt = await build_prompt(payload, db)
-        llm_response = await call_llm(prompt)
+        if prompt is None:
+            prompt, model, stored = await build_prompt(payload, db, payload.message_id)
+            if stored is not None:
+                return {'reply': stored}, True
+        # On a response cache miss this raises CircuitOpenError while the circuit is open
+        llm_response = await generate_reply(prompt, payload.user_id, model)
         
         # Adding the current data to the db
         message = await createMessage(payload=payload, reply=llm_response)
-        await message_service.add_user_messages(message=message, db=db)
+        await message_service.save_turn(message=message, db=db)
         
         elapsed = (time.time() - start_time) * 1000
         logger.info(f"Chat request processed successfully in {elapsed:.2f}ms")
-        return {'reply': llm_response}
+        return {'reply': llm_response}, True
+
+    except CircuitOpenError:
+        logger.warning(f"LLM circuit open, serving degraded reply to user {payload.user_id}")
+        return {'reply': degraded_reply()}, False
         
     except asyncio.TimeoutError:
         elapsed = (time.time() - start_time) * 1000
         logger.warning(f"Chat request timed out after {elapsed:.2f}ms for user {payload.user_id}")
-        return {'reply': 'Sorry, I took too long to respond. Please try again.'}
+        return {'reply': FALLBACK_TIMEOUT_REPLY}, False
         
     except Exception as e:
         elapsed = (time.time() - start_time) * 1000
         logger.error(f"Chat request failed after {elapsed:.2f}ms for user {payload.user_id}: {e}", exc_info=True)
-        return {'reply': 'Sorry, something went wrong. Please try again later.'}
+        return {'reply': FALLBACK_ERROR_REPLY}, False
+
+
+async def process_chat_stream(payload: Payload, db: AsyncSession) -> AsyncIterator[dict]:
+    """
+    Process a chat message and yield the reply incrementally
+
+    Yields ``{'type': 'chunk', 'text': ...}`` events while the LLM is
+    generating and a final ``{'type': 'done', 'reply': ...}`` event once the
+    full reply has been stored. Failures are reported as a ``done`` event
+    carrying the same fallback text as :func:`process_chat`.
+
+    :param payload: Chat payload
+    :type payload: Payload
+    :param db: Database session
+    :type db: AsyncSession
+    :return: Async iterator of event dictionaries
+    """
+    key = payload.message_id
+    if key:
+        stored = idempotency.completed(key)
+        if stored is None:
+            pending = idempotency.in_flight(key)
+            if pending is not None:
+                logger.info(f"Attaching to in-flight request for message {key}")
+                stored = await asyncio.shield(pending) or {'reply': FALLBACK_ERROR_REPLY}
+        if stored is not None:
+            yield {'type': 'done', 'reply': stored['reply']}
+            return
+        idempotency.begin(key)
+
+    result, ok = None, False
+    start_time = time.time()
+    logger.info(f"Processing streaming chat request from user {payload.user_id} - Message: '{payload.content[:50]}...'")
+    full_response = []
+
+    try:
+        prompt = model = None
+        if llm_breaker.rejecting():
+            prompt = cached_prompt(payload)
+            if prompt is None:
+                raise CircuitOpenError("LLM circuit open")
+        if prompt is None:
+            prompt, model, stored = await build_prompt(payload, db, key)
+            if stored is not None:
+                result, ok = {'reply': stored}, True
+                yield {'type': 'done', 'reply': stored}
+                return
+        async for text in stream_reply(prompt, payload.user_id, model):
+            if not full_response:
+                ttft = (time.time() - start_time) * 1000
+                logger.info(f"First chunk ready for user {payload.user_id} after {ttft:.2f}ms")
+            full_response.append(text)
+            yield {'type': 'chunk', 'text': text}
+
+        llm_response = "".join(full_response)
+        message = await createMessage(payload=payload, reply=llm_response)
+        await message_service.save_turn(message=message, db=db)
+
+        elapsed = (time.time() - start_time) * 1000
+        logger.info(f"Streaming chat request processed successfully in {elapsed:.2f}ms")
+        result, ok = {'reply': llm_response}, True
+        yield {'type': 'done', 'reply': llm_response}
+
+    except CircuitOpenError:
+        logger.warning(f"LLM circuit open, serving degraded reply to user {payload.user_id}")
+        result = {'reply': degraded_reply()}
+        yield {'type': 'done', 'reply': result['reply']}
+
+    except asyncio.TimeoutError:
+        elapsed = (time.time() - start_time) * 1000
+        logger.warning(f"Streaming chat request timed out after {elapsed:.2f}ms for user {payload.user_id}")
+        result = {'reply': FALLBACK_TIMEOUT_REPLY}
+        yield {'type': 'done', 'reply': FALLBACK_TIMEOUT_REPLY}
+
+    except Exception as e:
+        elapsed = (time.time() - start_time) * 1000
+        logger.error(f"Streaming chat request failed after {elapsed:.2f}ms for user {payload.user_id}: {e}", exc_info=True)
+        result = {'reply': FALLBACK_ERROR_REPLY}
+        yield {'type': 'done', 'reply': FALLBACK_ERROR_REPLY}
 
+    finally:
+        if key:
+            idempotency.finish(key, result, keep=ok)
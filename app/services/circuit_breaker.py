@@ -0,0 +1,146 @@
+"""
+Circuit breaker for the LLM backend.
+
+Closed: calls go through and outcomes are recorded in a rolling window.
+Once the window holds at least ``min_calls`` outcomes and the failure
+ratio reaches ``failure_ratio`` the breaker opens and calls fail fast
+with :class:`CircuitOpenError`. After ``open_seconds`` it goes half-open
+and lets ``half_open_probes`` calls through; a successful probe closes it
+again, a failed one re-opens it.
+"""
+import os
+import time
+from collections import deque
+from typing import Deque
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while the breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window failure-ratio circuit breaker
+
+    :param name: Name used in logs and metrics
+    :param window: Number of recent outcomes considered
+    :param min_calls: Minimum outcomes before the breaker may trip
+    :param failure_ratio: Failure ratio that trips the breaker
+    :param open_seconds: Time spent open before probing
+    :param half_open_probes: Concurrent probe calls allowed while half-open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        failure_ratio: float,
+        open_seconds: float,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+
+        self.transitions = 0
+        self.rejected = 0
+        self.time_open_s = 0.0
+        metrics.register(f"circuit.{name}", self.stats)
+
+    def _transition(self, state: str):
+        now = time.monotonic()
+        if self.state == OPEN:
+            self.time_open_s += now - self.opened_at
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        self.transitions += 1
+        if state == OPEN:
+            self.opened_at = now
+        if state == CLOSED:
+            self.outcomes.clear()
+        self.probes_in_flight = 0
+
+    def rejecting(self) -> bool:
+        """Whether a call made now would be rejected (does not reserve a probe)"""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.open_seconds
+        if self.state == HALF_OPEN:
+            return self.probes_in_flight >= self.half_open_probes
+        return False
+
+    def before_call(self):
+        """
+        Reserve permission for a call
+
+        :raises CircuitOpenError: If the breaker is open or out of probes
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+            self.probes_in_flight += 1
+            return
+        if self.state != CLOSED:
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is {self.state}")
+
+    def release(self):
+        """Give back a probe reservation for a call that ended without an outcome"""
+        if self.state == HALF_OPEN and self.probes_in_flight > 0:
+            self.probes_in_flight -= 1
+
+    def record_success(self):
+        """Record a successful call"""
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+        elif self.state == CLOSED:
+            self.outcomes.append(True)
+
+    def record_failure(self):
+        """Record a failed or timed out call"""
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        if self.state != CLOSED:
+            return
+        self.outcomes.append(False)
+        failures = self.outcomes.count(False)
+        if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_ratio:
+            self._transition(OPEN)
+
+    def stats(self) -> dict:
+        """Return the state, transition count and time spent open"""
+        time_open = self.time_open_s
+        if self.state == OPEN:
+            time_open += time.monotonic() - self.opened_at
+        return {
+            'state': self.state,
+            'transitions': self.transitions,
+            'rejected': self.rejected,
+            'time_open_s': time_open,
+            'window_failures': self.outcomes.count(False),
+            'window_calls': len(self.outcomes),
+        }
+
+
+llm_breaker = CircuitBreaker(
+    'llm',
+    window=int(os.getenv('LLM_BREAKER_WINDOW', '50')),
+    min_calls=int(os.getenv('LLM_BREAKER_MIN_CALLS', '10')),
+    failure_ratio=float(os.getenv('LLM_BREAKER_FAILURE_RATIO', '0.5')),
+    open_seconds=float(os.getenv('LLM_BREAKER_OPEN_SECONDS', '30')),
+    half_open_probes=int(os.getenv('LLM_BREAKER_HALF_OPEN_PROBES', '1')),
+)
@@ -0,0 +1,154 @@
+"""
+Single round-trip loader for the data build_prompt needs.
+
+The user's role, the admin persona, the user's rolling summary and
+recent turns are served from their in-memory caches. Whatever is missing is fetched with
+one UNION ALL statement on one connection and written back into the
+caches, instead of three ORM queries on a shared session. The same statement
+also looks up the reply already stored for the request's message ID, so an
+idempotent replay after a restart costs no extra round trip.
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import literal, null, select, union_all, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.admin import Admin
+from app.models.message import BotMessages
+from app.models.role import Role as RoleModel
+from app.models.summary import UserSummary
+from app.services.admin_service import admin_cache
+from app.services.cache import MISSING
+from app.services.history_cache import Turn
+from app.services.message_service import history, summary_cache, HISTORY_TURNS
+from app.services.role_service import role_cache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# (user role, admin persona, recent turns newest first, summary of older turns)
+PromptContext = Tuple[Optional[dict], Optional[dict], List[Turn], Optional[str]]
+
+
+def _context_statement(user_id: str, admin_id: str, need_role: bool, need_admin: bool, need_turns: bool,
+                       need_summary: bool, message_id: Optional[str] = None):
+    """Build one UNION ALL statement returning (kind, data, content, bot_reply, id) rows"""
+    parts = []
+    if message_id:
+        parts.append(select(
+            literal('stored').label('kind'), null().label('data'),
+            null().label('content'), BotMessages.bot_reply.label('bot_reply'), BotMessages.id.label('id'),
+        ).where(BotMessages.message_id == message_id).limit(1))
+    if need_role:
+        parts.append(select(
+            literal('role').label('kind'), RoleModel.role.label('data'),
+            null().label('content'), null().label('bot_reply'), literal(0).label('id'),
+        ).where(RoleModel.user_id == user_id))
+    if need_admin:
+        parts.append(select(
+            literal('admin').label('kind'), Admin.role.label('data'),
+            null().label('content'), null().label('bot_reply'), literal(0).label('id'),
+        ).where(Admin.user_id == admin_id).limit(1))
+    if need_summary:
+        parts.append(select(
+            literal('summary').label('kind'), null().label('data'),
+            UserSummary.summary.label('content'), null().label('bot_reply'), literal(0).label('id'),
+        ).where(UserSummary.user_id == user_id))
+    if need_turns:
+        recent = (
+            select(BotMessages.content, BotMessages.bot_reply, BotMessages.id)
+            .where(BotMessages.user_id == user_id)
+            .order_by(desc(BotMessages.id))
+            .limit(HISTORY_TURNS)
+            .subquery()
+        )
+        parts.append(select(
+            literal('turn').label('kind'), null().label('data'),
+            recent.c.content, recent.c.bot_reply, recent.c.id,
+        ))
+    # Wrap single selects too so LIMIT inside a part stays valid SQL
+    return union_all(*[select(p.subquery()) for p in parts])
+
+
+def cached_prompt_context(user_id: str, admin_id: str) -> Optional[PromptContext]:
+    """
+    Get the prompt context from the in-memory caches only
+
+    :param user_id: User ID the prompt is for
+    :type user_id: str
+    :param admin_id: Admin user ID whose persona is used
+    :type admin_id: str
+    :return: Same tuple as :func:`load_prompt_context`, or None if any part is not cached
+    """
+    role = role_cache.get(user_id)
+    admin = admin_cache.get(admin_id)
+    turns = history.peek(user_id)
+    summary = summary_cache.get(user_id)
+    if role is MISSING or admin is MISSING or turns is None or summary is MISSING:
+        return None
+    return role, admin, turns, summary
+
+
+async def load_prompt_context(user_id: str, admin_id: str, db: AsyncSession) -> PromptContext:
+    """
+    Get the user role, admin persona, recent turns and summary for a prompt
+
+    :param user_id: User ID the prompt is for
+    :type user_id: str
+    :param admin_id: Admin user ID whose persona is used
+    :type admin_id: str
+    :param db: Database session
+    :type db: AsyncSession
+    :return: (user role, admin persona, recent turns newest first, summary)
+    """
+    _, context = await load_context_and_reply(user_id, admin_id, db)
+    return context
+
+
+async def load_context_and_reply(user_id: str, admin_id: str, db: AsyncSession,
+                                 message_id: Optional[str] = None) -> Tuple[Optional[str], PromptContext]:
+    """
+    Get the prompt context and, in the same round trip, the reply stored for a message ID
+
+    :param user_id: User ID the prompt is for
+    :type user_id: str
+    :param admin_id: Admin user ID whose persona is used
+    :type admin_id: str
+    :param db: Database session
+    :type db: AsyncSession
+    :param message_id: Discord message ID whose stored reply to look up
+    :type message_id: Optional[str]
+    :return: (stored reply or None, prompt context as from :func:`load_prompt_context`)
+    """
+    role = role_cache.get(user_id)
+    admin = admin_cache.get(admin_id)
+    turns = history.peek(user_id)
+    summary = summary_cache.get(user_id)
+
+    need_role, need_admin, need_turns = role is MISSING, admin is MISSING, turns is None
+    need_summary = summary is MISSING
+    if not (need_role or need_admin or need_turns or need_summary or message_id):
+        return None, (role, admin, turns, summary)
+
+    logger.debug(
+        f"Loading prompt context for user {user_id} (role={need_role}, admin={need_admin}, "
+        f"turns={need_turns}, summary={need_summary}, stored={bool(message_id)})"
+    )
+    result = await db.execute(
+        _context_statement(user_id, admin_id, need_role, need_admin, need_turns, need_summary, message_id)
+    )
+    rows = result.all()
+
+    if need_role:
+        role = next((r.data for r in rows if r.kind == 'role'), None)
+        role_cache.set(user_id, role)
+    if need_admin:
+        admin = next((r.data for r in rows if r.kind == 'admin'), None)
+        admin_cache.set(admin_id, admin)
+    if need_turns:
+        loaded = sorted((r for r in rows if r.kind == 'turn'), key=lambda r: r.id, reverse=True)
+        turns = history.warm(user_id, [(r.content, r.bot_reply) for r in loaded])
+    if need_summary:
+        summary = next((r.content for r in rows if r.kind == 'summary'), None)
+        summary_cache.set(user_id, summary)
+
+    stored = next((r.bot_reply for r in rows if r.kind == 'stored'), None)
+    return stored, (role, admin, turns, summary)
@@ -0,0 +1,155 @@
+"""
+Hedged LLM requests to cut tail latency.
+
+If the first chunk of a stream has not arrived after a delay derived from
+recent first-chunk latencies (a configurable percentile), an identical
+second request is started and whichever produces a chunk first is used;
+the other one is cancelled. The extra load is capped as a fraction of
+recent requests.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Optional, Tuple
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+# Percentile of recent first-chunk latencies used as the hedge delay
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+# Delay used until enough samples have been collected, and its lower bound
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY_MS', '3000'))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv('LLM_HEDGE_MIN_DELAY_MS', '500'))
+# Maximum share of requests that may be hedged
+LLM_HEDGE_MAX_RATIO = float(os.getenv('LLM_HEDGE_MAX_RATIO', '0.1'))
+LLM_HEDGE_WINDOW = int(os.getenv('LLM_HEDGE_WINDOW', '500'))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+StreamFactory = Callable[[], AsyncIterator[str]]
+
+
+async def _first_chunk(stream: AsyncIterator[str]) -> Tuple[bool, Optional[str]]:
+    """Await the first chunk; (False, None) if the stream was empty"""
+    try:
+        return True, await stream.__anext__()
+    except StopAsyncIteration:
+        return False, None
+
+
+async def _discard(stream: AsyncIterator[str], task: asyncio.Task):
+    """Cancel a losing stream and release what it holds"""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    try:
+        await stream.aclose()
+    except Exception:
+        pass
+
+
+class Hedger:
+    """Issue a backup request when the first one is slow to start streaming"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.ttft_ms: Deque[float] = deque(maxlen=LLM_HEDGE_WINDOW)
+        # 1 for each recent request that was hedged, 0 otherwise
+        self.recent: Deque[int] = deque(maxlen=LLM_HEDGE_WINDOW)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.saved_ms_est = 0.0
+        metrics.register('llm_hedging', self.stats)
+
+    def delay_ms(self) -> float:
+        """Current hedge delay: the configured percentile of recent first-chunk latencies"""
+        if len(self.ttft_ms) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY_MS
+        ordered = sorted(self.ttft_ms)
+        index = min(len(ordered) - 1, int(len(ordered) * LLM_HEDGE_PERCENTILE / 100))
+        return max(LLM_HEDGE_MIN_DELAY_MS, ordered[index])
+
+    def _budget_allows(self) -> bool:
+        return sum(self.recent) < LLM_HEDGE_MAX_RATIO * max(len(self.recent), 1)
+
+    def _expected_remaining_ms(self, waited_ms: float) -> float:
+        """Expected extra wait of a request that has already waited ``waited_ms``"""
+        slower = [t for t in self.ttft_ms if t > waited_ms]
+        return sum(slower) / len(slower) - waited_ms if slower else 0.0
+
+    async def stream(self, factory: StreamFactory) -> AsyncIterator[str]:
+        """
+        Stream chunks from ``factory()``, hedging with a second call if it is slow
+
+        :param factory: Callable returning a new chunk stream for the same request
+        :return: Async iterator of text chunks
+        """
+        if not self.enabled:
+            async for chunk in factory():
+                yield chunk
+            return
+
+        self.requests += 1
+        start = time.perf_counter()
+        delay = self.delay_ms()
+
+        primary = factory()
+        primary_task = asyncio.create_task(_first_chunk(primary))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay / 1000)
+
+        winner, winner_task = primary, primary_task
+        if not done and self._budget_allows():
+            self.hedged += 1
+            self.recent.append(1)
+            logger.info(f"No first chunk after {delay:.0f}ms, sending hedged LLM request")
+            backup = factory()
+            backup_task = asyncio.create_task(_first_chunk(backup))
+            winner, winner_task = await self._race(primary, primary_task, backup, backup_task)
+            if winner is backup:
+                waited = (time.perf_counter() - start) * 1000
+                self.hedge_wins += 1
+                self.saved_ms_est += self._expected_remaining_ms(waited)
+                logger.info(f"Hedged request won after {waited:.0f}ms")
+        else:
+            self.recent.append(0)
+
+        has_chunk, first = await winner_task
+        if winner is primary:
+            self.ttft_ms.append((time.perf_counter() - start) * 1000)
+        if not has_chunk:
+            return
+        yield first
+        async for chunk in winner:
+            yield chunk
+
+    async def _race(self, primary, primary_task, backup, backup_task):
+        """Return the (stream, task) that produced a first chunk first; cancel the other"""
+        pending = {primary_task, backup_task}
+        streams = {primary_task: primary, backup_task: backup}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: t.exception() is not None):
+                if task.exception() is None or not pending:
+                    # Success, or the last one standing (its error propagates). The
+                    # loser may have finished in the same round, so close it either way
+                    for other in streams:
+                        if other is not task:
+                            await _discard(streams[other], other)
+                    return streams[task], task
+
+    def stats(self) -> dict:
+        """Return hedge rate and estimated latency saved"""
+        return {
+            'enabled': self.enabled,
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+            'hedge_wins': self.hedge_wins,
+            'saved_ms_est': self.saved_ms_est,
+            'delay_ms': self.delay_ms(),
+        }
+
+
+hedger = Hedger(LLM_HEDGE_ENABLED)
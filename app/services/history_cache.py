@@ -0,0 +1,113 @@
+"""
+Per-user ring buffer of recent conversation turns kept in process memory.
+
+Users are warmed from ``bot_messages`` on first access and then served
+from memory; new turns are appended as they are stored. When more than
+``max_users`` users are tracked, the least recently used one is evicted.
+"""
+from collections import OrderedDict, deque
+from typing import Callable, Awaitable, Deque, List, Optional, Tuple
+from app.utils import metrics
+
+# (user message, bot reply)
+Turn = Tuple[str, str]
+
+
+class ConversationHistory:
+    """
+    LRU map of user_id -> bounded deque of turns (oldest first)
+
+    :param turns: Number of turns kept per user
+    :param max_users: Maximum number of users tracked at once
+    :param name: Name the counters are exported under at /metrics
+    """
+
+    def __init__(self, turns: int, max_users: int, name: str = 'history'):
+        self.turns = turns
+        self.max_users = max_users
+        self._users: "OrderedDict[str, Deque[Turn]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        metrics.register(name, self.stats)
+
+    async def get(self, user_id: str, load: Callable[[str], Awaitable[List[Turn]]]) -> List[Turn]:
+        """
+        Return the user's recent turns, newest first
+
+        :param user_id: User ID
+        :type user_id: str
+        :param load: Coroutine returning the user's turns newest first, used on a miss
+        :return: List of turns, newest first
+        """
+        cached = self.peek(user_id)
+        if cached is not None:
+            return cached
+        return self.warm(user_id, await load(user_id))
+
+    def peek(self, user_id: str) -> Optional[List[Turn]]:
+        """
+        Return the user's recent turns newest first, or None if not tracked
+
+        :param user_id: User ID
+        :type user_id: str
+        :return: List of turns or None
+        """
+        buffer = self._users.get(user_id)
+        if buffer is None:
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return list(reversed(buffer))
+
+    def warm(self, user_id: str, turns: List[Turn]) -> List[Turn]:
+        """
+        Start tracking a user with turns loaded from the database
+
+        :param user_id: User ID
+        :type user_id: str
+        :param turns: Turns newest first
+        :return: The (truncated) turns, newest first
+        """
+        turns = turns[:self.turns]
+        # Another request may have warmed the user while we were loading
+        if user_id not in self._users:
+            self._store(user_id, deque(reversed(turns), maxlen=self.turns))
+        return turns
+
+    def append(self, user_id: str, turn: Turn):
+        """
+        Append a turn for a tracked user
+
+        Untracked users are left alone; they are warmed from the database
+        (which already contains the turn) on their next access.
+
+        :param user_id: User ID
+        :type user_id: str
+        :param turn: (user message, bot reply) tuple
+        """
+        buffer = self._users.get(user_id)
+        if buffer is not None:
+            buffer.append(turn)
+
+    def invalidate(self, user_id: str):
+        """Forget a user's buffered turns"""
+        self._users.pop(user_id, None)
+
+    def _store(self, user_id: str, buffer: Deque[Turn]):
+        self._users[user_id] = buffer
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of tracked users"""
+        lookups = self.hits + self.misses
+        return {
+            'users': len(self._users),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
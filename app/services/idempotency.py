@@ -0,0 +1,87 @@
+"""
+Idempotency table for /chat keyed on the Discord message ID.
+
+A retried or replayed message attaches to the request already in flight
+for the same ID, or gets the stored reply once it has completed, instead
+of triggering a second LLM call. Completed entries are kept in a bounded
+LRU map; after a restart or an eviction the reply is looked up in
+``bot_messages`` by its unique ``message_id`` column instead.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.utils import metrics
+
+
+class IdempotencyTable:
+    """
+    Track in-flight and completed chat requests by idempotency key
+
+    :param maxsize: Maximum number of completed replies remembered
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._completed: "OrderedDict[str, dict]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.replayed = 0
+        self.restored = 0
+        self.attached = 0
+        metrics.register('idempotency', self.stats)
+
+    def completed(self, key: str) -> Optional[dict]:
+        """Return the stored result for a completed request, if any"""
+        result = self._completed.get(key)
+        if result is not None:
+            self._completed.move_to_end(key)
+            self.replayed += 1
+        return result
+
+    def in_flight(self, key: str) -> Optional[asyncio.Future]:
+        """Return the future of a request in flight for this key, if any"""
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.attached += 1
+        return future
+
+    def begin(self, key: str) -> asyncio.Future:
+        """Mark a request as in flight"""
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        return future
+
+    def finish(self, key: str, result: Optional[dict], keep: bool):
+        """
+        Resolve the in-flight request and remember its result
+
+        :param key: Idempotency key
+        :type key: str
+        :param result: Result handed to attached waiters (None if aborted)
+        :param keep: Whether to replay this result for later retries
+            (False for failures, so a retry gets a fresh attempt)
+        """
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+        if keep and result is not None:
+            self._completed[key] = result
+            while len(self._completed) > self.maxsize:
+                self._completed.popitem(last=False)
+
+    def record_restored(self):
+        """Count a duplicate answered with a reply found in the database"""
+        self.restored += 1
+
+    def stats(self) -> dict:
+        """Return counts of replayed and attached duplicate requests"""
+        return {
+            'in_flight': len(self._in_flight),
+            'completed': len(self._completed),
+            'replayed': self.replayed,
+            'restored': self.restored,
+            'attached': self.attached,
+        }
+
+
+idempotency = IdempotencyTable(maxsize=int(os.getenv('IDEMPOTENCY_TABLE_SIZE', '10000')))
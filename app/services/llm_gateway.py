@@ -0,0 +1,256 @@
+"""
+Gateway in front of the LLM providers.
+
+Owns one provider per configured credential (see
+:mod:`app.services.llm_providers`) and applies, to every call:
+- a concurrency cap (semaphore),
+- a token-bucket rate limit that halves on 429 / RESOURCE_EXHAUSTED and
+  recovers additively on success,
+- retries with exponential backoff and full jitter for transient errors
+  (only before the first chunk, so output is never duplicated; timeouts are
+  not retried, so a stalled call costs the caller one timeout, not several),
+- round-robin key rotation that skips keys cooling down after a 429,
+- per-key latency and error counters.
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+from dotenv import load_dotenv
+from app.services.llm_providers import LLMProvider, LLM_PROVIDER, create_providers
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+# Requests per second allowed by the token bucket, and its burst size
+LLM_RATE_LIMIT = float(os.getenv('LLM_RATE_LIMIT', '10'))
+LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', '20'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '0.5'))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '8'))
+# Seconds a key is skipped after it was rate limited
+LLM_KEY_COOLDOWN = float(os.getenv('LLM_KEY_COOLDOWN', '30'))
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate adapts to rate-limit feedback (AIMD)
+
+    :param rate: Maximum refill rate in tokens per second
+    :param burst: Bucket capacity
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def on_rate_limited(self):
+        """Multiplicative decrease after a 429"""
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+        logger.warning(f"LLM rate limit hit, token bucket rate lowered to {self.rate:.2f}/s")
+
+    def on_success(self):
+        """Additive increase back towards the configured rate"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class KeySlot:
+    """A provider for one credential plus its health and latency counters"""
+
+    def __init__(self, index: int, provider: LLMProvider):
+        self.index = index
+        self.provider = provider
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+
+    def stats(self) -> dict:
+        ok = self.requests - self.errors
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'avg_ms': self.total_ms / ok if ok else 0.0,
+            'last_ms': self.last_ms,
+            'cooling_down': self.cooldown_until > time.monotonic(),
+        }
+
+
+class LLMGateway:
+    """
+    Concurrency-capped, rate-limited, retrying access to the LLM providers
+
+    Each instance has its own semaphore and token bucket, so background work
+    given a separate gateway never takes permits or rate from ``/chat``.
+
+    :param providers: One provider per credential
+    :param name: Name the metrics are exported under
+    :param concurrency: Maximum calls in flight
+    :param rate: Requests per second allowed by the token bucket
+    :param burst: Token bucket capacity
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        name: str = 'llm_gateway',
+        concurrency: int = LLM_MAX_CONCURRENCY,
+        rate: float = LLM_RATE_LIMIT,
+        burst: int = LLM_RATE_BURST,
+    ):
+        self.name = name
+        self.slots = [KeySlot(i, provider) for i, provider in enumerate(providers)]
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = AdaptiveTokenBucket(rate, burst)
+        self.retries = 0
+        self._next = 0
+        metrics.register(name, self.stats)
+
+    def _pick_slot(self) -> KeySlot:
+        """Round-robin over keys, skipping ones in cooldown when possible"""
+        now = time.monotonic()
+        for _ in range(len(self.slots)):
+            slot = self.slots[self._next % len(self.slots)]
+            self._next += 1
+            if slot.cooldown_until <= now:
+                return slot
+        return min(self.slots, key=lambda s: s.cooldown_until)
+
+    @asynccontextmanager
+    async def _attempt(self, slot: KeySlot):
+        """Rate limit, cap concurrency and record the outcome of one call on a slot"""
+        await self.bucket.acquire()
+        async with self.semaphore:
+            slot.requests += 1
+            start = time.perf_counter()
+            try:
+                yield
+            except Exception as e:
+                slot.errors += 1
+                if slot.provider.is_rate_limited(e):
+                    slot.rate_limited += 1
+                    slot.cooldown_until = time.monotonic() + LLM_KEY_COOLDOWN
+                    self.bucket.on_rate_limited()
+                raise
+            slot.last_ms = (time.perf_counter() - start) * 1000
+            slot.total_ms += slot.last_ms
+            self.bucket.on_success()
+
+    async def _backoff(self, slot: KeySlot, attempt: int, error: BaseException):
+        """Sleep before the next attempt"""
+        self.retries += 1
+        delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+        logger.warning(
+            f"{self.name}: LLM call on key #{slot.index} failed ({type(error).__name__}: {error}), "
+            f"retry {attempt}/{LLM_MAX_RETRIES} in {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
+
+    async def stream(self, model: str, prompt: str, timeout: float) -> AsyncIterator[str]:
+        """
+        Stream text chunks for a prompt
+
+        :param model: Model name
+        :type model: str
+        :param prompt: Prompt text
+        :type prompt: str
+        :param timeout: Seconds to wait for the first chunk
+        :type timeout: float
+        :return: Async iterator of text chunks
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            slot = self._pick_slot()
+            yielded = False
+            chunks = slot.provider.stream(model, prompt)
+            try:
+                async with self._attempt(slot):
+                    try:
+                        first = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        return
+                    yielded = True
+                    yield first
+                    async for text in chunks:
+                        yield text
+                return
+            except Exception as e:
+                if yielded or attempt > LLM_MAX_RETRIES or not slot.provider.is_transient(e):
+                    raise
+                error = e
+            finally:
+                await chunks.aclose()
+            await self._backoff(slot, attempt, error)
+
+    async def generate(self, model: str, prompt: str, timeout: float) -> str:
+        """
+        Return the full reply for a prompt without streaming
+
+        :param model: Model name
+        :type model: str
+        :param prompt: Prompt text
+        :type prompt: str
+        :param timeout: Seconds to wait for the reply
+        :type timeout: float
+        :return: Reply text
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            slot = self._pick_slot()
+            try:
+                async with self._attempt(slot):
+                    return await asyncio.wait_for(slot.provider.generate(model, prompt), timeout=timeout)
+            except Exception as e:
+                if attempt > LLM_MAX_RETRIES or not slot.provider.is_transient(e):
+                    raise
+                error = e
+            await self._backoff(slot, attempt, error)
+
+    def stats(self) -> dict:
+        """Return gateway-wide and per-key metrics"""
+        return {
+            'provider': LLM_PROVIDER,
+            'rate_limit': self.bucket.rate,
+            'retries': self.retries,
+            'keys': {f"key{slot.index}": slot.stats() for slot in self.slots},
+        }
+
+
+try:
+    gateway = LLMGateway(create_providers())
+    logger.info(f"LLM client initialized successfully ({LLM_PROVIDER}, {len(gateway.slots)} key(s))")
+except Exception as e:
+    logger.error(f'Failed to initialize LLM client: {e}')
+    raise
@@ -0,0 +1,209 @@
+"""
+LLM providers behind the gateway.
+
+A provider knows how to talk to one backend with one credential, both
+streaming and non-streaming, and how to classify that backend's errors.
+``LLM_PROVIDER`` selects the implementation:
+
+- ``gemini`` (default): Google Gemini, one provider per configured API key.
+- ``stub``: a local provider producing deterministic text with configurable
+  first-token delay, inter-chunk delay and error injection. Needs no API key
+  and costs nothing, so the whole pipeline can be load-tested and profiled.
+"""
+import asyncio
+import hashlib
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List
+import google.genai as genai
+import httpx
+from google.genai import errors as genai_errors
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini').lower()
+
+# Stub provider tuning
+LLM_STUB_FIRST_TOKEN_MS = float(os.getenv('LLM_STUB_FIRST_TOKEN_MS', '300'))
+LLM_STUB_CHUNK_MS = float(os.getenv('LLM_STUB_CHUNK_MS', '40'))
+LLM_STUB_CHUNKS = int(os.getenv('LLM_STUB_CHUNKS', '8'))
+LLM_STUB_WORDS_PER_CHUNK = int(os.getenv('LLM_STUB_WORDS_PER_CHUNK', '4'))
+# Fraction of calls that fail, and how: 'transient', 'rate_limit' or 'fatal'
+LLM_STUB_ERROR_RATE = float(os.getenv('LLM_STUB_ERROR_RATE', '0'))
+LLM_STUB_ERROR_KIND = os.getenv('LLM_STUB_ERROR_KIND', 'transient')
+# Fail after this many chunks instead of before the first one (-1 = before)
+LLM_STUB_ERROR_AFTER_CHUNKS = int(os.getenv('LLM_STUB_ERROR_AFTER_CHUNKS', '-1'))
+LLM_STUB_SEED = int(os.getenv('LLM_STUB_SEED', '0'))
+
+STUB_WORDS = (
+    'yeah sure honestly that sounds fun lol wait what did you mean by that '
+    'i think we should totally do it later maybe tomorrow after class ok'
+).split()
+
+
+class LLMProvider(ABC):
+    """Interface implemented by every LLM backend"""
+
+    name = 'base'
+
+    @abstractmethod
+    def stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream non-empty text chunks for a prompt
+
+        :param model: Model name
+        :type model: str
+        :param prompt: Prompt text
+        :type prompt: str
+        :return: Async iterator of text chunks
+        """
+
+    @abstractmethod
+    async def generate(self, model: str, prompt: str) -> str:
+        """Return the full reply for a prompt"""
+
+    def is_rate_limited(self, error: BaseException) -> bool:
+        """Whether an error is a quota / rate limit response"""
+        return False
+
+    def is_transient(self, error: BaseException) -> bool:
+        """
+        Whether an error is worth retrying
+
+        Timeouts are not: the caller's deadline is already spent by then.
+        """
+        if isinstance(error, asyncio.TimeoutError):
+            return False
+        return self.is_rate_limited(error) or isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through ``google.genai`` with a single API key"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key: str):
+        self.client = genai.Client(api_key=api_key)
+
+    async def stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        response_stream = await self.client.aio.models.generate_content_stream(model=model, contents=prompt)
+        async for chunk in response_stream:
+            if chunk.text:
+                yield chunk.text
+
+    async def generate(self, model: str, prompt: str) -> str:
+        response = await self.client.aio.models.generate_content(model=model, contents=prompt)
+        return response.text or ''
+
+    def is_rate_limited(self, error: BaseException) -> bool:
+        return isinstance(error, genai_errors.APIError) and (
+            error.code == 429 or getattr(error, 'status', None) == 'RESOURCE_EXHAUSTED'
+        )
+
+    def is_transient(self, error: BaseException) -> bool:
+        if isinstance(error, genai_errors.ServerError):
+            return True
+        if isinstance(error, genai_errors.APIError) and error.code == 408:
+            return True
+        return super().is_transient(error)
+
+
+class StubError(Exception):
+    """Error injected by :class:`StubProvider`"""
+
+    def __init__(self, kind: str):
+        super().__init__(f"injected {kind} error")
+        self.kind = kind
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic local provider for benchmarks and load tests
+
+    The reply text depends only on the prompt. Whether a call fails is drawn
+    from a generator seeded with ``seed``, so a run is reproducible.
+
+    :param first_token_ms: Delay before the first chunk
+    :param chunk_ms: Delay between chunks
+    :param chunks: Number of chunks per reply
+    :param words_per_chunk: Words in each chunk
+    :param error_rate: Fraction of calls that raise :class:`StubError`
+    :param error_kind: 'transient', 'rate_limit' or 'fatal'
+    :param error_after_chunks: Chunks sent before failing (-1 fails before the first)
+    :param seed: Seed for error injection
+    """
+
+    name = 'stub'
+
+    def __init__(
+        self,
+        first_token_ms: float = LLM_STUB_FIRST_TOKEN_MS,
+        chunk_ms: float = LLM_STUB_CHUNK_MS,
+        chunks: int = LLM_STUB_CHUNKS,
+        words_per_chunk: int = LLM_STUB_WORDS_PER_CHUNK,
+        error_rate: float = LLM_STUB_ERROR_RATE,
+        error_kind: str = LLM_STUB_ERROR_KIND,
+        error_after_chunks: int = LLM_STUB_ERROR_AFTER_CHUNKS,
+        seed: int = LLM_STUB_SEED,
+    ):
+        self.first_token_ms = first_token_ms
+        self.chunk_ms = chunk_ms
+        self.chunks = chunks
+        self.words_per_chunk = words_per_chunk
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.error_after_chunks = error_after_chunks
+        self.random = random.Random(seed)
+
+    def reply_chunks(self, prompt: str) -> List[str]:
+        """The chunks the stub returns for a prompt"""
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        words = [STUB_WORDS[digest[i % len(digest)] % len(STUB_WORDS)]
+                 for i in range(self.chunks * self.words_per_chunk)]
+        n = self.words_per_chunk
+        return [" ".join(words[i:i + n]) + " " for i in range(0, len(words), n)]
+
+    async def stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        fail = self.random.random() < self.error_rate
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for i, text in enumerate(self.reply_chunks(prompt)):
+            if fail and i == max(self.error_after_chunks, 0):
+                raise StubError(self.error_kind)
+            if i:
+                await asyncio.sleep(self.chunk_ms / 1000)
+            yield text
+        if fail:
+            raise StubError(self.error_kind)
+
+    async def generate(self, model: str, prompt: str) -> str:
+        return "".join([text async for text in self.stream(model, prompt)])
+
+    def is_rate_limited(self, error: BaseException) -> bool:
+        return isinstance(error, StubError) and error.kind == 'rate_limit'
+
+    def is_transient(self, error: BaseException) -> bool:
+        if isinstance(error, StubError):
+            return error.kind != 'fatal'
+        return super().is_transient(error)
+
+
+def _api_keys() -> List[str]:
+    keys = [k.strip() for k in os.getenv('LLM_API_KEYS', '').split(',') if k.strip()]
+    return keys or [os.getenv('LLM_API_KEY')]
+
+
+def create_providers(kind: str = LLM_PROVIDER) -> List[LLMProvider]:
+    """
+    Build the providers the gateway rotates over
+
+    :param kind: Provider name, 'gemini' or 'stub'
+    :type kind: str
+    :return: One provider per credential
+    """
+    if kind == 'gemini':
+        return [GeminiProvider(key) for key in _api_keys()]
+    if kind == 'stub':
+        return [StubProvider()]
+    raise ValueError(f"Unknown LLM_PROVIDER '{kind}' (expected 'gemini' or 'stub')")
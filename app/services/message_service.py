@@ -1,21 +1,62 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, insert
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from app.schemas.chat import Payload
 from app.schemas.chat import BotMessageRecieve as bMp
-from app.schemas.chat import ChannelMessages
-from app.models.message import BotMessages
+from app.schemas.chat import ChannelMessageIn
+from app.models.message import BotMessages, ChannelMessages
+from app.services.cache import TTLCache
+from app.services.history_cache import ConversationHistory, Turn
+from app.services.persistence import writer, channel_writer
+from app.services.retrieval import retrieval_index
 from app.utils.logger import get_logger
-from typing import Optional
+from typing import List, Optional
+from collections import Counter
+from datetime import datetime
+import os
 
 logger = get_logger(__name__)
 
+# Number of previous turns included in the prompt
+HISTORY_TURNS = 5
+# Return replies before their row is written; rows are batched in the background
+WRITE_BEHIND = os.getenv('MESSAGE_WRITE_BEHIND', 'true').lower() == 'true'
+
+history = ConversationHistory(
+    turns=HISTORY_TURNS,
+    max_users=int(os.getenv('HISTORY_MAX_USERS', '10000')),
+)
+
+# Recent messages kept in memory per channel, served by the recent-context API
+CHANNEL_CONTEXT_SIZE = int(os.getenv('CHANNEL_CONTEXT_SIZE', '20'))
+# Channel messages added to each prompt (0 leaves the CHANNEL section out)
+CHANNEL_CONTEXT_MESSAGES = min(int(os.getenv('CHANNEL_CONTEXT_MESSAGES', '0')), CHANNEL_CONTEXT_SIZE)
+# channel_messages.content is VARCHAR(1000); longer messages are cut rather than failing the batch
+CHANNEL_CONTENT_MAX = 1000
+
+# channel_id -> recent (user_id, content) messages
+channel_history = ConversationHistory(
+    turns=CHANNEL_CONTEXT_SIZE,
+    max_users=int(os.getenv('CHANNEL_HISTORY_MAX_CHANNELS', '5000')),
+    name='channel_history',
+)
+
+# Turns stored per user since the summary worker last looked at them
+unsummarized = Counter()
+
+# user_id -> rolling summary of older turns (None when the user has none yet)
+summary_cache = TTLCache(
+    'summary',
+    maxsize=int(os.getenv('SUMMARY_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('SUMMARY_CACHE_TTL', '3600')),
+)
+
 async def get_user_messages(user_id : str, db:AsyncSession)->Optional[BotMessages]:
-    """Get the last 5 messages for a user"""
+    """Get the last HISTORY_TURNS messages for a user from the database"""
     try:
-        logger.debug(f"Fetching last 5 messages for user: {user_id}")
-        results = await db.execute(select(BotMessages).where(BotMessages.user_id == user_id).order_by(desc(BotMessages.id)).limit(5))
+        logger.debug(f"Fetching last {HISTORY_TURNS} messages for user: {user_id}")
+        results = await db.execute(select(BotMessages).where(BotMessages.user_id == user_id).order_by(desc(BotMessages.id)).limit(HISTORY_TURNS))
         messages = results.scalars().all()
         logger.debug(f"Retrieved {len(messages)} messages for user {user_id}")
         return messages
@@ -27,18 +68,114 @@ async def add_user_messages(message: bMp, db:AsyncSession):
     """Store a message in the database"""
     try:
        logger.debug(f"Storing message for user {message.user_id} in channel {message.channel_id}")
-       db_message = BotMessages(**message.model_dump()) 
+       db_message = BotMessages(**message.model_dump(), dateTime=datetime.utcnow())
        db.add(db_message)
 
        await db.commit()
-       await db.refresh(db_message)
+       history.append(message.user_id, (message.content, message.bot_reply))
+       unsummarized[message.user_id] += 1
+       retrieval_index.add(message.user_id, message.content, message.bot_reply, message.message_id)
        logger.info(f"Successfully stored message for user {message.user_id}")
 
+    except IntegrityError:
+        await db.rollback()
+        logger.warning(f"Message {message.message_id} for user {message.user_id} already stored, skipping")
     except Exception as e:
         await db.rollback()
         logger.error(f"Error storing message for user {message.user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error storing message: {e}")
 
-async def get_all_messages(message : ChannelMessages, db:AsyncSession):
-    # Storing all messages
-    pass
\ No newline at end of file
+async def save_turn(message: bMp, db: AsyncSession):
+    """Persist a turn, through the write-behind queue when it is running"""
+    if WRITE_BEHIND and writer.running:
+        history.append(message.user_id, (message.content, message.bot_reply))
+        unsummarized[message.user_id] += 1
+        retrieval_index.add(message.user_id, message.content, message.bot_reply, message.message_id)
+        await writer.submit(message)
+    else:
+        await add_user_messages(message=message, db=db)
+
+async def get_all_messages(messages: List[ChannelMessageIn], db: AsyncSession) -> int:
+    """
+    Store channel messages streamed in by the bot
+
+    Rows go through the channel write-behind queue when it is running and
+    are refused, never waited for, once its backlog is full so ingestion
+    cannot hold up the event loop ``/chat`` runs on.
+
+    :param messages: Messages in the order they were sent
+    :param db: Database session, used only when the queue is not running
+    :type db: AsyncSession
+    :return: Number of messages accepted (a prefix of ``messages``)
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            'server_id': m.server_id,
+            'channel_id': m.channel_id,
+            'user_id': m.user_id,
+            'content': m.content[:CHANNEL_CONTENT_MAX],
+            'dateTime': m.dateTime or now,
+        }
+        for m in messages
+    ]
+    if channel_writer.running:
+        accepted = channel_writer.offer(rows)
+    else:
+        try:
+            if rows:
+                await db.execute(insert(ChannelMessages), rows)
+                await db.commit()
+            accepted = len(rows)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error storing {len(rows)} channel messages: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error storing channel messages: {e}")
+
+    for row in rows[:accepted]:
+        channel_history.append(row['channel_id'], (row['user_id'], row['content']))
+    if accepted < len(rows):
+        logger.warning(f"Channel ingest backlog full, refused {len(rows) - accepted} of {len(rows)} messages")
+    return accepted
+
+async def get_channel_messages(channel_id: str, db: AsyncSession) -> List[Turn]:
+    """Get the last CHANNEL_CONTEXT_SIZE messages of a channel as (user_id, content) tuples, newest first"""
+    async def load(cid: str) -> List[Turn]:
+        logger.debug(f"Fetching last {CHANNEL_CONTEXT_SIZE} messages for channel: {cid}")
+        results = await db.execute(
+            select(ChannelMessages.user_id, ChannelMessages.content)
+            .where(ChannelMessages.channel_id == cid)
+            .order_by(desc(ChannelMessages.dateTime), desc(ChannelMessages.id))
+            .limit(CHANNEL_CONTEXT_SIZE)
+        )
+        return [(r.user_id, r.content) for r in results.all()]
+
+    return await channel_history.get(channel_id, load)
+
+async def get_channel_context(payload: Payload, db: AsyncSession) -> List[Turn]:
+    """
+    Get the channel messages to show next to a prompt, newest first
+
+    The bot ingests a message before asking for a reply to it, so the
+    newest messages of the same user that make up ``payload.content`` (one
+    message, or a debounced burst) are left out.
+
+    :param payload: Chat payload the prompt is built for
+    :type payload: Payload
+    :param db: Database session
+    :type db: AsyncSession
+    :return: Up to CHANNEL_CONTEXT_MESSAGES (user_id, content) tuples
+    """
+    messages = await get_channel_messages(str(payload.channel_id), db)
+    return _channel_context(payload, messages)
+
+def peek_channel_context(payload: Payload) -> Optional[List[Turn]]:
+    """Like :func:`get_channel_context`, from memory only; None if the channel is not cached"""
+    messages = channel_history.peek(str(payload.channel_id))
+    return None if messages is None else _channel_context(payload, messages)
+
+def _channel_context(payload: Payload, messages: List[Turn]) -> List[Turn]:
+    skip = 0
+    while skip < len(messages) and messages[skip][0] == payload.user_id and messages[skip][1] in payload.content:
+        skip += 1
+    return messages[skip:skip + CHANNEL_CONTEXT_MESSAGES]
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Per-request choice between a fast and a full LLM model.
+
+Short messages with little history go to the fast model; long ones, long
+conversations and users/channels classed as needing the full model go to
+the full one. A user's role JSON may pin a tier with ``"llm_tier": "fast"``
+or ``"full"``, and channels can be pinned with ``LLM_ROUTER_FAST_CHANNELS`` /
+``LLM_ROUTER_FULL_CHANNELS``. If the chosen model's recent p95 latency is
+over ``LLM_ROUTER_LATENCY_SLO_MS`` and the other model is currently faster,
+the request is moved to the other model. On a timeout, callers fall back to
+:meth:`ModelRouter.alternate`.
+
+Every decision (with its reason) and per-model p50/p95 latencies are
+exported at ``/metrics`` as ``llm_router`` so the thresholds can be tuned.
+"""
+import os
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+LLM_ROUTER_ENABLED = os.getenv('LLM_ROUTER_ENABLED', 'false').lower() == 'true'
+LLM_FAST_MODEL = os.getenv('LLM_FAST_MODEL', 'gemini-2.5-flash-lite')
+LLM_FULL_MODEL = os.getenv('LLM_FULL_MODEL', 'gemini-2.5-flash')
+# Messages longer than this, or with more history than this, use the full model
+LLM_ROUTER_FAST_MAX_CHARS = int(os.getenv('LLM_ROUTER_FAST_MAX_CHARS', '160'))
+LLM_ROUTER_FAST_MAX_HISTORY_CHARS = int(os.getenv('LLM_ROUTER_FAST_MAX_HISTORY_CHARS', '2000'))
+LLM_ROUTER_FAST_CHANNELS = {c.strip() for c in os.getenv('LLM_ROUTER_FAST_CHANNELS', '').split(',') if c.strip()}
+LLM_ROUTER_FULL_CHANNELS = {c.strip() for c in os.getenv('LLM_ROUTER_FULL_CHANNELS', '').split(',') if c.strip()}
+# p95 above which a model is avoided if the other one is faster
+LLM_ROUTER_LATENCY_SLO_MS = float(os.getenv('LLM_ROUTER_LATENCY_SLO_MS', '8000'))
+LLM_ROUTER_WINDOW = int(os.getenv('LLM_ROUTER_WINDOW', '200'))
+LLM_ROUTER_MIN_SAMPLES = 10
+
+TIERS = ('fast', 'full')
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ModelRouter:
+    """
+    Pick a model per request and keep per-model latency samples
+
+    :param enabled: Route between models; when False the full model is always used
+    :param fast_model: Model for cheap, short requests
+    :param full_model: Model for everything else
+    """
+
+    def __init__(self, enabled: bool, fast_model: str, full_model: str):
+        self.enabled = enabled
+        self.models = {'fast': fast_model, 'full': full_model}
+        self.latency_ms: Dict[str, Deque[float]] = {m: deque(maxlen=LLM_ROUTER_WINDOW) for m in self.models.values()}
+        self.ttft_ms: Dict[str, Deque[float]] = {m: deque(maxlen=LLM_ROUTER_WINDOW) for m in self.models.values()}
+        self.decisions: Counter = Counter()
+        self.fallbacks: Counter = Counter()
+        metrics.register('llm_router', self.stats)
+
+    def choose(self, content: str, history: List[Tuple[str, str]], role: Optional[dict], channel_id: str) -> str:
+        """
+        Choose the model for a request
+
+        :param content: Current message
+        :type content: str
+        :param history: Previous (content, bot_reply) turns included in the prompt
+        :param role: The user's role JSON, if any
+        :param channel_id: Channel the message came from
+        :type channel_id: str
+        :return: Model name
+        """
+        if not self.enabled:
+            return self.models['full']
+
+        tier, reason = self._classify(content, history, role, channel_id)
+        if reason not in ('role', 'channel'):
+            other = 'full' if tier == 'fast' else 'fast'
+            if self._p95(self.models[tier]) > LLM_ROUTER_LATENCY_SLO_MS and \
+                    self._p95(self.models[other]) < self._p95(self.models[tier]):
+                tier, reason = other, 'latency'
+
+        self.decisions[f"{tier}:{reason}"] += 1
+        logger.debug(f"Routed request to {self.models[tier]} ({reason})")
+        return self.models[tier]
+
+    def _classify(self, content: str, history: List[Tuple[str, str]], role: Optional[dict], channel_id: str) -> Tuple[str, str]:
+        pinned = (role or {}).get('llm_tier')
+        if pinned in TIERS:
+            return pinned, 'role'
+        if channel_id in LLM_ROUTER_FULL_CHANNELS:
+            return 'full', 'channel'
+        if channel_id in LLM_ROUTER_FAST_CHANNELS:
+            return 'fast', 'channel'
+        if len(content) > LLM_ROUTER_FAST_MAX_CHARS:
+            return 'full', 'length'
+        if sum(len(c or '') + len(r or '') for c, r in history) > LLM_ROUTER_FAST_MAX_HISTORY_CHARS:
+            return 'full', 'history'
+        return 'fast', 'short'
+
+    def alternate(self, model: str) -> Optional[str]:
+        """The model to fall back to after ``model`` timed out, or None when routing is off"""
+        if not self.enabled:
+            return None
+        return self.models['full'] if model == self.models['fast'] else self.models['fast']
+
+    def record(self, model: str, ttft_ms: float, total_ms: float):
+        """Record the latency of a completed call"""
+        if model in self.latency_ms:
+            self.ttft_ms[model].append(ttft_ms)
+            self.latency_ms[model].append(total_ms)
+
+    def record_fallback(self, model: str, alternate: str, waited_ms: float):
+        """Record a timeout on ``model`` that was retried on ``alternate``"""
+        self.fallbacks[f"{model}->{alternate}"] += 1
+        # Count the wait as a sample so a model that keeps timing out looks slow
+        if model in self.latency_ms:
+            self.latency_ms[model].append(waited_ms)
+        logger.warning(f"LLM model {model} timed out, falling back to {alternate}")
+
+    def _p95(self, model: str) -> float:
+        samples = self.latency_ms[model]
+        if len(samples) < LLM_ROUTER_MIN_SAMPLES:
+            return 0.0
+        return _percentile(list(samples), 95)
+
+    def stats(self) -> dict:
+        """Return routing decisions, fallbacks and per-model latency percentiles"""
+        return {
+            'enabled': self.enabled,
+            'decisions': dict(self.decisions),
+            'fallbacks': dict(self.fallbacks),
+            'models': {
+                model: {
+                    'samples': len(self.latency_ms[model]),
+                    'p50_ms': _percentile(list(self.latency_ms[model]), 50),
+                    'p95_ms': _percentile(list(self.latency_ms[model]), 95),
+                    'ttft_p50_ms': _percentile(list(self.ttft_ms[model]), 50),
+                    'ttft_p95_ms': _percentile(list(self.ttft_ms[model]), 95),
+                }
+                for model in self.latency_ms
+            },
+        }
+
+
+router = ModelRouter(LLM_ROUTER_ENABLED, LLM_FAST_MODEL, LLM_FULL_MODEL)
@@ -0,0 +1,226 @@
+"""
+Write-behind persistence for conversation turns and channel messages.
+
+Replies are returned to Discord as soon as they are generated; the
+``bot_messages`` rows are queued here and written by a background
+flusher using multi-row INSERTs every ``interval_ms`` or ``batch_size``
+rows, whichever comes first. Channel messages streamed in by the bot
+take the same path into ``channel_messages`` through a second writer.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import List, Optional, Type
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+from app.db.session import AsyncSessionLocal
+from app.db.base import Base
+from app.models.message import BotMessages, ChannelMessages
+from app.schemas.chat import BotMessageRecieve
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageWriter:
+    """
+    Background batch writer for message rows
+
+    :param name: Name used in logs and metrics
+    :param model: ORM model the rows are inserted into
+    :param batch_size: Maximum rows per INSERT
+    :param interval_ms: Maximum time a row waits before being flushed
+    :param max_backlog: Maximum queued rows; producers wait (or are refused) when it is full
+    :param max_retries: Attempts per batch on transient DB errors
+    """
+
+    def __init__(self, name: str, model: Type[Base], batch_size: int, interval_ms: int, max_backlog: int,
+                 max_retries: int):
+        self.name = name
+        self.model = model
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.max_retries = max_retries
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=max_backlog)
+        self._task: Optional[asyncio.Task] = None
+        self._batch_ready = asyncio.Event()
+        self._idle = True
+        self._stopping = False
+
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches = 0
+        self.retries = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.rows_refused = 0
+        # Rows (INSERT IGNORE) of the given model, executed as one multi-row statement
+        self._insert = (
+            insert(model)
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('OR IGNORE', dialect='sqlite')
+        )
+        metrics.register(name, self.stats)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background flusher on the running loop"""
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Write-behind flusher '{self.name}' started (batch={self.batch_size}, "
+                f"interval={self.interval * 1000:.0f}ms, backlog={self.queue.maxsize})"
+            )
+
+    async def stop(self):
+        """Stop the flusher after writing everything still queued"""
+        if not self.running:
+            return
+        self._stopping = True
+        if self._idle:
+            # Waiting on an empty queue, nothing is held in memory
+            self._task.cancel()
+        else:
+            self._batch_ready.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        while not self.queue.empty():
+            await self._write(self._take(self.batch_size))
+        logger.info(f"Write-behind flusher '{self.name}' stopped ({self.rows_written} rows written)")
+
+    async def submit(self, message: BotMessageRecieve):
+        """
+        Queue a turn for persistence, waiting if the backlog is full
+
+        :param message: Turn to store
+        :type message: BotMessageRecieve
+        """
+        row = message.model_dump()
+        row['dateTime'] = datetime.utcnow()
+        await self.queue.put(row)
+        if self.queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    def offer(self, rows: List[dict]) -> int:
+        """
+        Queue rows without waiting; rows that do not fit are refused
+
+        :param rows: Column dicts for the writer's model
+        :return: Number of rows accepted (a prefix of ``rows``)
+        """
+        free = self.queue.maxsize - self.queue.qsize() if self.queue.maxsize > 0 else len(rows)
+        accepted = min(len(rows), free)
+        for row in rows[:accepted]:
+            self.queue.put_nowait(row)
+        self.rows_refused += len(rows) - accepted
+        if self.queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+        return accepted
+
+    def _take(self, limit: int) -> List[dict]:
+        rows = []
+        while len(rows) < limit and not self.queue.empty():
+            rows.append(self.queue.get_nowait())
+        return rows
+
+    async def _run(self):
+        while not self._stopping:
+            self._idle = True
+            rows = [await self.queue.get()]
+            self._idle = False
+
+            # Collect more rows until the batch is full or the interval has passed
+            deadline = time.monotonic() + self.interval
+            while True:
+                rows.extend(self._take(self.batch_size - len(rows)))
+                remaining = deadline - time.monotonic()
+                if len(rows) >= self.batch_size or remaining <= 0 or self._stopping:
+                    break
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            await self._write(rows)
+
+    async def _write(self, rows: List[dict]):
+        if not rows:
+            return
+        start = time.perf_counter()
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    # executemany of one cached statement, sent as multi-row
+                    # INSERT ... VALUES (...), (...). Rows whose unique key
+                    # (message_id) was already stored are skipped, not failed
+                    await db.execute(self._insert, rows)
+                    await db.commit()
+                break
+            except DBAPIError as e:
+                if attempt == self.max_retries or not self._transient(e):
+                    self.rows_dropped += len(rows)
+                    logger.error(f"[{self.name}] Dropping batch of {len(rows)} rows after {attempt} attempts: {e}", exc_info=True)
+                    return
+                self.retries += 1
+                backoff = min(0.1 * 2 ** attempt, 5) * random.uniform(0.5, 1.5)
+                logger.warning(f"[{self.name}] Batch insert failed (attempt {attempt}), retrying in {backoff:.2f}s: {e}")
+                await asyncio.sleep(backoff)
+            except Exception as e:
+                self.rows_dropped += len(rows)
+                logger.error(f"[{self.name}] Dropping batch of {len(rows)} rows: {e}", exc_info=True)
+                return
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.batches += 1
+        self.rows_written += len(rows)
+        self.last_batch_size = len(rows)
+        self.last_flush_ms = elapsed
+        self.total_flush_ms += elapsed
+        logger.debug(f"[{self.name}] Flushed {len(rows)} rows in {elapsed:.2f}ms")
+
+    @staticmethod
+    def _transient(error: DBAPIError) -> bool:
+        # OperationalError covers lost connections, lock wait timeouts and deadlocks
+        return isinstance(error, OperationalError) or error.connection_invalidated
+
+    def stats(self) -> dict:
+        """Return flush latency, batch size and backlog metrics"""
+        return {
+            'backlog': self.queue.qsize(),
+            'rows_written': self.rows_written,
+            'rows_dropped': self.rows_dropped,
+            'rows_refused': self.rows_refused,
+            'batches': self.batches,
+            'retries': self.retries,
+            'last_batch_size': self.last_batch_size,
+            'avg_batch_size': self.rows_written / self.batches if self.batches else 0.0,
+            'last_flush_ms': self.last_flush_ms,
+            'avg_flush_ms': self.total_flush_ms / self.batches if self.batches else 0.0,
+        }
+
+
+writer = MessageWriter(
+    'write_behind',
+    BotMessages,
+    batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '100')),
+    interval_ms=int(os.getenv('WRITE_BEHIND_INTERVAL_MS', '200')),
+    max_backlog=int(os.getenv('WRITE_BEHIND_MAX_BACKLOG', '10000')),
+    max_retries=int(os.getenv('WRITE_BEHIND_MAX_RETRIES', '5')),
+)
+
+channel_writer = MessageWriter(
+    'channel_ingest',
+    ChannelMessages,
+    batch_size=int(os.getenv('CHANNEL_INGEST_BATCH_SIZE', '1000')),
+    interval_ms=int(os.getenv('CHANNEL_INGEST_INTERVAL_MS', '500')),
+    max_backlog=int(os.getenv('CHANNEL_INGEST_MAX_BACKLOG', '50000')),
+    max_retries=int(os.getenv('CHANNEL_INGEST_MAX_RETRIES', '5')),
+)
@@ -1,3 +1,46 @@
+import os
+import textwrap
+from typing import Dict, List, Optional, Tuple
+
+# Rough size of a token for budgeting; close enough for Gemini on mixed
+# English/Hinglish text without pulling in a tokenizer
+PROMPT_CHARS_PER_TOKEN = float(os.getenv('PROMPT_CHARS_PER_TOKEN', '4'))
+# Token budget for the whole prompt, and caps for a single persona field
+# and a single history message
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '1500'))
+PROMPT_MAX_FIELD_TOKENS = int(os.getenv('PROMPT_MAX_FIELD_TOKENS', '120'))
+PROMPT_MAX_TURN_TOKENS = int(os.getenv('PROMPT_MAX_TURN_TOKENS', '150'))
+PROMPT_MAX_SUMMARY_TOKENS = int(os.getenv('PROMPT_MAX_SUMMARY_TOKENS', '200'))
+# Share of the budget recalled older turns may use; recent history comes first
+PROMPT_MAX_RECALL_TOKENS = int(os.getenv('PROMPT_MAX_RECALL_TOKENS', '300'))
+# Share of the budget the latest channel messages may use, after history
+PROMPT_MAX_CHANNEL_TOKENS = int(os.getenv('PROMPT_MAX_CHANNEL_TOKENS', '300'))
+PROMPT_MIN_FIELD_TOKENS = 8
+
+# Compiled once at import; only the per-request sections are rendered per call
+STATIC_INSTRUCTIONS = " ".join(textwrap.dedent("""
+    You are an intelligent conversational assistant operating inside a Discord environment.
+    Your responses must be context-aware, role-aware, and concise.
+    Your task is to pretend like Pratik the admin. You are given my persona (ADMIN) and, for every message,
+    the user's persona (USER): name, relationship, nicknames and instructions on how to talk with that
+    specific user. Follow them while replying and do not generalize user roles.
+    SUMMARY, when present, summarizes your earlier conversations with this user and RECALLED holds older
+    exchanges that may be relevant to the current message. CHANNEL, when present, holds the latest messages
+    from everyone in the channel, as "user: message", for context only. HISTORY holds the most
+    recent messages, U for the user and A for you. Do not reply to them; they only tell you what the
+    conversation is about. The conversation must be smooth and must not look robotic.
+    Languages -> [BENGLISH / HINGLISH / ENGLISH]. Reply only to MESSAGE.
+""").split())
+
+SUMMARY_INSTRUCTIONS = " ".join(textwrap.dedent("""
+    You maintain a running summary of a Discord conversation between Pratik (A) and one user (U).
+    Merge the previous summary with the new messages into one updated summary of at most {words} words.
+    Keep facts about the user, their relationship with Pratik, plans, preferences and running jokes;
+    drop greetings and small talk. Write plain sentences, no lists, no preamble.
+""").split())
+
+Turn = Tuple[str, str]
+
 
 def develop_prompt(user_roles, context, previous_conv, admin_role):
     """
@@ -22,4 +65,150 @@ def develop_prompt(user_roles, context, previous_conv, admin_role):
     user_role:{user_roles},
     admin_role:{admin_role}
     """
-    return prompt
\ No newline at end of file
+    return prompt
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text"""
+    return int(len(text) / PROMPT_CHARS_PER_TOKEN) + 1
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Cut text to roughly ``max_tokens`` tokens, collapsing whitespace"""
+    limit = int(max_tokens * PROMPT_CHARS_PER_TOKEN)
+    text = str(text)
+    if len(text) <= limit and '\n' not in text and '  ' not in text:
+        return text
+    # Only the head survives, so skip collapsing whitespace in the rest
+    text = " ".join(text[:limit * 2].split())
+    return text if len(text) <= limit else text[:max(limit - 1, 0)] + "…"
+
+
+def render_persona(role: Optional[Dict], max_field_tokens: int) -> str:
+    """
+    Render a role JSON as ``key: value, value`` lines
+
+    :param role: Role JSON (values are strings or lists of strings)
+    :param max_field_tokens: Cap for each rendered value
+    :return: Compact persona text
+    """
+    lines = []
+    for key, value in (role or {}).items():
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(v) for v in value)
+        elif isinstance(value, dict):
+            value = ", ".join(f"{k}={v}" for k, v in value.items())
+        if value in ('', None):
+            continue
+        lines.append(f"{key}: {_clip(value, max_field_tokens)}")
+    return "\n".join(lines)
+
+
+def compose_prompt(
+    user_role: Optional[Dict],
+    message: str,
+    history: List[Turn],
+    admin_role: Optional[Dict],
+    summary: Optional[str] = None,
+    recalled: Optional[List[Turn]] = None,
+    budget: int = PROMPT_TOKEN_BUDGET,
+    channel: Optional[List[Turn]] = None,
+) -> str:
+    """
+    Build a compact prompt that fits a token budget
+
+    The static instructions, the current message and the (clipped) summary
+    are always kept. Persona fields are clipped (more aggressively if the
+    personas alone overflow the budget), then history is added newest first,
+    then channel messages up to ``PROMPT_MAX_CHANNEL_TOKENS`` and recalled
+    turns fill what is left, up to ``PROMPT_MAX_RECALL_TOKENS``.
+
+    :param user_role: The user's role JSON
+    :param message: Current message
+    :type message: str
+    :param history: Previous (content, bot_reply) turns, newest first
+    :param admin_role: The admin's role JSON
+    :param summary: Rolling summary of older turns, if any
+    :type summary: str
+    :param recalled: Older turns relevant to the message, best first
+    :param budget: Token budget for the whole prompt
+    :type budget: int
+    :param channel: Latest (user_id, content) messages in the channel, newest first
+    :return: Prompt string
+    """
+    tail = f"MESSAGE:\n{message}"
+    summary_block = f"SUMMARY:\n{_clip(summary, PROMPT_MAX_SUMMARY_TOKENS)}\n" if summary else ""
+    fixed_chars = len(STATIC_INSTRUCTIONS) + 1 + len(summary_block) + len(tail)
+
+    field_tokens = PROMPT_MAX_FIELD_TOKENS
+    while True:
+        personas = (
+            f"ADMIN:\n{render_persona(admin_role, field_tokens)}\n"
+            f"USER:\n{render_persona(user_role, field_tokens)}\n"
+        )
+        remaining = budget - int((fixed_chars + len(personas)) / PROMPT_CHARS_PER_TOKEN) - 1
+        if remaining >= 0 or field_tokens <= PROMPT_MIN_FIELD_TOKENS:
+            break
+        field_tokens = max(PROMPT_MIN_FIELD_TOKENS, field_tokens // 2)
+
+    lines, remaining = _render_turns(history, remaining)
+    history_block = f"HISTORY:\n{''.join(reversed(lines))}" if lines else ""
+
+    channel_block = ""
+    if channel:
+        share = min(remaining, PROMPT_MAX_CHANNEL_TOKENS)
+        channel_lines, left = _render_messages(channel, share)
+        channel_block = f"CHANNEL:\n{''.join(reversed(channel_lines))}" if channel_lines else ""
+        remaining -= share - left
+
+    recalled_lines, _ = _render_turns(recalled or [], min(remaining, PROMPT_MAX_RECALL_TOKENS))
+    recalled_block = f"RECALLED:\n{''.join(recalled_lines)}" if recalled_lines else ""
+    return f"{STATIC_INSTRUCTIONS}\n{personas}{summary_block}{recalled_block}{channel_block}{history_block}{tail}"
+
+
+def _render_turns(turns: List[Turn], budget: int) -> Tuple[List[str], int]:
+    """Render turns in order until ``budget`` tokens are used; returns lines and what is left"""
+    lines: List[str] = []
+    for content, reply in turns:
+        turn = f"U: {_clip(content or '', PROMPT_MAX_TURN_TOKENS)}\nA: {_clip(reply or '', PROMPT_MAX_TURN_TOKENS)}\n"
+        cost = estimate_tokens(turn)
+        if cost > budget:
+            break
+        lines.append(turn)
+        budget -= cost
+    return lines, budget
+
+
+def _render_messages(messages: List[Turn], budget: int) -> Tuple[List[str], int]:
+    """Render (user_id, content) messages in order until ``budget`` tokens are used; returns lines and what is left"""
+    lines: List[str] = []
+    for author, content in messages:
+        line = f"{author}: {_clip(content or '', PROMPT_MAX_TURN_TOKENS)}\n"
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        lines.append(line)
+        budget -= cost
+    return lines, budget
+
+
+def summary_prompt(previous: Optional[str], turns: List[Turn], words: int) -> str:
+    """
+    Build the prompt that folds older turns into a user's rolling summary
+
+    :param previous: Current summary, if any
+    :type previous: str
+    :param turns: Turns to fold in, oldest first
+    :param words: Target maximum summary length in words
+    :type words: int
+    :return: Prompt string
+    """
+    lines = "".join(
+        f"U: {_clip(content or '', PROMPT_MAX_TURN_TOKENS)}\nA: {_clip(reply or '', PROMPT_MAX_TURN_TOKENS)}\n"
+        for content, reply in turns
+    )
+    return (
+        f"{SUMMARY_INSTRUCTIONS.format(words=words)}\n"
+        f"PREVIOUS SUMMARY:\n{previous or '(none)'}\n"
+        f"NEW MESSAGES:\n{lines}"
+    )
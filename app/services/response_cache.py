@@ -0,0 +1,203 @@
+"""
+Exact-match cache of LLM responses keyed by a hash of the normalized prompt.
+
+The prompt already contains the persona, the recent history and the
+current message, so a hit means the model would see exactly the same
+input. Two backends are available: an in-memory TTL + LRU cache and a
+SQL table on the existing engine that survives restarts.
+"""
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete, func, select, update
+from app.db.session import AsyncSessionLocal
+from app.models.llm_cache import LLMResponseCache
+from app.services.cache import TTLCache, MISSING
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# "off", "memory" or "sql"
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'off').lower()
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '600'))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '5000'))
+# Comma separated user ids whose replies are never cached
+RESPONSE_CACHE_OPT_OUT = {u.strip() for u in os.getenv('RESPONSE_CACHE_OPT_OUT', '').split(',') if u.strip()}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def prompt_key(prompt: str) -> str:
+    """
+    Hash a prompt after collapsing whitespace and case
+
+    :param prompt: Full prompt text
+    :type prompt: str
+    :return: Hex SHA-256 digest
+    """
+    normalized = _WHITESPACE.sub(' ', prompt).strip().lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """Process-local TTL + LRU backend"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache('llm_response', maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        value = self._cache.get(key)
+        return None if value is MISSING else value
+
+    async def set(self, key: str, response: str, llm_ms: float):
+        self._cache.set(key, (response, llm_ms))
+
+
+class SqlBackend:
+    """
+    Backend storing entries in the llm_response_cache table
+
+    Expired rows are deleted and the table is trimmed back to ``maxsize``
+    rows (least recently hit first) every ``prune_every`` writes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, prune_every: int = 100):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(LLMResponseCache.response, LLMResponseCache.llm_ms)
+                .where(LLMResponseCache.prompt_key == key, LLMResponseCache.expires_at > now)
+            )
+            row = result.first()
+            if row is None:
+                return None
+            await db.execute(
+                update(LLMResponseCache).where(LLMResponseCache.prompt_key == key).values(last_hit_at=now)
+            )
+            await db.commit()
+            return row.response, row.llm_ms
+
+    async def set(self, key: str, response: str, llm_ms: float):
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await db.merge(LLMResponseCache(
+                prompt_key=key,
+                response=response,
+                llm_ms=llm_ms,
+                expires_at=now + timedelta(seconds=self.ttl),
+                last_hit_at=now,
+            ))
+            await db.commit()
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            await self.prune()
+
+    async def prune(self):
+        """Delete expired rows and trim the table to maxsize"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(LLMResponseCache).where(LLMResponseCache.expires_at <= datetime.utcnow()))
+            count = (await db.execute(select(func.count()).select_from(LLMResponseCache))).scalar()
+            if count > self.maxsize:
+                cutoff = await db.execute(
+                    select(LLMResponseCache.last_hit_at)
+                    .order_by(LLMResponseCache.last_hit_at.desc())
+                    .offset(self.maxsize).limit(1)
+                )
+                cutoff_at = cutoff.scalar()
+                if cutoff_at is not None:
+                    await db.execute(delete(LLMResponseCache).where(LLMResponseCache.last_hit_at <= cutoff_at))
+            await db.commit()
+
+
+class ResponseCache:
+    """Front end of the response cache with hit ratio and saved-time counters"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.saved_llm_ms = 0.0
+        metrics.register('response_cache', self.stats)
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def applies_to(self, user_id: str) -> bool:
+        """Whether replies for this user may be served from or stored in the cache"""
+        return self.enabled and user_id not in RESPONSE_CACHE_OPT_OUT
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        :param key: Prompt key from :func:`prompt_key`
+        :type key: str
+        :return: Cached response or None
+        """
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Response cache lookup failed: {e}", exc_info=True)
+            return None
+        if entry is None:
+            self.misses += 1
+            return None
+        response, llm_ms = entry
+        self.hits += 1
+        self.saved_llm_ms += llm_ms or 0.0
+        logger.info(f"Response cache hit (saved ~{llm_ms:.0f}ms of LLM time)")
+        return response
+
+    async def set(self, key: str, response: str, llm_ms: float):
+        """
+        Store a generated response
+
+        :param key: Prompt key from :func:`prompt_key`
+        :type key: str
+        :param response: Generated response
+        :type response: str
+        :param llm_ms: Time the generation took
+        :type llm_ms: float
+        """
+        if not response:
+            return
+        try:
+            await self.backend.set(key, response, llm_ms)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Response cache store failed: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        """Return hit ratio and saved LLM time"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': RESPONSE_CACHE_BACKEND,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'saved_llm_ms': self.saved_llm_ms,
+        }
+
+
+def _make_backend():
+    if RESPONSE_CACHE_BACKEND == 'memory':
+        return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+    if RESPONSE_CACHE_BACKEND == 'sql':
+        return SqlBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+    return None
+
+
+response_cache = ResponseCache(_make_backend())
@@ -0,0 +1,444 @@
+"""
+Retention for ``bot_messages``.
+
+The chat path only reads the newest few turns per user, yet every turn ever
+stored stays in the hot table. The retention worker moves turns older than
+``RETENTION_HOT_DAYS`` out of it, walking the primary key in batches of
+``RETENTION_BATCH_SIZE`` rows:
+
+- ``file`` (default): turns are appended to gzip-compressed NDJSON files, one
+  per day, under ``RETENTION_ARCHIVE_DIR``. The file is fsynced before the rows
+  are deleted; a crash in between may archive a turn twice, so readers drop
+  duplicate ids.
+- ``table``: turns are copied to ``bot_messages_archive`` and deleted in the same
+  transaction. On MySQL that table can be range-partitioned by day (see
+  :func:`ensure_partitions`) so old months are dropped with DROP PARTITION.
+
+Each user's newest ``RETENTION_KEEP_RECENT`` turns stay hot however old they
+are, so a returning user's prompt still has its history. Those turns pile up
+at the low end of the key range, so a pass resumes the scan where the
+previous one stopped and only starts over from the lowest id once a scan
+reaches the hot window; this way every row is eventually visited however
+many are kept back. Every batch is one
+short transaction deleting rows by primary key, followed by a pause of
+``RETENTION_BATCH_PAUSE_MS``; new turns are inserted at the end of the key
+range, so the live write path does not contend with archival.
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Connection
+from dotenv import load_dotenv
+from app.db.session import AsyncSessionLocal
+from app.models.message import BotMessages, BotMessagesArchive
+from app.services.message_service import HISTORY_TURNS
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', 'false').lower() == 'true'
+RETENTION_HOT_DAYS = float(os.getenv('RETENTION_HOT_DAYS', '30'))
+RETENTION_INTERVAL = float(os.getenv('RETENTION_INTERVAL', '3600'))
+# "file" (gzip NDJSON per day) or "table" (bot_messages_archive)
+RETENTION_TARGET = os.getenv('RETENTION_TARGET', 'file').lower()
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', 'data/archive')
+RETENTION_COMPRESS_LEVEL = int(os.getenv('RETENTION_COMPRESS_LEVEL', '6'))
+# Rows read and moved per transaction, pause between batches and batches per pass
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_BATCH_PAUSE_MS = int(os.getenv('RETENTION_BATCH_PAUSE_MS', '200'))
+RETENTION_MAX_BATCHES = int(os.getenv('RETENTION_MAX_BATCHES', '100'))
+# Newest turns per user that are never archived
+RETENTION_KEEP_RECENT = int(os.getenv('RETENTION_KEEP_RECENT', str(HISTORY_TURNS)))
+# Table target on MySQL: keep bot_messages_archive partitioned by month,
+# with this many empty months created ahead
+RETENTION_PARTITIONED = os.getenv('RETENTION_PARTITIONED', 'false').lower() == 'true'
+RETENTION_PARTITION_MONTHS_AHEAD = int(os.getenv('RETENTION_PARTITION_MONTHS_AHEAD', '3'))
+
+ARCHIVE_COLUMNS = ('id', 'channel_id', 'user_id', 'content', 'dateTime', 'bot_reply', 'message_id')
+UNDATED = 'undated'
+_FILE_RE = re.compile(r'^bot_messages-(\d{4}-\d{2}-\d{2}|undated)\.ndjson\.gz$')
+
+
+class FileArchive:
+    """
+    Day-bucketed gzip NDJSON files of archived turns
+
+    Each write appends a new gzip member, so files are never rewritten.
+
+    :param directory: Directory holding the files
+    :param compress_level: gzip compression level (1-9)
+    """
+
+    def __init__(self, directory: str, compress_level: int):
+        self.directory = directory
+        self.compress_level = compress_level
+
+    def path(self, day: Optional[date]) -> str:
+        name = day.isoformat() if day else UNDATED
+        return os.path.join(self.directory, f"bot_messages-{name}.ndjson.gz")
+
+    def write(self, rows_by_day: Dict[Optional[date], List[dict]]):
+        """Append rows to their day files and fsync them (blocking)"""
+        os.makedirs(self.directory, exist_ok=True)
+        for day, rows in rows_by_day.items():
+            data = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+            with open(self.path(day), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=self.compress_level) as gz:
+                    gz.write(data)
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def days(self) -> List[Optional[date]]:
+        """Return the days that have a file, oldest first (undated last)"""
+        if not os.path.isdir(self.directory):
+            return []
+        found = [m.group(1) for m in map(_FILE_RE.match, os.listdir(self.directory)) if m]
+        dated = sorted(date.fromisoformat(d) for d in found if d != UNDATED)
+        return dated + ([None] if UNDATED in found else [])
+
+    def read(self, since: Optional[date] = None, until: Optional[date] = None) -> Iterator[dict]:
+        """
+        Yield archived rows from the day files in ``[since, until]``
+
+        :param since: First day included (default: oldest)
+        :param until: Last day included (default: newest); undated rows are only read without bounds
+        :return: Iterator of row dictionaries, each id at most once
+        """
+        seen = set()
+        for day in self.days():
+            if day is None and (since or until):
+                continue
+            if day is not None and ((since and day < since) or (until and day > until)):
+                continue
+            with gzip.open(self.path(day), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row['id'] not in seen:
+                        seen.add(row['id'])
+                        yield row
+
+
+def archive_row(row, day: Optional[date]) -> dict:
+    """Return a JSON-ready dict of a bot_messages row plus its archive day"""
+    data = {column: getattr(row, column) for column in ARCHIVE_COLUMNS}
+    if data['dateTime'] is not None:
+        data['dateTime'] = data['dateTime'].isoformat()
+    data['day'] = day.isoformat() if day else None
+    return data
+
+
+def _month_start(day: date, months: int = 0) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_partitions(conn: Connection, months_ahead: int) -> int:
+    """
+    Range-partition bot_messages_archive by month (MySQL only)
+
+    Partitions the table on first use, then splits the catch-all ``pmax``
+    partition so that ``months_ahead`` future months always exist.
+
+    :param conn: Synchronous MySQL connection
+    :param months_ahead: Empty future months to keep ready
+    :return: Number of partitions added
+    """
+    existing = [r[0] for r in conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'bot_messages_archive' AND PARTITION_NAME IS NOT NULL"
+    ))]
+    last = _month_start(date.today(), months_ahead)
+    if existing:
+        months = sorted(p for p in existing if p != 'pmax')
+        newest = date(int(months[-1][1:5]), int(months[-1][5:7]), 1) if months else _month_start(date.today(), -1)
+        first = _month_start(newest, 1)
+    else:
+        oldest = conn.execute(text("SELECT MIN(day) FROM bot_messages_archive")).scalar()
+        first = _month_start(oldest or date.today())
+
+    wanted = []
+    month = first
+    while month <= last:
+        upper = _month_start(month, 1)
+        wanted.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper.isoformat()}')")
+        month = upper
+    if not wanted:
+        return 0
+
+    if existing:
+        conn.execute(text(
+            f"ALTER TABLE bot_messages_archive REORGANIZE PARTITION pmax INTO "
+            f"({', '.join(wanted)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+        ))
+    else:
+        conn.execute(text(
+            f"ALTER TABLE bot_messages_archive PARTITION BY RANGE COLUMNS(day) "
+            f"({', '.join(wanted)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+        ))
+    logger.info(f"Added {len(wanted)} partition(s) to bot_messages_archive")
+    return len(wanted)
+
+
+class RetentionWorker:
+    """
+    Background task that moves old turns out of bot_messages
+
+    :param hot_days: Age in days after which a turn is archived
+    :param interval: Seconds between passes
+    :param target: ``file`` or ``table``
+    :param archive: File archive used by the ``file`` target
+    :param batch_size: Rows read and moved per transaction
+    :param batch_pause_ms: Pause between batches
+    :param max_batches: Batches per pass
+    :param keep_recent: Newest turns per user that are never archived
+    :param partitioned: Keep the archive table partitioned by month (``table`` target on MySQL)
+    """
+
+    def __init__(self, hot_days: float, interval: float, target: str, archive: FileArchive, batch_size: int,
+                 batch_pause_ms: int, max_batches: int, keep_recent: int, partitioned: bool = False):
+        if target not in ('file', 'table'):
+            raise ValueError(f"Unknown retention target '{target}', expected 'file' or 'table'")
+        self.hot_days = hot_days
+        self.interval = interval
+        self.target = target
+        self.archive = archive
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause_ms / 1000
+        self.max_batches = max_batches
+        self.keep_recent = keep_recent
+        self.partitioned = partitioned
+        self._task: Optional[asyncio.Task] = None
+        # Last id scanned; passes resume here until a scan reaches the hot window
+        self.cursor = 0
+        self._archive_insert = (
+            insert(BotMessagesArchive)
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('OR IGNORE', dialect='sqlite')
+        )
+
+        self.passes = 0
+        self.batches = 0
+        self.rows_archived = 0
+        self.rows_kept = 0
+        self.failures = 0
+        self.last_pass_ms = 0.0
+        self.last_batch_ms = 0.0
+        self.max_batch_ms = 0.0
+        metrics.register('retention', self.stats)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the worker on the running loop"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Retention worker started (hot={self.hot_days:g} days, target={self.target}, "
+                f"batch={self.batch_size}, interval={self.interval:.0f}s)"
+            )
+
+    async def stop(self):
+        """Stop the worker; a batch in progress is rolled back"""
+        if self.running:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Retention worker stopped")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_pass()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Retention pass failed: {e}", exc_info=True)
+
+    async def run_pass(self) -> int:
+        """
+        Archive turns older than the hot window, up to ``max_batches`` batches
+
+        Continues from where the previous pass stopped, so turns kept back as
+        their user's newest never stall the scan below archivable rows.
+
+        :return: Number of turns archived
+        """
+        start = time.perf_counter()
+        cutoff = datetime.utcnow() - timedelta(days=self.hot_days)
+        if self.target == 'table' and self.partitioned:
+            await self._ensure_partitions()
+
+        after, moved = self.cursor, 0
+        for _ in range(self.max_batches):
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(*[getattr(BotMessages, c) for c in ARCHIVE_COLUMNS])
+                    .where(BotMessages.id > after)
+                    .order_by(BotMessages.id)
+                    .limit(self.batch_size)
+                )
+                rows = result.all()
+            old, done = self._old_prefix(rows, cutoff)
+            if old:
+                after = old[-1].id
+                batch = await self._drop_recent(old)
+                if batch:
+                    days = await self._days(rows)
+                    await self._move(batch, [days[r.id] for r in batch])
+                    moved += len(batch)
+            if done or not old:
+                # Reached the hot window: the next pass starts over and revisits
+                # kept turns whose users have written newer ones since
+                after = 0
+                break
+            await asyncio.sleep(self.batch_pause)
+
+        self.cursor = after
+        self.passes += 1
+        self.last_pass_ms = (time.perf_counter() - start) * 1000
+        if moved:
+            logger.info(f"Archived {moved} turns older than {cutoff:%Y-%m-%d %H:%M} in {self.last_pass_ms:.0f}ms")
+        return moved
+
+    def _old_prefix(self, rows, cutoff: datetime) -> Tuple[list, bool]:
+        """
+        Return the leading rows older than ``cutoff`` and whether the scan is done
+
+        Ids grow with time, so the scan stops at the first row inside the hot
+        window. Rows without a dateTime (written before the column was filled
+        in) sit below every dated row, so they are taken as old too.
+        """
+        stop = next((i for i, r in enumerate(rows) if r.dateTime is not None and r.dateTime >= cutoff), len(rows))
+        done = stop < len(rows) or len(rows) < self.batch_size
+        return rows[:stop], done
+
+    async def _drop_recent(self, rows: list) -> list:
+        """Remove rows that are among their user's newest ``keep_recent`` turns"""
+        if self.keep_recent <= 0:
+            return rows
+        users = {r.user_id for r in rows}
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(BotMessages.user_id, func.count(BotMessages.id))
+                .where(BotMessages.user_id.in_(users), BotMessages.id > rows[-1].id)
+                .group_by(BotMessages.user_id)
+            )
+            newer = dict(result.all())
+
+        keep = set()
+        by_user = defaultdict(list)
+        for r in rows:
+            by_user[r.user_id].append(r.id)
+        for user_id, ids in by_user.items():
+            missing = self.keep_recent - newer.get(user_id, 0)
+            if missing > 0:
+                keep.update(ids[-missing:])
+        self.rows_kept += len(keep)
+        return [r for r in rows if r.id not in keep]
+
+    async def _days(self, rows: list) -> Dict[int, Optional[date]]:
+        """
+        Archive day of each row by id
+
+        Undated rows take the day of the next dated row, looked up past the
+        batch when needed. With no dated row after them they go to the
+        ``undated`` file, or to the cutoff day in the archive table, whose
+        ``day`` column is part of the key.
+        """
+        following = None
+        if rows[-1].dateTime is None:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(BotMessages.dateTime)
+                    .where(BotMessages.id > rows[-1].id, BotMessages.dateTime.is_not(None))
+                    .order_by(BotMessages.id)
+                    .limit(1)
+                )
+                newer = result.scalar()
+            if newer is not None:
+                following = newer.date()
+            elif self.target == 'table':
+                following = (datetime.utcnow() - timedelta(days=self.hot_days)).date()
+        days: Dict[int, Optional[date]] = {}
+        for r in reversed(rows):
+            if r.dateTime is not None:
+                following = r.dateTime.date()
+            days[r.id] = following
+        return days
+
+    async def _move(self, rows: list, days: List[Optional[date]]):
+        start = time.perf_counter()
+        ids = [r.id for r in rows]
+        if self.target == 'table':
+            archived_at = datetime.utcnow()
+            values = [
+                {**{c: getattr(r, c) for c in ARCHIVE_COLUMNS}, 'day': day, 'archived_at': archived_at}
+                for r, day in zip(rows, days)
+            ]
+            async with AsyncSessionLocal() as db:
+                await db.execute(self._archive_insert, values)
+                await db.execute(delete(BotMessages).where(BotMessages.id.in_(ids)))
+                await db.commit()
+        else:
+            by_day: Dict[Optional[date], List[dict]] = defaultdict(list)
+            for r, day in zip(rows, days):
+                by_day[day].append(archive_row(r, day))
+            await asyncio.to_thread(self.archive.write, by_day)
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(BotMessages).where(BotMessages.id.in_(ids)))
+                await db.commit()
+
+        self.batches += 1
+        self.rows_archived += len(rows)
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        self.max_batch_ms = max(self.max_batch_ms, self.last_batch_ms)
+        logger.debug(f"Archived batch of {len(rows)} turns in {self.last_batch_ms:.2f}ms")
+
+    async def _ensure_partitions(self):
+        async with AsyncSessionLocal() as db:
+            conn = await db.connection()
+            if conn.dialect.name != 'mysql':
+                return
+            await conn.run_sync(ensure_partitions, RETENTION_PARTITION_MONTHS_AHEAD)
+            await db.commit()
+
+    def stats(self) -> dict:
+        """Return retention counters"""
+        return {
+            'running': self.running,
+            'target': self.target,
+            'passes': self.passes,
+            'batches': self.batches,
+            'rows_archived': self.rows_archived,
+            'rows_kept_recent': self.rows_kept,
+            'cursor': self.cursor,
+            'failures': self.failures,
+            'last_pass_ms': self.last_pass_ms,
+            'last_batch_ms': self.last_batch_ms,
+            'max_batch_ms': self.max_batch_ms,
+        }
+
+
+archiver = RetentionWorker(
+    hot_days=RETENTION_HOT_DAYS,
+    interval=RETENTION_INTERVAL,
+    target=RETENTION_TARGET,
+    archive=FileArchive(RETENTION_ARCHIVE_DIR, RETENTION_COMPRESS_LEVEL),
+    batch_size=RETENTION_BATCH_SIZE,
+    batch_pause_ms=RETENTION_BATCH_PAUSE_MS,
+    max_batches=RETENTION_MAX_BATCHES,
+    keep_recent=RETENTION_KEEP_RECENT,
+    partitioned=RETENTION_PARTITIONED,
+)
@@ -0,0 +1,373 @@
+"""
+In-process BM25 retrieval over each user's past turns.
+
+Every stored turn (user message + bot reply) is tokenized into a per-user
+inverted index. ``build_prompt`` queries it with the current message to
+recall older exchanges that fell out of the recent window.
+
+- Updates are incremental: turns are added as they are saved.
+- Postings are compact ``array('I')`` values of ``doc << 8 | tf``.
+- The index is persisted as sharded pickle files under
+  ``RETRIEVAL_INDEX_DIR``; only shards that changed are rewritten. On
+  start the snapshot is loaded and rows written since (id above the
+  snapshot's high-water mark) are read from ``bot_messages``. With no
+  snapshot the index is built from the table. Loading runs in the
+  background (tokenizing in a worker thread) and searches return nothing
+  until it is done, so ``/chat`` never waits on it.
+"""
+import asyncio
+import math
+import os
+import pickle
+import re
+import time
+import zlib
+from array import array
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy import select, func
+from dotenv import load_dotenv
+from app.db.session import AsyncSessionLocal
+from app.models.message import BotMessages
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+RETRIEVAL_ENABLED = os.getenv('RETRIEVAL_ENABLED', 'false').lower() == 'true'
+RETRIEVAL_INDEX_DIR = os.getenv('RETRIEVAL_INDEX_DIR', 'data/retrieval')
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '3'))
+# Oldest turns are dropped from a user's index beyond this many
+RETRIEVAL_MAX_DOCS_PER_USER = int(os.getenv('RETRIEVAL_MAX_DOCS_PER_USER', '20000'))
+# Characters kept from each side of a turn
+RETRIEVAL_MAX_CHARS = int(os.getenv('RETRIEVAL_MAX_CHARS', '300'))
+# Postings scanned per query term, newest first; bounds query time on long histories
+RETRIEVAL_MAX_POSTINGS = int(os.getenv('RETRIEVAL_MAX_POSTINGS', '1024'))
+RETRIEVAL_SNAPSHOT_INTERVAL = float(os.getenv('RETRIEVAL_SNAPSHOT_INTERVAL', '300'))
+RETRIEVAL_SHARDS = 64
+RETRIEVAL_LOAD_BATCH = 5000
+# Snapshots written with another format version are ignored and rebuilt
+RETRIEVAL_SNAPSHOT_VERSION = 2
+# Message IDs remembered per user to drop a turn indexed twice
+RETRIEVAL_RECENT_KEYS = 64
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Separates the user message from the reply in a stored document
+SEP = '\x1f'
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    'the a an and or but is are was were be to of in on at for with it this that i you he she we they me my '
+    'your hai ho hain ka ki ke ko se me mein to bhi na nahi kya ye yeh wo woh toh'.split()
+)
+
+Turn = Tuple[str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and one-letter words"""
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class UserIndex:
+    """BM25 inverted index over one user's turns (oldest first)"""
+
+    __slots__ = ('docs', 'lengths', 'postings', 'total_length', 'recent_keys')
+
+    def __init__(self):
+        self.docs: List[str] = []
+        self.lengths = array('H')
+        self.postings: Dict[str, array] = {}
+        self.total_length = 0
+        self.recent_keys: Deque[str] = deque(maxlen=RETRIEVAL_RECENT_KEYS)
+
+    def add(self, content: str, reply: str, key: Optional[str] = None) -> bool:
+        """Index a turn; returns False if the turn with this key was indexed recently"""
+        # The same turn can arrive from both the save path and a reload. Only its
+        # message ID identifies it: repeated texts ("hi") are separate turns
+        if key is not None:
+            if key in self.recent_keys:
+                return False
+            self.recent_keys.append(key)
+        doc = f"{content[:RETRIEVAL_MAX_CHARS]}{SEP}{reply[:RETRIEVAL_MAX_CHARS]}"
+        index = len(self.docs)
+        terms = Counter(tokenize(doc))
+        self.docs.append(doc)
+        length = min(sum(terms.values()), 0xFFFF)
+        self.lengths.append(length)
+        self.total_length += length
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array('I')
+            postings.append(index << 8 | min(tf, 0xFF))
+        return True
+
+    def search(self, query: List[str], k: int, exclude_recent: int) -> List[Turn]:
+        """
+        Return the top-k turns for the query terms
+
+        :param query: Query tokens
+        :param k: Number of turns to return
+        :param exclude_recent: Skip this many newest turns (already in the prompt)
+        :return: Turns, best first
+        """
+        n = len(self.docs)
+        limit = n - exclude_recent
+        if limit <= 0 or not query:
+            return []
+        lengths = self.lengths
+        k1_b = BM25_K1 * BM25_B / (self.total_length / n or 1.0)
+        k1_1b = BM25_K1 * (1 - BM25_B)
+        scores: Dict[int, float] = {}
+        for term in set(query):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5)) * (BM25_K1 + 1)
+            for entry in postings[-RETRIEVAL_MAX_POSTINGS:]:
+                doc = entry >> 8
+                if doc >= limit:
+                    continue
+                tf = entry & 0xFF
+                scores[doc] = scores.get(doc, 0.0) + idf * tf / (tf + k1_1b + k1_b * lengths[doc])
+        best = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+        return [tuple(self.docs[doc].split(SEP, 1)) for doc in best]
+
+    def compact(self, keep: int):
+        """Rebuild keeping only the newest ``keep`` turns"""
+        docs, keys = self.docs[-keep:], self.recent_keys
+        self.__init__()
+        for doc in docs:
+            self.add(*doc.split(SEP, 1))
+        self.recent_keys = keys
+
+
+class RetrievalIndex:
+    """
+    Per-user BM25 indexes with background loading and snapshotting
+
+    :param enabled: When False turns are not indexed and searches return nothing
+    :param directory: Directory holding the snapshot shards
+    :param snapshot_interval: Seconds between snapshots of changed shards
+    """
+
+    def __init__(self, enabled: bool, directory: str, snapshot_interval: float):
+        self.enabled = enabled
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.users: Dict[str, UserIndex] = {}
+        self.ready = False
+        # Highest bot_messages.id covered by the index
+        self.mark = 0
+        self._pending: List[Tuple[str, str, str, Optional[str]]] = []
+        self._dirty = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.docs = 0
+        self.queries = 0
+        self.query_ms_total = 0.0
+        self.load_ms = 0.0
+        self.loaded_rows = 0
+        self.last_snapshot_ms = 0.0
+        metrics.register('retrieval', self.stats)
+
+    @staticmethod
+    def _shard(user_id: str) -> int:
+        return zlib.crc32(user_id.encode('utf-8')) % RETRIEVAL_SHARDS
+
+    def add(self, user_id: str, content: str, reply: str, message_id: Optional[str] = None):
+        """
+        Index a newly stored turn
+
+        :param user_id: User ID
+        :type user_id: str
+        :param content: User message
+        :type content: str
+        :param reply: Bot reply
+        :type reply: str
+        :param message_id: Discord message ID of the turn, used to skip it when
+            the database catch-up reads it again
+        :type message_id: str
+        """
+        if not self.enabled:
+            return
+        if not self.ready:
+            self._pending.append((user_id, content or '', reply or '', message_id))
+            return
+        self._add(user_id, content or '', reply or '', message_id)
+
+    def _add(self, user_id: str, content: str, reply: str, message_id: Optional[str] = None):
+        index = self.users.get(user_id)
+        if index is None:
+            index = self.users[user_id] = UserIndex()
+        before = len(index.docs)
+        if not index.add(content, reply, message_id):
+            return
+        if len(index.docs) > RETRIEVAL_MAX_DOCS_PER_USER:
+            # Drop the oldest tenth in one rebuild instead of one turn at a time
+            index.compact(RETRIEVAL_MAX_DOCS_PER_USER * 9 // 10)
+        self.docs += len(index.docs) - before
+        self._dirty.add(self._shard(user_id))
+
+    def search(self, user_id: str, text: str, k: int = RETRIEVAL_TOP_K, exclude_recent: int = 0) -> List[Turn]:
+        """
+        Recall a user's past turns relevant to ``text``
+
+        :param user_id: User ID
+        :type user_id: str
+        :param text: Current message
+        :type text: str
+        :param k: Number of turns to return
+        :type k: int
+        :param exclude_recent: Newest turns to skip because the prompt already has them
+        :type exclude_recent: int
+        :return: Turns, most relevant first
+        """
+        index = self.users.get(user_id)
+        if not self.ready or index is None:
+            return []
+        start = time.perf_counter()
+        found = index.search(tokenize(text), k, exclude_recent)
+        self.queries += 1
+        self.query_ms_total += (time.perf_counter() - start) * 1000
+        return found
+
+    def start(self):
+        """Load the index in the background, then snapshot it periodically"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop background work and write a final snapshot"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.ready:
+            await self.snapshot()
+
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Loading retrieval index failed: {e}", exc_info=True)
+            return
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                logger.error(f"Retrieval index snapshot failed: {e}", exc_info=True)
+
+    async def load(self):
+        """Load the snapshot, then index rows stored since it was taken"""
+        start = time.perf_counter()
+        await asyncio.to_thread(self._read_snapshot)
+        self.docs = sum(len(index.docs) for index in self.users.values())
+
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(BotMessages.id, BotMessages.user_id, BotMessages.content, BotMessages.bot_reply,
+                           BotMessages.message_id)
+                    .where(BotMessages.id > self.mark)
+                    .order_by(BotMessages.id)
+                    .limit(RETRIEVAL_LOAD_BATCH)
+                )
+                rows = result.all()
+            # Nothing else touches the indexes until ready, so tokenizing can
+            # happen off the event loop
+            await asyncio.to_thread(self._add_rows, rows)
+            self.loaded_rows += len(rows)
+            if rows:
+                self.mark = rows[-1].id
+            if len(rows) < RETRIEVAL_LOAD_BATCH:
+                break
+
+        for user_id, content, reply, message_id in self._pending:
+            self._add(user_id, content, reply, message_id)
+        self._pending.clear()
+        self.ready = True
+        self.load_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Retrieval index ready: {len(self.users)} users, {self.docs} turns "
+            f"({self.loaded_rows} read from the database) in {self.load_ms:.0f}ms"
+        )
+
+    def _add_rows(self, rows):
+        for row in rows:
+            self._add(row.user_id, row.content or '', row.bot_reply or '', row.message_id)
+
+    def _read_snapshot(self):
+        meta_path = os.path.join(self.directory, 'meta.pickle')
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, 'rb') as f:
+            meta = pickle.load(f)
+        if meta.get('version') != RETRIEVAL_SNAPSHOT_VERSION:
+            logger.info("Retrieval index snapshot has an old format, rebuilding from the database")
+            return
+        self.mark = meta['mark']
+        for shard in range(RETRIEVAL_SHARDS):
+            path = os.path.join(self.directory, f'shard-{shard:02d}.pickle')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    self.users.update(pickle.load(f))
+
+    async def snapshot(self):
+        """Write changed shards and the high-water mark to disk"""
+        if not self._dirty:
+            return
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            mark = (await db.execute(select(func.max(BotMessages.id)))).scalar() or 0
+
+        dirty, self._dirty = self._dirty, set()
+        # Serialize on the loop (the indexes keep changing), write in a thread
+        blobs = self._serialize(dirty, max(mark, self.mark))
+        await asyncio.to_thread(self._write_files, blobs)
+        self.last_snapshot_ms = (time.perf_counter() - start) * 1000
+        logger.debug(f"Retrieval index snapshot: {len(dirty)} shard(s) in {self.last_snapshot_ms:.0f}ms")
+
+    def _serialize(self, shards, mark: int) -> Dict[str, bytes]:
+        by_shard: Dict[int, Dict[str, UserIndex]] = {shard: {} for shard in shards}
+        for user_id, index in self.users.items():
+            users = by_shard.get(self._shard(user_id))
+            if users is not None:
+                users[user_id] = index
+        blobs = {
+            f'shard-{shard:02d}.pickle': pickle.dumps(users, protocol=pickle.HIGHEST_PROTOCOL)
+            for shard, users in by_shard.items()
+        }
+        blobs['meta.pickle'] = pickle.dumps({'mark': mark, 'version': RETRIEVAL_SNAPSHOT_VERSION})
+        return blobs
+
+    def _write_files(self, blobs: Dict[str, bytes]):
+        os.makedirs(self.directory, exist_ok=True)
+        for name, data in blobs.items():
+            path = os.path.join(self.directory, name)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+
+    def stats(self) -> dict:
+        """Return index size and query latency"""
+        return {
+            'enabled': self.enabled,
+            'ready': self.ready,
+            'users': len(self.users),
+            'docs': self.docs,
+            'queries': self.queries,
+            'avg_query_ms': self.query_ms_total / self.queries if self.queries else 0.0,
+            'load_ms': self.load_ms,
+            'loaded_rows': self.loaded_rows,
+            'last_snapshot_ms': self.last_snapshot_ms,
+        }
+
+
+retrieval_index = RetrievalIndex(RETRIEVAL_ENABLED, RETRIEVAL_INDEX_DIR, RETRIEVAL_SNAPSHOT_INTERVAL)
@@ -5,11 +5,20 @@ from sqlalchemy.orm import attributes
 from fastapi import HTTPException
 from app.models.role import Role as RoleModel
 from app.schemas.role import RoleCreate, RolePatch
+from app.services.cache import TTLCache
 from app.utils.logger import get_logger
-from typing import Optional
+from typing import List, Optional
+import os
 
 logger = get_logger(__name__)
 
+# Role JSON per user_id; None entries cache "no role configured"
+role_cache = TTLCache(
+    'role',
+    maxsize=int(os.getenv('ROLE_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('ROLE_CACHE_TTL', '300')),
+)
+
 
 async def get_roles_for_user(user_id: str, db: AsyncSession) -> Optional[RoleModel]:
     """
@@ -37,6 +46,24 @@ async def get_roles_for_user(user_id: str, db: AsyncSession) -> Optional[RoleMod
         raise HTTPException(status_code=500, detail=f"Error fetching roles: {str(e)}")
 
 
+async def get_role_user_ids(db: AsyncSession) -> List[str]:
+    """
+    Get the ids of all users that have a role configured
+    
+    :param db: Database session
+    :type db: AsyncSession
+    :return: List of user IDs
+    """
+    try:
+        results = await db.execute(select(RoleModel.user_id))
+        user_ids = list(results.scalars().all())
+        logger.debug(f"Found {len(user_ids)} users with roles")
+        return user_ids
+    except Exception as e:
+        logger.error(f"Error fetching role user ids: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error fetching role user ids: {str(e)}")
+
+
 async def add_role(role: RoleCreate, db: AsyncSession) -> RoleModel:
     """
     Add a new role for a user
@@ -55,6 +82,7 @@ async def add_role(role: RoleCreate, db: AsyncSession) -> RoleModel:
         
         await db.commit()
         await db.refresh(db_role)
+        role_cache.set(db_role.user_id, db_role.role)
         
         logger.info(f"Successfully added role for user {role.user_id}")
         return db_role
@@ -98,6 +126,7 @@ async def patch_role(user_id: str, role_patch: RolePatch, db: AsyncSession) -> O
         
         await db.commit()
         await db.refresh(role)
+        role_cache.set(user_id, role.role)
         
         logger.info(f"Successfully patched role for user {user_id}")
         return role
@@ -127,6 +156,7 @@ async def remove_role(user_id: str, db: AsyncSession) -> bool:
         if role:
             await db.delete(role)
             await db.commit()
+            role_cache.set(user_id, None)
             logger.info(f"Successfully removed role for user {user_id}")
             return True
         logger.debug(f"No role to remove for user {user_id}")
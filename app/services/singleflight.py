@@ -0,0 +1,105 @@
+"""
+Single-flight de-duplication of concurrent identical streaming calls.
+
+The first caller for a key starts the underlying stream in a background
+task; concurrent callers with the same key attach to it and receive the
+same chunks, including the ones produced before they joined. When the
+last subscriber goes away the shared stream is cancelled.
+"""
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Flight:
+    __slots__ = ('chunks', 'done', 'error', 'subscribers', 'task', 'changed')
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """Share one in-flight stream between concurrent callers with the same key"""
+
+    def __init__(self, name: str):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+        self.abandoned = 0
+        metrics.register(f"singleflight.{name}", self.stats)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Stream chunks for ``key``, starting ``factory()`` only if no call is in flight
+
+        :param key: De-duplication key
+        :type key: str
+        :param factory: Callable returning a new async iterator of chunks
+        :return: Async iterator of chunks
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._produce(key, flight, factory))
+            self.started += 1
+        else:
+            self.joined += 1
+            logger.info(f"Joined in-flight LLM call ({flight.subscribers} other waiters)")
+
+        flight.subscribers += 1
+        try:
+            sent = 0
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: len(flight.chunks) > sent or flight.done)
+                    pending = flight.chunks[sent:]
+                    finished = flight.done
+                for chunk in pending:
+                    yield chunk
+                sent += len(pending)
+                if finished and sent == len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more: stop the shared generation
+                self.abandoned += 1
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    async def _produce(self, key: str, flight: _Flight, factory: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> dict:
+        """Return counts of started, joined and abandoned flights"""
+        return {
+            'in_flight': len(self._flights),
+            'started': self.started,
+            'joined': self.joined,
+            'abandoned': self.abandoned,
+        }
@@ -0,0 +1,218 @@
+"""
+Rolling per-user conversation summaries.
+
+The prompt only carries the last ``HISTORY_TURNS`` turns verbatim. Older
+turns are folded into a short summary per user by a background worker:
+every ``SUMMARY_INTERVAL`` seconds it picks users with at least
+``SUMMARY_EVERY_TURNS`` new turns, loads the turns that have fallen out of
+the recent window and asks the LLM to merge them into the stored summary.
+
+The worker runs off the request path on its own gateway, with its own
+concurrency limit (``SUMMARY_CONCURRENCY``) and rate limit
+(``SUMMARY_RATE_LIMIT``), so its calls and the 429s they get never slow
+``/chat`` down. It uses the fast model, bypasses the circuit breaker and
+router statistics of ``/chat``, and pauses while the breaker is open.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import select, desc
+from dotenv import load_dotenv
+from app.db.session import AsyncSessionLocal
+from app.models.message import BotMessages
+from app.models.summary import UserSummary
+from app.services import prompt
+from app.services.circuit_breaker import llm_breaker
+from app.services.history_cache import Turn
+from app.services.llm_gateway import LLMGateway
+from app.services.llm_providers import create_providers
+from app.services.message_service import HISTORY_TURNS, summary_cache, unsummarized
+from app.services.model_router import router
+from app.utils import metrics
+from app.utils.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+SUMMARY_ENABLED = os.getenv('SUMMARY_ENABLED', 'false').lower() == 'true'
+SUMMARY_INTERVAL = float(os.getenv('SUMMARY_INTERVAL', '60'))
+# New turns a user needs before their summary is refreshed
+SUMMARY_EVERY_TURNS = int(os.getenv('SUMMARY_EVERY_TURNS', '10'))
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '2'))
+# Summary calls per second, separate from the /chat rate limit
+SUMMARY_RATE_LIMIT = float(os.getenv('SUMMARY_RATE_LIMIT', '1'))
+SUMMARY_MAX_USERS_PER_PASS = int(os.getenv('SUMMARY_MAX_USERS_PER_PASS', '50'))
+# Older turns folded in per LLM call
+SUMMARY_MAX_TURNS = int(os.getenv('SUMMARY_MAX_TURNS', '40'))
+SUMMARY_WORDS = int(os.getenv('SUMMARY_WORDS', '120'))
+SUMMARY_TIMEOUT = float(os.getenv('SUMMARY_TIMEOUT', '60'))
+
+
+class SummaryWorker:
+    """
+    Background task that keeps per-user summaries up to date
+
+    :param interval: Seconds between passes
+    :param every_turns: New turns needed before a user is summarized again
+    :param concurrency: Maximum summaries generated at once
+    """
+
+    def __init__(self, interval: float, every_turns: int, concurrency: int):
+        self.interval = interval
+        self.every_turns = every_turns
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+        self.passes = 0
+        self.summarized = 0
+        self.turns_folded = 0
+        self.failures = 0
+        self.skipped_passes = 0
+        self.last_ms = 0.0
+        metrics.register('summaries', self.stats)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the worker on the running loop"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Summary worker started (interval={self.interval:.0f}s, every={self.every_turns} turns)")
+
+    async def stop(self):
+        """Stop the worker; summaries in progress are abandoned"""
+        if self.running:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Summary worker stopped")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_pass()
+            except Exception as e:
+                logger.error(f"Summary pass failed: {e}", exc_info=True)
+
+    def _due_users(self) -> List[str]:
+        due = [u for u, n in unsummarized.items() if n >= self.every_turns]
+        return due[:SUMMARY_MAX_USERS_PER_PASS]
+
+    async def run_pass(self):
+        """Summarize every user that has enough new turns"""
+        if llm_breaker.rejecting():
+            self.skipped_passes += 1
+            logger.debug("LLM circuit open, skipping summary pass")
+            return
+        users = self._due_users()
+        if not users:
+            return
+        self.passes += 1
+        for user_id in users:
+            del unsummarized[user_id]
+        await asyncio.gather(*(self._summarize_guarded(u) for u in users))
+
+    async def _summarize_guarded(self, user_id: str):
+        async with self.semaphore:
+            try:
+                await self.summarize(user_id)
+            except Exception as e:
+                self.failures += 1
+                # Try again on a later pass
+                unsummarized[user_id] += self.every_turns
+                logger.warning(f"Summarizing user {user_id} failed: {e}")
+
+    async def summarize(self, user_id: str):
+        """
+        Fold a user's turns older than the recent window into their summary
+
+        :param user_id: User to summarize
+        :type user_id: str
+        """
+        start = time.perf_counter()
+        # Read, then release the connection before the (slow) LLM call
+        async with AsyncSessionLocal() as db:
+            row = await db.get(UserSummary, user_id)
+            previous = row.summary if row else None
+            last_id = row.last_message_id if row else 0
+
+            # Everything from the oldest turn still shown verbatim onwards stays out
+            recent = await db.execute(
+                select(BotMessages.id).where(BotMessages.user_id == user_id)
+                .order_by(desc(BotMessages.id)).limit(HISTORY_TURNS)
+            )
+            recent_ids = recent.scalars().all()
+            if len(recent_ids) < HISTORY_TURNS:
+                return
+            result = await db.execute(
+                select(BotMessages.id, BotMessages.content, BotMessages.bot_reply)
+                .where(BotMessages.user_id == user_id, BotMessages.id > last_id, BotMessages.id < min(recent_ids))
+                .order_by(BotMessages.id)
+                .limit(SUMMARY_MAX_TURNS)
+            )
+            rows = result.all()
+        if not rows:
+            return
+        turns: List[Turn] = [(r.content, r.bot_reply) for r in rows]
+
+        summary = await summary_gateway.generate(
+            router.models['fast'],
+            prompt.summary_prompt(previous, turns, SUMMARY_WORDS),
+            SUMMARY_TIMEOUT,
+        )
+        summary = " ".join(summary.split())
+        if not summary:
+            return
+
+        async with AsyncSessionLocal() as db:
+            await db.merge(UserSummary(
+                user_id=user_id,
+                summary=summary,
+                last_message_id=rows[-1].id,
+                updated_at=datetime.utcnow(),
+            ))
+            await db.commit()
+
+        summary_cache.set(user_id, summary)
+        if len(rows) == SUMMARY_MAX_TURNS:
+            # More older turns are waiting; pick them up on the next pass
+            unsummarized[user_id] += self.every_turns
+        self.summarized += 1
+        self.turns_folded += len(turns)
+        self.last_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Folded {len(turns)} turns into summary for user {user_id} in {self.last_ms:.2f}ms")
+
+    def stats(self) -> dict:
+        """Return summary worker counters"""
+        return {
+            'running': self.running,
+            'pending_users': len(self._due_users()),
+            'passes': self.passes,
+            'skipped_passes': self.skipped_passes,
+            'summarized': self.summarized,
+            'turns_folded': self.turns_folded,
+            'failures': self.failures,
+            'last_ms': self.last_ms,
+        }
+
+
+# Own providers, semaphore and token bucket: never competes with /chat for permits or rate
+summary_gateway = LLMGateway(
+    create_providers(),
+    name='llm_gateway_summary',
+    concurrency=SUMMARY_CONCURRENCY,
+    rate=SUMMARY_RATE_LIMIT,
+    burst=SUMMARY_CONCURRENCY,
+)
+
+summarizer = SummaryWorker(
+    interval=SUMMARY_INTERVAL,
+    every_turns=SUMMARY_EVERY_TURNS,
+    concurrency=SUMMARY_CONCURRENCY,
+)
@@ -0,0 +1,25 @@
+"""
+Minimal in-process metrics registry.
+
+Components register a callable returning a dict of their current
+counters; ``GET /metrics`` returns a snapshot of every registered source.
+"""
+from typing import Callable, Dict
+
+_sources: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]):
+    """
+    Register a metrics source
+
+    :param name: Key the metrics are reported under
+    :type name: str
+    :param source: Callable returning a dict of metrics
+    """
+    _sources[name] = source
+
+
+def snapshot() -> dict:
+    """Collect the current metrics of every registered source"""
+    return {name: source() for name, source in _sources.items()}
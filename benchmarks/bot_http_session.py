@@ -0,0 +1,92 @@
+"""
+Benchmark: per-message aiohttp session vs the bot's shared pooled session
+
+Starts a local stub of the /chat endpoint and measures the client-side
+overhead of forwarding N messages both ways.
+
+Usage:
+    python -m benchmarks.bot_http_session --messages 500 --concurrency 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import aiohttp
+from aiohttp import web
+from app.discord_bot.http_client import create_session
+
+PAYLOAD = {"user_id": "bench", "server_id": "1", "channel_id": "1", "content": "hi"}
+
+
+async def stub_chat(request: web.Request) -> web.Response:
+    """Stub /chat handler that replies immediately"""
+    await request.json()
+    return web.json_response({"reply": "ok"})
+
+
+async def start_stub(port: int) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_post('/chat', stub_chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+async def per_message(url: str) -> float:
+    """Old behaviour: new session (and TCP connection) for every message"""
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=PAYLOAD) as resp:
+            await resp.json()
+    return (time.perf_counter() - start) * 1000
+
+
+async def pooled(session: aiohttp.ClientSession, url: str) -> float:
+    """New behaviour: reuse the shared keep-alive session"""
+    start = time.perf_counter()
+    async with session.post(url, json=PAYLOAD) as resp:
+        await resp.json()
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(label: str, make_call, messages: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            return await make_call()
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(one() for _ in range(messages))))
+    wall = time.perf_counter() - start
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<12} mean={statistics.mean(latencies):7.2f}ms "
+        f"p50={statistics.median(latencies):7.2f}ms p95={p95:7.2f}ms "
+        f"throughput={messages / wall:8.1f} msg/s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}/chat"
+    runner = await start_stub(args.port)
+    try:
+        await run("per-message", lambda: per_message(url), args.messages, args.concurrency)
+        session = create_session()
+        try:
+            await run("pooled", lambda: pooled(session, url), args.messages, args.concurrency)
+        finally:
+            await session.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark: prompt context fetch, three ORM queries vs one UNION ALL round trip
+
+Measures the "Database queries completed in Xms" phase of build_prompt with
+cold caches (every call misses), which is the worst case for both paths.
+Defaults to a throwaway SQLite database; pass --db-url to run against MySQL,
+where the saved round trips matter most.
+
+Usage:
+    python -m benchmarks.context_fetch --iterations 500
+    python -m benchmarks.context_fetch --db-url mysql+aiomysql://root:pw@localhost:3306/discord_bench
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.models.admin import Admin
+from app.models.message import BotMessages
+from app.models.role import Role
+from app.services import admin_service, context_loader, message_service, role_service
+
+ADMIN_ID = 'bench_admin'
+
+
+async def seed(Session, users: int, turns: int):
+    async with Session() as db:
+        db.add(Admin(user_id=ADMIN_ID, role={'name': ['admin'], 'nature': ['calm'] * 5}))
+        for u in range(users):
+            db.add(Role(user_id=f'user{u}', user_name=f'user{u}', role={'relation': ['friend'], 'nicknames': ['buddy']}))
+            for t in range(turns):
+                db.add(BotMessages(user_id=f'user{u}', channel_id='1', content=f'message {t}', bot_reply=f'reply {t}'))
+        await db.commit()
+
+
+def reset_caches():
+    role_service.role_cache.clear()
+    admin_service.admin_cache.clear()
+    message_service.summary_cache.clear()
+    for u in list(message_service.history._users):
+        message_service.history.invalidate(u)
+
+
+async def legacy(db: AsyncSession, user_id: str):
+    """Previous build_prompt behaviour: three ORM queries on one session"""
+    role = await role_service.get_roles_for_user(user_id, db)
+    admin = await admin_service.get_role_for_admin(ADMIN_ID, db)
+    messages = await message_service.get_user_messages(user_id, db)
+    return role, admin, messages
+
+
+async def single(db: AsyncSession, user_id: str):
+    reset_caches()
+    return await context_loader.load_prompt_context(user_id, ADMIN_ID, db)
+
+
+async def measure(label: str, Session, fn, iterations: int, users: int):
+    latencies = []
+    async with Session() as db:
+        for i in range(iterations):
+            start = time.perf_counter()
+            await fn(db, f'user{i % users}')
+            latencies.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    latencies.sort()
+    print(
+        f"{label:<10} mean={statistics.mean(latencies):6.3f}ms "
+        f"p50={statistics.median(latencies):6.3f}ms p95={latencies[int(len(latencies) * 0.95) - 1]:6.3f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-url', default='sqlite+aiosqlite:///' + os.path.join(tempfile.gettempdir(), 'context_bench.db'))
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.db_url)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(Session, args.users, args.turns)
+
+    await measure('legacy', Session, legacy, args.iterations, args.users)
+    await measure('single', Session, single, args.iterations, args.users)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
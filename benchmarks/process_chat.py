@@ -0,0 +1,88 @@
+"""
+Benchmark: end-to-end process_chat latency against the stub LLM provider
+
+Runs the real chat pipeline (context load, prompt, LLM gateway, storing the
+turn) with LLM_PROVIDER=stub, so results are reproducible and cost nothing.
+The stub's first-token delay, inter-chunk delay and error rate come from the
+LLM_STUB_* environment variables; set them before running to model a slower
+or flakier backend. Defaults to a throwaway SQLite database.
+
+Usage:
+    python -m benchmarks.process_chat --requests 500 --concurrency 20
+    LLM_STUB_FIRST_TOKEN_MS=800 LLM_STUB_ERROR_RATE=0.05 python -m benchmarks.process_chat
+"""
+import os
+
+os.environ['LLM_PROVIDER'] = 'stub'
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.models.admin import Admin
+from app.models.role import Role
+from app.schemas.chat import Payload
+from app.services import chat_service
+
+ADMIN_ID = chat_service.ADMIN_USERNAME
+
+
+async def seed(Session, users: int):
+    async with Session() as db:
+        db.add(Admin(user_id=ADMIN_ID, role={'name': ['admin'], 'nature': ['calm'] * 5}))
+        for u in range(users):
+            db.add(Role(user_id=f'user{u}', user_name=f'user{u}', role={'relation': ['friend'], 'nicknames': ['buddy']}))
+        await db.commit()
+
+
+async def run(Session, requests: int, concurrency: int, users: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        payload = Payload(user_id=f'user{i % users}', server_id='1', channel_id='1', content=f'message {i}')
+        async with semaphore:
+            async with Session() as db:
+                start = time.perf_counter()
+                await chat_service.process_chat(payload, db)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"requests={requests} concurrency={concurrency} throughput={requests / wall:7.1f}/s "
+        f"mean={statistics.mean(latencies):7.2f}ms p50={statistics.median(latencies):7.2f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1]:7.2f}ms max={latencies[-1]:7.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-url', default='sqlite+aiosqlite:///' + os.path.join(tempfile.gettempdir(), 'chat_bench.db'))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.db_url)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(Session, args.users)
+
+    await run(Session, args.requests, args.concurrency, args.users)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Benchmark: legacy develop_prompt vs the token-budgeted compose_prompt
+
+Builds prompts for a small and an oversized persona/history and reports
+prompt size (characters and estimated tokens) and build time for both
+builders. Sizes are what drive LLM input cost and latency; build time is
+the CPU spent per request.
+
+Usage:
+    python -m benchmarks.prompt_build --iterations 20000
+"""
+import argparse
+import statistics
+import time
+from app.services import prompt
+
+MESSAGE = 'kal movie dekhne chalega? the new one everyone keeps talking about'
+
+CASES = {
+    'typical': {
+        'user_role': {'name': ['Rohan'], 'relation': ['college friend'], 'nicknames': ['ro', 'bhai'],
+                      'instruction': ['talk casually, tease him about cricket']},
+        'admin_role': {'name': ['Pratik'], 'nature': ['calm', 'funny', 'sarcastic'], 'likes': ['movies', 'coding']},
+        'history': [(f'message {i} about plans for the weekend', f'reply {i}, sure lets see') for i in range(5)],
+    },
+    'oversized': {
+        'user_role': {'name': ['Rohan'], 'relation': ['college friend'], 'nicknames': ['ro', 'bhai'] * 20,
+                      'instruction': ['talk casually and tease him about cricket, never be formal ' * 30],
+                      'backstory': ['we met in first year and have shared a hostel room since then ' * 40]},
+        'admin_role': {'name': ['Pratik'], 'nature': ['calm', 'funny', 'sarcastic'] * 30,
+                       'likes': ['movies', 'coding', 'football', 'music'] * 40},
+        'history': [('long message about everything that happened today ' * 20,
+                     'an equally long reply going through all of it point by point ' * 25) for _ in range(5)],
+    },
+}
+
+
+def legacy(case: dict) -> str:
+    previous = [{'user_message': c, 'bot_reply': r} for c, r in case['history']]
+    return prompt.develop_prompt(case['user_role'], MESSAGE, previous, case['admin_role'])
+
+
+def compact(case: dict) -> str:
+    return prompt.compose_prompt(case['user_role'], MESSAGE, case['history'], case['admin_role'])
+
+
+def measure(label: str, fn, case: dict, iterations: int):
+    text = fn(case)
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(case)
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    print(
+        f"  {label:<8} chars={len(text):6d} est_tokens={prompt.estimate_tokens(text):5d} "
+        f"build={statistics.median(samples):7.2f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"token budget: {prompt.PROMPT_TOKEN_BUDGET}")
+    for name, case in CASES.items():
+        print(f"{name}:")
+        measure('legacy', legacy, case, args.iterations)
+        measure('compact', compact, case, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
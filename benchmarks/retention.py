@@ -0,0 +1,127 @@
+"""
+Benchmark: bot_messages archival throughput and its effect on live inserts
+
+Seeds bot_messages with turns spread over the last --days days, then runs
+one retention pass while a steady stream of single-row inserts (the
+non-write-behind save path) measures how long live writes take. Insert
+latency is also measured alone for a baseline. Defaults to a throwaway
+SQLite database and the file target.
+
+Usage:
+    python -m benchmarks.retention --rows 200000 --batch-size 1000 --pause-ms 50
+    python -m benchmarks.retention --target table
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db import migrate
+from app.models.message import BotMessages
+from app.services import retention
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return (
+        f"p50={statistics.median(samples):6.2f}ms p99={samples[int(len(samples) * 0.99) - 1]:6.2f}ms "
+        f"max={samples[-1]:6.2f}ms ({len(samples)} inserts)"
+    )
+
+
+async def seed(Session, rows: int, days: float, users: int):
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / rows
+    chunk = 5000
+    for offset in range(0, rows, chunk):
+        values = [
+            {'channel_id': '1', 'user_id': f'user{i % users}', 'content': f'message {i} ' * 8,
+             'bot_reply': f'reply {i} ' * 10, 'dateTime': start + step * i}
+            for i in range(offset, min(offset + chunk, rows))
+        ]
+        async with Session() as db:
+            await db.execute(insert(BotMessages), values)
+            await db.commit()
+
+
+async def live_inserts(Session, stop: asyncio.Event, samples: list, interval: float = 0.005):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with Session() as db:
+            db.add(BotMessages(channel_id='1', user_id=f'live{i % 50}', content='live', bot_reply='live',
+                               dateTime=datetime.utcnow()))
+            await db.commit()
+        samples.append((time.perf_counter() - start) * 1000)
+        i += 1
+        await asyncio.sleep(interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-url', default='sqlite+aiosqlite:///' + os.path.join(tempfile.gettempdir(), 'retention_bench.db'))
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--days', type=float, default=90)
+    parser.add_argument('--hot-days', type=float, default=30)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--target', choices=('file', 'table'), default='file')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--pause-ms', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.db_url)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    retention.AsyncSessionLocal = Session
+    await migrate.downgrade(engine, 0)
+    await migrate.upgrade(engine)
+    await seed(Session, args.rows, args.days, args.users)
+
+    directory = tempfile.mkdtemp(prefix='retention_bench_')
+    worker = retention.RetentionWorker(
+        hot_days=args.hot_days, interval=3600, target=args.target,
+        archive=retention.FileArchive(directory, retention.RETENTION_COMPRESS_LEVEL),
+        batch_size=args.batch_size, batch_pause_ms=args.pause_ms, max_batches=10 ** 9,
+        keep_recent=retention.RETENTION_KEEP_RECENT,
+    )
+
+    stop = asyncio.Event()
+    baseline = []
+    task = asyncio.create_task(live_inserts(Session, stop, baseline))
+    await asyncio.sleep(2)
+    stop.set()
+    await task
+    print(f"live inserts alone:          {percentiles(baseline)}")
+
+    stop = asyncio.Event()
+    during = []
+    task = asyncio.create_task(live_inserts(Session, stop, during))
+    start = time.perf_counter()
+    moved = await worker.run_pass()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await task
+    print(f"live inserts during archival: {percentiles(during)}")
+
+    async with Session() as db:
+        hot = (await db.execute(select(func.count()).select_from(BotMessages))).scalar()
+    size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    print(
+        f"archived={moved} in {elapsed:.1f}s ({moved / elapsed:8.0f} rows/s) batches={worker.batches} "
+        f"max_batch={worker.max_batch_ms:.1f}ms kept_recent={worker.rows_kept} hot_rows_left={hot}"
+    )
+    if args.target == 'file':
+        print(f"archive files={len(os.listdir(directory))} size={size / 1024:.0f}KiB")
+
+    shutil.rmtree(directory, ignore_errors=True)
+    await migrate.downgrade(engine, 0)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
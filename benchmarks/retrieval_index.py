@@ -0,0 +1,100 @@
+"""
+Benchmark: BM25 retrieval index on a synthetic conversation history
+
+Generates a synthetic bot_messages history (default 1M turns over 2000
+users with a skewed distribution, so a few users have very long
+histories) and reports index build time, memory per user, snapshot
+size/save/load time and query latency for typical and the heaviest users.
+No database is needed; rows are fed to the index directly.
+
+Usage:
+    python -m benchmarks.retrieval_index --rows 1000000 --users 2000
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+from app.services.retrieval import RetrievalIndex, RETRIEVAL_SHARDS
+
+WORDS = (
+    'kal movie dekhne chalega match cricket exam physics chemistry maths assignment deadline pizza biryani '
+    'party birthday gift trip goa manali train ticket hostel room mess food gym run football game pubg '
+    'valorant stream music song concert guitar coding python project internship interview resume college '
+    'class lecture professor notes weekend sunday monday office work boss salary bike car rain weather '
+    'phone laptop charger wifi netflix series episode anime manga book novel dog cat bruno mom dad sister'
+).split()
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_rows(rows: int, users: int, seed: int):
+    rng = random.Random(seed)
+    # Zipf-like: user k gets weight 1/(k+1)
+    weights = [1 / (k + 1) for k in range(users)]
+    user_ids = rng.choices(range(users), weights=weights, k=rows)
+    for user in user_ids:
+        content = " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+        reply = " ".join(rng.choices(WORDS, k=rng.randint(5, 20)))
+        yield f'user{user}', content, reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.rows, args.users, args.seed))
+    directory = tempfile.mkdtemp(prefix='retrieval_bench_')
+    index = RetrievalIndex(True, directory, snapshot_interval=0)
+    index.ready = True
+
+    before = rss_mb()
+    start = time.perf_counter()
+    for user_id, content, reply in rows:
+        index._add(user_id, content, reply)
+    build_s = time.perf_counter() - start
+    grown = rss_mb() - before
+    print(f"build    rows={args.rows} users={len(index.users)} docs={index.docs} "
+          f"time={build_s:.1f}s ({args.rows / build_s:,.0f} rows/s)")
+    print(f"memory   peak RSS growth={grown:.0f}MB (~{grown * 1024 / len(index.users):.0f}KB/user, "
+          f"~{grown * 1024 * 1024 / index.docs:.0f}B/turn)")
+
+    start = time.perf_counter()
+    blobs = index._serialize(range(RETRIEVAL_SHARDS), mark=args.rows)
+    index._write_files(blobs)
+    save_s = time.perf_counter() - start
+    size_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+    del blobs
+    restored = RetrievalIndex(True, directory, snapshot_interval=0)
+    start = time.perf_counter()
+    restored._read_snapshot()
+    load_s = time.perf_counter() - start
+    print(f"snapshot size={size_mb:.0f}MB save={save_s:.1f}s load={load_s:.1f}s")
+
+    rng = random.Random(args.seed + 1)
+    heaviest = max(index.users, key=lambda u: len(index.users[u].docs))
+    for label, pick in (('typical', lambda: f'user{rng.randrange(args.users)}'), ('heaviest', lambda: heaviest)):
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.choices(WORDS, k=rng.randint(3, 10)))
+            start = time.perf_counter()
+            index.search(pick(), query, k=3, exclude_recent=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"query    {label:<8} docs/user={len(index.users[heaviest].docs) if label == 'heaviest' else index.docs // len(index.users)} "
+              f"p50={statistics.median(latencies):.3f}ms p95={latencies[int(len(latencies) * 0.95) - 1]:.3f}ms")
+
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,19 @@
 """
 Database initialization script
-Run this to create all tables in the database
+Run this to create all tables in the database (applies every migration in
+app/db/migrations; see ``python -m app.db.migrate --help`` for rollbacks)
 """
 import asyncio
-from app.db.base import Base
+from app.db import migrate
 from app.db.session import engine
 
-# Import all models so they're registered with Base
-from app.models.user import User
-from app.models.role import Role
-from app.models.message import ChannelMessages, BotMessages
-
 
 async def init_db():
     """Create all database tables"""
     print("Creating database tables...")
     
-    async with engine.begin() as conn:
-        # Drop all tables (optional - comment out if you want to keep existing data)
-        # await conn.run_sync(Base.metadata.drop_all)
-        
-        # Create all tables
-        await conn.run_sync(Base.metadata.create_all)
+    # Existing databases are upgraded in place; nothing is dropped
+    await migrate.upgrade(engine)
     
     print("✅ Database tables created successfully!")
     print("\nCreated tables:")
@@ -29,6 +21,10 @@ async def init_db():
     print("  - role")
     print("  - channel_messages")
     print("  - bot_messages")
+    print("  - bot_messages_archive")
+    print("  - admin")
+    print("  - llm_response_cache")
+    print("  - user_summary")
 
 
 if __name__ == "__main__":
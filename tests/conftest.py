@@ -0,0 +1,36 @@
+"""
+Shared fixtures: the suite runs against an in-memory SQLite database and the
+stub LLM provider, so it needs neither MySQL nor an API key.
+"""
+import asyncio
+import os
+
+os.environ.setdefault('LLM_PROVIDER', 'stub')
+os.environ.setdefault('LLM_STUB_FIRST_TOKEN_MS', '0')
+os.environ.setdefault('LLM_STUB_CHUNK_MS', '0')
+os.environ.setdefault('MESSAGE_WRITE_BEHIND', 'false')
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models import admin, llm_cache, message, role, summary, user  # noqa: F401  (register the tables)
+
+
+@pytest.fixture
+def engine():
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def session_factory(engine):
+    """Session factory bound to a fresh database with every table created"""
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
@@ -0,0 +1,104 @@
+import asyncio
+from app.discord_bot.dispatcher import Dispatcher, Job
+
+
+class Tracker:
+    """Jobs that block until released and record peak concurrency"""
+
+    def __init__(self):
+        self.running = {}
+        self.peak = 0
+        self.started = []
+        self.shed = []
+        self.gate = asyncio.Event()
+
+    def job(self, name, guild='g', user='u', channel='c'):
+        async def run():
+            self.started.append(name)
+            self.running[name] = (user, channel)
+            self.peak = max(self.peak, len(self.running))
+            await self.gate.wait()
+            del self.running[name]
+
+        async def on_shed():
+            self.shed.append(name)
+        return Job(guild, user, channel, run, on_shed)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def run_dispatcher(test, **options):
+    async def main():
+        settings = dict(max_queue=100, max_concurrency=10, per_user_limit=10, per_channel_limit=10,
+                        stats_interval=0)
+        dispatcher = Dispatcher(**{**settings, **options})
+        await dispatcher.start()
+        try:
+            await test(dispatcher, Tracker())
+        finally:
+            await dispatcher.close()
+    asyncio.run(main())
+
+
+def test_global_concurrency_cap():
+    async def test(dispatcher, t):
+        for i in range(6):
+            await dispatcher.submit(t.job(i, user=f'u{i}', channel=f'c{i}'))
+        await settle()
+        assert len(t.running) == 2
+        assert dispatcher.queue_depth == 4
+        t.gate.set()
+        await settle()
+        assert t.peak == 2
+        assert dispatcher.snapshot()['completed'] == 6
+    run_dispatcher(test, max_concurrency=2)
+
+
+def test_per_user_and_channel_caps():
+    async def test(dispatcher, t):
+        for i in range(3):
+            await dispatcher.submit(t.job(f'a{i}', user='alice', channel=f'c{i}'))
+        for i in range(3):
+            await dispatcher.submit(t.job(f'b{i}', user=f'u{i}', channel='busy'))
+        await settle()
+        assert sorted(t.running) == ['a0', 'b0', 'b1']
+        assert dispatcher.queue_depth == 3
+    run_dispatcher(test, per_user_limit=1, per_channel_limit=2)
+
+
+def test_guilds_are_served_round_robin():
+    async def test(dispatcher, t):
+        for i in range(3):
+            await dispatcher.submit(t.job(f'big{i}', guild='big', user=f'b{i}', channel=f'b{i}'))
+        await dispatcher.submit(t.job('small', guild='small', user='s', channel='s'))
+        t.gate.set()
+        await settle()
+        assert t.started.index('small') == 1
+    run_dispatcher(test, max_concurrency=1)
+
+
+def test_reject_sheds_the_new_job():
+    async def test(dispatcher, t):
+        await dispatcher.submit(t.job('running'))
+        await settle()
+        assert await dispatcher.submit(t.job('queued'))
+        assert not await dispatcher.submit(t.job('rejected'))
+        assert t.shed == ['rejected']
+        assert dispatcher.snapshot()['shed'] == 1
+    run_dispatcher(test, max_queue=1, max_concurrency=1, shed_policy='reject')
+
+
+def test_drop_oldest_sheds_the_queued_job():
+    async def test(dispatcher, t):
+        await dispatcher.submit(t.job('running'))
+        await settle()
+        await dispatcher.submit(t.job('old'))
+        assert await dispatcher.submit(t.job('new'))
+        assert t.shed == ['old']
+        t.gate.set()
+        await settle()
+        assert t.started == ['running', 'new']
+    run_dispatcher(test, max_queue=1, max_concurrency=1, shed_policy='drop_oldest')
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+from app.models.message import BotMessages
+from app.schemas.chat import Payload
+from app.services import chat_service, context_loader
+from app.services.idempotency import idempotency
+
+
+def payload(user_id, message_id):
+    return Payload(user_id=user_id, server_id='s', channel_id='c', content='hello there', message_id=message_id)
+
+
+def turns(session_factory):
+    async def run():
+        async with session_factory() as db:
+            return (await db.execute(select(func.count(BotMessages.id)))).scalar()
+    return asyncio.run(run())
+
+
+def chat(session_factory, data, stream=False):
+    async def run():
+        async with session_factory() as db:
+            if stream:
+                events = [e async for e in chat_service.process_chat_stream(data, db)]
+                return {'reply': events[-1]['reply']}
+            return await chat_service.process_chat(data, db)
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_duplicate_replays_from_memory(session_factory, stream):
+    data = payload(f'memory-{stream}', f'm-{stream}')
+    first = chat(session_factory, data, stream)
+    replayed = idempotency.replayed
+
+    assert chat(session_factory, data, stream) == first
+    assert idempotency.replayed == replayed + 1
+    assert turns(session_factory) == 1
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_duplicate_after_restart_restores_from_database(session_factory, stream):
+    data = payload(f'restart-{stream}', f'r-{stream}')
+    first = chat(session_factory, data, stream)
+    # A restart (or an LRU eviction) forgets the in-memory reply
+    idempotency._completed.pop(data.message_id)
+    restored = idempotency.restored
+
+    assert chat(session_factory, data, stream) == first
+    assert idempotency.restored == restored + 1
+    assert turns(session_factory) == 1
+
+
+def test_open_circuit_skips_the_database(session_factory, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise AssertionError("database queried while the circuit is open")
+
+    monkeypatch.setattr(chat_service.llm_breaker, 'rejecting', lambda: True)
+    monkeypatch.setattr(context_loader, 'load_context_and_reply', unreachable)
+
+    assert chat(session_factory, payload('open', 'o-1')) == {'reply': chat_service.degraded_reply()}
@@ -0,0 +1,41 @@
+import asyncio
+from sqlalchemy import inspect
+from app.db import migrate
+
+
+def tables(engine):
+    async def run():
+        async with engine.connect() as conn:
+            return set(await conn.run_sync(lambda c: inspect(c).get_table_names()))
+    return asyncio.run(run())
+
+
+def indexes(engine, table):
+    async def run():
+        async with engine.connect() as conn:
+            return {i['name'] for i in await conn.run_sync(lambda c: inspect(c).get_indexes(table))}
+    return asyncio.run(run())
+
+
+def test_upgrade_downgrade_round_trip(engine):
+    head = migrate.head()
+    assert asyncio.run(migrate.upgrade(engine)) == head
+    upgraded = tables(engine)
+    assert {'bot_messages', 'bot_messages_archive', 'channel_messages', 'schema_version'} <= upgraded
+    bot_indexes = indexes(engine, 'bot_messages')
+
+    # Step down one revision at a time, then back up to the head
+    for revision in range(head - 1, -1, -1):
+        assert asyncio.run(migrate.downgrade(engine, revision)) == revision
+    assert tables(engine) == {'schema_version'}
+
+    assert asyncio.run(migrate.upgrade(engine)) == head
+    assert tables(engine) == upgraded
+    assert indexes(engine, 'bot_messages') == bot_indexes
+
+
+def test_upgrade_is_idempotent(engine):
+    asyncio.run(migrate.upgrade(engine, 1))
+    assert asyncio.run(migrate.current_version(engine)) == 1
+    assert asyncio.run(migrate.upgrade(engine)) == migrate.head()
+    assert asyncio.run(migrate.upgrade(engine)) == migrate.head()
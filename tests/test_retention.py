@@ -0,0 +1,103 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, insert, select
+from app.models.message import BotMessages, BotMessagesArchive
+from app.services import retention
+from app.services.retention import FileArchive, RetentionWorker
+
+
+def make_worker(tmp_path, target='file', batch_size=10, keep_recent=0, max_batches=100):
+    return RetentionWorker(
+        hot_days=30, interval=3600, target=target, archive=FileArchive(str(tmp_path), 1),
+        batch_size=batch_size, batch_pause_ms=0, max_batches=max_batches, keep_recent=keep_recent,
+    )
+
+
+@pytest.fixture
+def db(session_factory, monkeypatch):
+    monkeypatch.setattr(retention, 'AsyncSessionLocal', session_factory)
+    return session_factory
+
+
+def seed(db, rows):
+    """Insert (user_id, dateTime) turns in id order"""
+    async def run():
+        async with db() as session:
+            await session.execute(insert(BotMessages), [
+                {'channel_id': 'c', 'user_id': user_id, 'content': f'm{i}', 'bot_reply': f'r{i}',
+                 'dateTime': when, 'message_id': str(i)}
+                for i, (user_id, when) in enumerate(rows, 1)
+            ])
+            await session.commit()
+    asyncio.run(run())
+
+
+def hot_ids(db):
+    async def run():
+        async with db() as session:
+            return list((await session.execute(select(BotMessages.id).order_by(BotMessages.id))).scalars())
+    return asyncio.run(run())
+
+
+def archived_rows(tmp_path):
+    rows = []
+    for name in sorted(os.listdir(tmp_path)):
+        with gzip.open(tmp_path / name, 'rt') as f:
+            rows += [(name, json.loads(line)) for line in f]
+    return rows
+
+
+def test_undated_rows_below_old_rows_are_archived(db, tmp_path):
+    old, new = datetime.utcnow() - timedelta(days=100), datetime.utcnow()
+    seed(db, [('u', None)] * 30 + [('u', old)] * 20 + [('u', new)] * 5)
+    worker = make_worker(tmp_path)
+
+    assert asyncio.run(worker.run_pass()) == 50
+    assert hot_ids(db) == list(range(51, 56))
+    assert worker.cursor == 0
+    days = {name for name, row in archived_rows(tmp_path)}
+    assert days == {f"bot_messages-{old.date().isoformat()}.ndjson.gz"}
+
+
+def test_trailing_undated_rows_go_to_undated_file(db, tmp_path):
+    seed(db, [('u', None)] * 5)
+    worker = make_worker(tmp_path)
+
+    assert asyncio.run(worker.run_pass()) == 5
+    assert {name for name, _ in archived_rows(tmp_path)} == {'bot_messages-undated.ndjson.gz'}
+
+
+def test_keep_recent_rows_do_not_stall_the_scan(db, tmp_path):
+    old = datetime.utcnow() - timedelta(days=100)
+    # 'a' only ever wrote the first batch, so it stays hot; 'b' is archivable behind it
+    seed(db, [('a', old)] * 10 + [('b', old)] * 15 + [('b', datetime.utcnow())] * 5)
+    worker = make_worker(tmp_path, keep_recent=10, max_batches=1)
+
+    assert asyncio.run(worker.run_pass()) == 0
+    assert worker.cursor == 10
+    assert asyncio.run(worker.run_pass()) == 10
+    assert worker.cursor == 20
+    # ids 21-25 are among b's newest ten, so the scan ends without moving them
+    assert asyncio.run(worker.run_pass()) == 0
+    assert worker.cursor == 0
+    assert hot_ids(db) == list(range(1, 11)) + list(range(21, 31))
+    assert worker.rows_kept == 15
+
+
+def test_table_target_moves_rows(db, tmp_path):
+    old = datetime.utcnow() - timedelta(days=100)
+    seed(db, [('u', None)] * 3 + [('u', old)] * 3 + [('u', datetime.utcnow())])
+    worker = make_worker(tmp_path, target='table')
+
+    assert asyncio.run(worker.run_pass()) == 6
+
+    async def archived():
+        async with db() as session:
+            result = await session.execute(select(BotMessagesArchive.day, func.count()).group_by(BotMessagesArchive.day))
+            return dict(result.all())
+    assert asyncio.run(archived()) == {old.date(): 6}
+    assert hot_ids(db) == [7]